@@ -0,0 +1,58 @@
+"""Analytics package behind the Coffee Point Streamlit app.
+
+The public names are imported on first use, so importing the package (or a
+light module of it, such as ``coffeepoint.settings``) does not import
+pandas, numpy or pyarrow; see ``coffeepoint.startup``.
+"""
+import importlib
+
+# Public names and the modules defining them
+_EXPORTS = {
+    "FederatedDataset": "federation",
+    "HeavyHitters": "sketches",
+    "OrderAggregates": "incremental",
+    "ProcessPoolBackend": "parallel",
+    "ProductIndex": "products",
+    "Profile": "profiles",
+    "QuantileSketch": "sketches",
+    "ResultCache": "results",
+    "SEGMENT_RULES": "rfm",
+    "SegmentRule": "rfm",
+    "SerialBackend": "parallel",
+    "SidecarDataset": "store",
+    "SidecarStore": "store",
+    "Workbook": "loader",
+    "WorkbookCache": "loader",
+    "abc_table": "products",
+    "aggregate_orders_file": "streaming",
+    "append_orders": "incremental",
+    "dataset_aggregates": "incremental",
+    "default_backend": "parallel",
+    "fingerprint": "loader",
+    "get_profile": "profiles",
+    "inventory_coverage": "inventory",
+    "iter_order_chunks": "streaming",
+    "load_stores": "federation",
+    "load_workbook": "loader",
+    "product_index": "products",
+    "result_cache": "results",
+    "rfm_table": "rfm",
+    "set_backend": "parallel",
+    "update_stock": "inventory",
+    "workbook_cache": "loader",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,264 @@
+"""Benchmarks of the load path and the analyses on synthetic data.
+
+    python -m coffeepoint bench --sizes 10k 100k 1m --out bench.json
+    python -m coffeepoint bench --sizes 10k 100k 1m --baseline bench.json
+
+For every size the benchmark generates orders with ``coffeepoint.synthetic``
+and times these stages:
+
+- ``generate``: writing the synthetic orders to an Arrow file;
+- ``load_xlsx``: parsing a workbook of that size (only up to
+  ``--xlsx-max-rows``, as writing large workbooks is slow);
+- ``aggregate``: streaming the Arrow file into ``OrderAggregates`` with the
+  default backend;
+- ``abc_analysis``, ``frm_analysis``, ``sales_trends`` (including the
+  rolling windows) and ``cohorts``: deriving the analyses from the
+  aggregates;
+- ``approximate_abc`` and ``approximate_frm``: the sketch-based ABC and RFM
+  results of the approximate mode;
+- ``inventory_coverage``: the sales velocity and the days of cover, reorder
+  points and stockout dates of every product.
+
+Every stage reports wall time, peak resident memory of this process (worker
+processes are not included) and throughput in order rows per second. The
+results are written as JSON so runs can be compared; with ``--baseline``
+stages slower than the baseline by more than the tolerance are reported as
+regressions.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pyarrow
+
+from .inventory import SalesVelocity, coverage
+from .loader import parse_workbook, read_bytes
+from .parallel import default_backend
+from .products import ProductIndex
+from .profiling import current_rss
+from .streaming import DEFAULT_CHUNK_ROWS, iter_order_chunks
+from .synthetic import scaled, write_orders_arrow, write_workbook
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+DEFAULT_XLSX_MAX_ROWS = 100_000
+DEFAULT_TOLERANCE = 0.25
+# Slowdowns smaller than this are timer noise, not regressions
+MIN_REGRESSION_SECONDS = 0.05
+SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+
+def parse_size(text):
+    """Parse a row count such as ``10k``, ``1m`` or ``50M``."""
+    text = text.strip().lower().replace("_", "")
+    if text[-1:] in SUFFIXES:
+        return int(float(text[:-1]) * SUFFIXES[text[-1]])
+    return int(text)
+
+
+class PeakMemory:
+    """Context manager sampling the peak resident memory in the background."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.start = self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def __enter__(self):
+        self.start = self.peak = current_rss()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+
+def _measure(size, stage, rows, run):
+    with PeakMemory() as memory:
+        started = time.perf_counter()
+        result = run()
+        seconds = time.perf_counter() - started
+    record = {
+        "size": size,
+        "stage": stage,
+        "rows": rows,
+        "seconds": round(seconds, 6),
+        "rows_per_second": round(rows / seconds, 1) if seconds else None,
+        "peak_rss_bytes": memory.peak,
+        "rss_delta_bytes": memory.peak - memory.start,
+    }
+    return record, result
+
+
+def bench_size(size, workdir, seed=0, xlsx_max_rows=DEFAULT_XLSX_MAX_ROWS, chunk_rows=None):
+    """Benchmark every stage for ``size`` orders and return one record per stage."""
+    chunk_rows = chunk_rows or DEFAULT_CHUNK_ROWS
+    generator = scaled(size, seed)
+    orders_path = os.path.join(workdir, f"orders-{size}.arrow")
+    records = []
+
+    record, _ = _measure(
+        size,
+        "generate",
+        size,
+        lambda: write_orders_arrow(generator, orders_path, size, chunk_rows),
+    )
+    records.append(record)
+
+    if size <= xlsx_max_rows:
+        workbook_path = os.path.join(workdir, f"workbook-{size}.xlsx")
+        write_workbook(generator, workbook_path, size)
+        data = read_bytes(workbook_path)
+        record, _ = _measure(size, "load_xlsx", size, lambda: parse_workbook(data))
+        records.append(record)
+        del data
+
+    backend = default_backend()
+    record, aggregates = _measure(
+        size,
+        "aggregate",
+        size,
+        lambda: backend.aggregate_chunks(iter_order_chunks(orders_path, chunk_rows)),
+    )
+    records.append(record)
+
+    products = ProductIndex(generator.inventory())
+    stages = {
+        "abc_analysis": lambda: aggregates.abc(products),
+        "frm_analysis": lambda: aggregates.rfm(),
+        "sales_trends": lambda: (
+            aggregates.daily_sales(),
+            aggregates.weekly_sales(),
+            aggregates.rolling_sales(),
+        ),
+        "cohorts": lambda: aggregates.cohort_retention(),
+        "approximate_abc": lambda: aggregates.approximate_abc(products),
+        "approximate_frm": lambda: aggregates.approximate_rfm(),
+        "inventory_coverage": lambda: coverage(products, SalesVelocity(products, aggregates)),
+    }
+    for stage, run in stages.items():
+        record, _ = _measure(size, stage, size, run)
+        records.append(record)
+    os.remove(orders_path)
+    return records
+
+
+def _revision():
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            timeout=5,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return output.stdout.strip() or None
+
+
+def environment():
+    """Describe the machine and library versions of a benchmark run."""
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": _revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "workers": default_backend().workers,
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "pyarrow": pyarrow.__version__,
+    }
+
+
+def run(
+    sizes=DEFAULT_SIZES,
+    seed=0,
+    xlsx_max_rows=DEFAULT_XLSX_MAX_ROWS,
+    chunk_rows=None,
+    workdir=None,
+    progress=None,
+):
+    """Run the benchmark for every size and return the report."""
+    report = {"environment": environment(), "seed": seed, "results": []}
+    with tempfile.TemporaryDirectory(dir=workdir) as scratch:
+        for size in sizes:
+            for record in bench_size(size, scratch, seed, xlsx_max_rows, chunk_rows):
+                report["results"].append(record)
+                if progress is not None:
+                    progress(record)
+    return report
+
+
+def compare(baseline, report, tolerance=DEFAULT_TOLERANCE, min_seconds=MIN_REGRESSION_SECONDS):
+    """Return the stages of ``report`` slower than ``baseline`` beyond the tolerance.
+
+    A stage regresses when it is both ``tolerance`` (relative) and
+    ``min_seconds`` (absolute) slower than in the baseline.
+
+    Each regression is ``(size, stage, baseline_seconds, seconds)``.
+    """
+    before = {(r["size"], r["stage"]): r["seconds"] for r in baseline["results"]}
+    regressions = []
+    for record in report["results"]:
+        previous = before.get((record["size"], record["stage"]))
+        if previous is None:
+            continue
+        slowdown = record["seconds"] - previous
+        if slowdown > previous * tolerance and slowdown > min_seconds:
+            regressions.append((record["size"], record["stage"], previous, record["seconds"]))
+    return regressions
+
+
+def format_record(record):
+    return (
+        f"{record['size']:>12,} {record['stage']:<14} {record['seconds']:>10.3f}s "
+        f"{(record['rows_per_second'] or 0):>14,.0f} rows/s "
+        f"{record['peak_rss_bytes'] / 2**20:>9.1f} MiB peak"
+    )
+
+
+def main(args):
+    """Entry point of ``python -m coffeepoint bench``."""
+    report = run(
+        [parse_size(size) for size in args.sizes],
+        seed=args.seed,
+        xlsx_max_rows=parse_size(args.xlsx_max_rows),
+        chunk_rows=args.chunk_rows,
+        workdir=args.workdir,
+        progress=lambda record: print(format_record(record), file=sys.stderr),
+    )
+    if args.out:
+        with open(args.out, "w") as handle:
+            json.dump(report, handle, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    if args.baseline:
+        with open(args.baseline) as handle:
+            regressions = compare(json.load(handle), report, args.tolerance)
+        for size, stage, previous, seconds in regressions:
+            print(
+                f"regression: {stage} at {size:,} rows took {seconds:.3f}s "
+                f"(baseline {previous:.3f}s)",
+                file=sys.stderr,
+            )
+        return 1 if regressions else 0
+    return 0
@@ -0,0 +1,117 @@
+"""Server-side reduction of chart data to a point budget.
+
+Plotly serializes every point of a figure to the browser, so charts over
+hundreds of thousands of customers or products are reduced before plotting:
+
+- line series are downsampled with Largest-Triangle-Three-Buckets (LTTB),
+  which keeps the visual shape of the series;
+- scatter plots are aggregated into a 2-D histogram of bin centers;
+- bar charts keep the top N bars and fold the rest into "Other" bars.
+
+Every function returns its input unchanged when it already fits the budget.
+"""
+import numpy as np
+import pandas as pd
+
+from .settings import DEFAULT_POINT_BUDGET
+
+
+def _numeric(values):
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.to_numpy("datetime64[ns]").view("int64").astype(np.float64)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype=np.float64)
+    # Categorical axes (e.g. week labels) are evenly spaced
+    return np.arange(len(values), dtype=np.float64)
+
+
+def lttb_indices(x, y, budget):
+    """Return the positions of the points LTTB keeps out of (x, y)."""
+    n = len(x)
+    if budget >= n or budget < 3:
+        return np.arange(n)
+    x, y = _numeric(x), _numeric(y)
+    # Points 1..n-2 are split into budget - 2 buckets; both ends are always kept
+    edges = np.linspace(1, n - 1, budget - 1).astype(np.int64)
+    indices = np.empty(budget, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(budget - 2):
+        start, stop = edges[bucket], max(edges[bucket + 1], edges[bucket] + 1)
+        if bucket + 2 < len(edges):
+            next_start, next_stop = edges[bucket + 1], edges[bucket + 2]
+        else:
+            next_start, next_stop = n - 1, n
+        next_x = x[next_start:max(next_stop, next_start + 1)].mean()
+        next_y = y[next_start:max(next_stop, next_start + 1)].mean()
+        # Keep the point forming the largest triangle with the previous kept
+        # point and the average of the next bucket
+        area = np.abs(
+            (x[previous] - next_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        indices[bucket + 1] = previous
+    return indices
+
+
+def downsample_line(frame, x, y, budget=DEFAULT_POINT_BUDGET):
+    """Downsample a line series sorted by ``x`` to at most ``budget`` points."""
+    if budget is None or len(frame) <= budget:
+        return frame
+    return frame.iloc[lttb_indices(frame[x], frame[y], budget)]
+
+
+def top_n(frame, label, value, budget=DEFAULT_POINT_BUDGET, by=None, other="Other"):
+    """Keep the ``budget`` largest bars and fold the rest into "Other" bars.
+
+    With ``by``, the folded rows get one "Other" bar per group, so a bar chart
+    colored by that column keeps its colors.
+    """
+    if budget is None or len(frame) <= budget:
+        return frame
+    groups = 1 if by is None else frame[by].nunique()
+    keep = max(budget - groups, 1)
+    ranked = frame.sort_values(value, ascending=False)
+    head, rest = ranked.iloc[:keep], ranked.iloc[keep:]
+    if by is None:
+        others = pd.DataFrame({label: [other], value: [rest[value].sum()]})
+    else:
+        others = rest.groupby(by, observed=True)[value].sum().reset_index()
+        others[label] = other + " (" + others[by].astype(str) + ")"
+    head = head[[label, value] + ([by] if by is not None else [])]
+    # Labels become strings so numeric IDs and "Other" share one axis type
+    return pd.concat([head.astype({label: str}), others], ignore_index=True)
+
+
+def bin_2d(frame, x, y, budget=DEFAULT_POINT_BUDGET, by=None, size=None, count="Count"):
+    """Aggregate a scatter into 2-D histogram bins.
+
+    Returns one row per non-empty bin (and ``by`` group) with the bin center
+    in ``x``/``y``, the number of points in ``count`` and, with ``size``, the
+    mean of that column.
+    """
+    if budget is None or len(frame) <= budget:
+        return frame
+    groups = 1 if by is None else max(frame[by].nunique(), 1)
+    bins = max(int(np.sqrt(budget / groups)), 2)
+
+    keys, centers = [], {}
+    for column in (x, y):
+        values = frame[column].to_numpy(dtype=np.float64)
+        low, high = np.nanmin(values), np.nanmax(values)
+        width = (high - low) / bins or 1.0
+        codes = np.clip(((values - low) / width).astype(np.int64), 0, bins - 1)
+        keys.append(pd.Series(codes, index=frame.index, name=column))
+        centers[column] = (low, width)
+    if by is not None:
+        keys.append(frame[by])
+
+    aggregations = {count: (x, "size")}
+    if size is not None:
+        aggregations[size] = (size, "mean")
+    binned = frame.groupby(keys, observed=True).agg(**aggregations).reset_index()
+    for column, (low, width) in centers.items():
+        binned[column] = low + (binned[column] + 0.5) * width
+    return binned
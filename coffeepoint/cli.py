@@ -0,0 +1,307 @@
+"""Headless command line interface.
+
+    python -m coffeepoint analyze Coffee_Point_Data.xlsx --out results/
+
+runs the ABC, RFM, sales trend, cohort and inventory analyses without Streamlit and
+writes every result table as Parquet, the charts as standalone HTML (or PNG
+with the optional ``kaleido`` package) and a ``manifest.json`` describing
+the run. The workbook is also ingested into the sidecar store, so an app
+started with ``COFFEEPOINT_STORE_DIR`` pointing at the same store opens the
+file afterwards from the precomputed sidecar and aggregates.
+
+Several workbooks, or a directory of workbooks, are analyzed as one chain
+with a store per workbook (see ``coffeepoint.federation``):
+
+    python -m coffeepoint analyze outlets/ --out results/ --workers 8
+
+Segment labels and thresholds come from a labeling profile (``--profile``,
+see ``coffeepoint.profiles``), as in the app variants.
+
+``bench`` times the analyses on synthetic data (see ``coffeepoint.bench``)
+and ``startup`` checks the app's cold-start imports against a budget (see
+``coffeepoint.startup``).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from . import startup
+from .charts import DEFAULT_POINT_BUDGET
+from .federation import load_stores, store_summary
+from .incremental import dataset_aggregates
+from .inventory import inventory_coverage
+from .loader import WorkbookCache
+from .parallel import ProcessPoolBackend, set_backend
+from .products import product_index
+from .profiles import DEFAULT_PROFILE, PROFILES, get_profile
+from .profiling import profiler
+from .results import (
+    abc_result,
+    approximate_abc_result,
+    approximate_rfm_result,
+    cohort_result,
+    daily_sales_result,
+    rfm_result,
+    rolling_sales_result,
+    weekly_sales_result,
+)
+from .rfm import segment_counts
+from .sketches import DEFAULT_CAPACITY, DEFAULT_RELATIVE_ACCURACY
+from .store import DEFAULT_ROOT, SidecarStore
+
+
+def analysis_results(dataset, profile=None, approximate=False):
+    """Run every analysis on a dataset and return the result tables by name.
+
+    Segments and ABC categories follow a labeling profile (a ``Profile`` or
+    its name). Results go through the shared result cache, so with its disk
+    tier enabled a nightly run precomputes them for the app. With
+    ``approximate`` the ABC and RFM tables come from sketches (see
+    ``coffeepoint.sketches``).
+    """
+    profile = get_profile(profile)
+    segments = (profile.quantiles, profile.rules(), profile.default_segment())
+    if approximate:
+        rfm = approximate_rfm_result(dataset, *segments)
+        abc = approximate_abc_result(dataset, profile.abc_thresholds)
+    else:
+        rfm = rfm_result(dataset, *segments)
+        abc = abc_result(dataset, profile.abc_thresholds)
+    return {
+        "abc": abc,
+        "rfm": rfm.reset_index(),
+        "segments": segment_counts(rfm),
+        "daily_sales": daily_sales_result(dataset),
+        "weekly_sales": weekly_sales_result(dataset),
+        "rolling_sales": rolling_sales_result(dataset),
+        "cohort_retention": cohort_result(dataset).reset_index(),
+        "inventory_by_category": product_index(dataset).category_stock().reset_index(),
+        "inventory_coverage": inventory_coverage(
+            dataset, abc_thresholds=profile.abc_thresholds
+        ),
+    }
+
+
+def result_figures(dataset, results, point_budget=DEFAULT_POINT_BUDGET):
+    """Build the app's figures from the result tables."""
+    # Plotly is only imported when charts are requested
+    from . import figures
+
+    inventory = dataset.read("Inventory", columns=["Product_Name", "Category", "Stock"])
+    return {
+        "abc": figures.abc_figure(results["abc"], point_budget),
+        "rfm_scatter": figures.rfm_scatter_figure(results["rfm"], point_budget),
+        "segments": figures.segment_pie_figure(results["segments"]),
+        "daily_sales": figures.daily_sales_figure(results["daily_sales"], point_budget),
+        "weekly_sales": figures.weekly_sales_figure(results["weekly_sales"], point_budget),
+        "rolling_sales": figures.rolling_sales_figure(results["rolling_sales"], point_budget),
+        "wow_growth": figures.wow_growth_figure(results["rolling_sales"], point_budget),
+        "cohort_retention": figures.cohort_retention_figure(
+            results["cohort_retention"].set_index("Cohort")
+        ),
+        "inventory_by_product": figures.inventory_product_figure(inventory, point_budget),
+        "inventory_by_category": figures.inventory_category_figure(
+            results["inventory_by_category"]
+        ),
+        "inventory_coverage": figures.inventory_coverage_figure(
+            results["inventory_coverage"], point_budget
+        ),
+    }
+
+
+def analyze(
+    path,
+    out,
+    store_root=DEFAULT_ROOT,
+    charts="html",
+    point_budget=DEFAULT_POINT_BUDGET,
+    profile=None,
+    approximate=False,
+):
+    """Analyze a workbook and write the results to the ``out`` directory.
+
+    ``path`` may also be a directory or a list of workbooks, analyzed as one
+    chain with a store per workbook. ``profile`` is a labeling profile or its
+    name. Returns the manifest written to ``out/manifest.json``.
+    """
+    profile = get_profile(profile)
+    started = time.perf_counter()
+    os.makedirs(out, exist_ok=True)
+    cache = WorkbookCache(store=SidecarStore(store_root) if store_root else None)
+    paths = [path] if isinstance(path, (str, os.PathLike)) else list(path)
+    chain = len(paths) > 1 or os.path.isdir(paths[0])
+    if chain:
+        dataset = load_stores(paths if len(paths) > 1 else paths[0], cache=cache)
+    else:
+        dataset = cache.load(paths[0])
+    results = analysis_results(dataset, profile, approximate)
+    if chain:
+        results["stores"] = store_summary(dataset)
+
+    files = {}
+    for name, frame in results.items():
+        files[name] = f"{name}.parquet"
+        frame.to_parquet(os.path.join(out, files[name]), index=False)
+
+    if charts != "none":
+        for name, figure in result_figures(dataset, results, point_budget).items():
+            filename = f"{name}.{charts}"
+            if charts == "png":
+                # Requires the optional kaleido package
+                figure.write_image(os.path.join(out, filename))
+            else:
+                figure.write_html(os.path.join(out, filename), include_plotlyjs="cdn")
+            files[f"{name}_chart"] = filename
+
+    approximation = None
+    if approximate:
+        # Error bounds of the sketch-based tables; the ABC bound is the same for every product
+        abc = results["abc"]
+        approximation = {
+            "rfm_boundary_relative_error": DEFAULT_RELATIVE_ACCURACY,
+            "abc_capacity": DEFAULT_CAPACITY,
+            "abc_sales_error": float((abc["Sales_Upper"] - abc["Sales"]).max() if len(abc) else 0),
+        }
+
+    sources = [os.path.abspath(each) for each in paths]
+    manifest = {
+        "source": sources if len(sources) > 1 else sources[0],
+        "fingerprint": dataset.fingerprint,
+        "orders": dataset_aggregates(dataset).rows,
+        "profile": profile.name,
+        "quantiles": profile.quantiles,
+        "abc_thresholds": list(profile.abc_thresholds),
+        "approximate": approximation,
+        "files": files,
+        "seconds": round(time.perf_counter() - started, 3),
+        "stages": profiler.summary(),
+    }
+    with open(os.path.join(out, "manifest.json"), "w") as handle:
+        json.dump(manifest, handle, indent=2)
+    return manifest
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m coffeepoint", description="Coffee Point analytics without Streamlit."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("analyze", help="run every analysis on a workbook")
+    command.add_argument(
+        "workbook",
+        nargs="+",
+        help="Coffee Point workbook (.xlsx); several workbooks or a directory form a chain",
+    )
+    command.add_argument("--out", required=True, help="directory for the results")
+    command.add_argument(
+        "--store", default=DEFAULT_ROOT, help="sidecar store directory (default: %(default)s)"
+    )
+    command.add_argument(
+        "--no-store", action="store_true", help="do not ingest the workbook into the store"
+    )
+    command.add_argument("--charts", choices=["html", "png", "none"], default="html")
+    command.add_argument(
+        "--point-budget",
+        type=int,
+        default=DEFAULT_POINT_BUDGET,
+        help="maximum points per chart, 0 for full resolution (default: %(default)s)",
+    )
+    command.add_argument(
+        "--profile",
+        choices=sorted(PROFILES),
+        default=None,
+        help=f"labeling profile (default: $COFFEEPOINT_LABELING_PROFILE or {DEFAULT_PROFILE})",
+    )
+    command.add_argument(
+        "--quantiles",
+        type=int,
+        default=None,
+        help="RFM score quantiles, 2 to 9 (default: the profile's)",
+    )
+    command.add_argument(
+        "--abc-thresholds",
+        type=float,
+        nargs=2,
+        default=None,
+        metavar=("A", "B"),
+        help="cumulative sales share bounding categories A and B (default: the profile's)",
+    )
+    command.add_argument(
+        "--approximate",
+        action="store_true",
+        help="sketch-based ABC and RFM with error bounds, for very large datasets",
+    )
+    command.add_argument(
+        "--workers", type=int, default=1, help="parsing and aggregation worker processes"
+    )
+
+    command = commands.add_parser("bench", help="benchmark the analyses on synthetic data")
+    command.add_argument(
+        "--sizes", nargs="+", default=["10k", "100k", "1m"], help="order row counts, e.g. 10k 50m"
+    )
+    command.add_argument("--seed", type=int, default=0)
+    command.add_argument(
+        "--xlsx-max-rows", default="100k", help="largest size also timed as an xlsx workbook"
+    )
+    command.add_argument("--chunk-rows", type=int, default=None, help="rows per streamed chunk")
+    command.add_argument("--workdir", default=None, help="directory for the generated files")
+    command.add_argument("--out", default=None, help="JSON report file (default: stdout)")
+    command.add_argument("--baseline", default=None, help="JSON report to compare against")
+    command.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed slowdown against the baseline (default: %(default)s)",
+    )
+    command.add_argument("--workers", type=int, default=1, help="aggregation worker processes")
+
+    command = commands.add_parser("startup", help="check the app's cold-start import budget")
+    command.add_argument("app", nargs="*", default=["app.py"], help="app scripts to check")
+    command.add_argument(
+        "--budget",
+        type=float,
+        default=startup.DEFAULT_BUDGET_SECONDS,
+        help="allowed seconds for the startup imports (default: %(default)s)",
+    )
+    command.add_argument("--repeat", type=int, default=startup.DEFAULT_REPEAT, help="runs to time")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "startup":
+        return startup.main(args)
+    if args.workers > 1:
+        set_backend(ProcessPoolBackend(args.workers))
+    if args.command == "bench":
+        from . import bench
+
+        return bench.main(args)
+    if args.command == "analyze":
+        profile = get_profile(args.profile)
+        if args.quantiles is not None:
+            if not 2 <= args.quantiles <= 9:
+                # FRM_Score packs the three scores as decimal digits
+                parser.error("--quantiles must be between 2 and 9")
+            profile = profile._replace(quantiles=args.quantiles)
+        if args.abc_thresholds is not None:
+            a, b = args.abc_thresholds
+            if not 0 < a < b < 1:
+                parser.error("--abc-thresholds must satisfy 0 < A < B < 1")
+            profile = profile._replace(abc_thresholds=(a, b))
+        manifest = analyze(
+            args.workbook,
+            args.out,
+            store_root=None if args.no_store else args.store,
+            charts=args.charts,
+            point_budget=args.point_budget or None,
+            profile=profile,
+            approximate=args.approximate,
+        )
+        json.dump(manifest, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    return 0
@@ -0,0 +1,63 @@
+"""Monthly acquisition cohorts and their retention.
+
+Customers are grouped by the month of their first order (their cohort).
+The retention matrix gives, for every cohort and every month since
+acquisition, the share of the cohort whose last order falls in that month or
+later, i.e. customers not yet lapsed. It only needs each customer's first and
+last order date, which the running order aggregates already keep, so it is
+derived in time proportional to the number of customers and never re-scans
+the orders.
+"""
+import numpy as np
+import pandas as pd
+
+
+def _months(dates):
+    # Months since the epoch, so month differences are plain subtraction
+    dates = dates.to_numpy("datetime64[M]")
+    return dates.astype(np.int64)
+
+
+def cohort_counts(customers):
+    """Return customers retained per cohort (rows) and months since acquisition.
+
+    ``customers`` has First_Order and Last_Order per customer. Cell ``[c, k]``
+    counts the customers of cohort ``c`` whose last order is at least ``k``
+    months after their first. The index holds the cohort months.
+    """
+    first = _months(customers["First_Order"])
+    if not len(first):
+        return pd.DataFrame(index=pd.PeriodIndex([], freq="M", name="Cohort"), dtype="int64")
+    lifetime = _months(customers["Last_Order"]) - first
+    origin, span = first.min(), int(first.max() - first.min()) + 1
+    width = int(_months(customers["Last_Order"]).max() - origin) + 1
+    cells = (first - origin) * width + lifetime
+    counts = np.bincount(cells, minlength=span * width).reshape(span, width)
+    # Customers lapsing after month k are still retained in every earlier month
+    retained = np.cumsum(counts[:, ::-1], axis=1)[:, ::-1]
+    index = pd.period_range(
+        np.datetime64(int(origin), "M"), periods=span, freq="M", name="Cohort"
+    )
+    return pd.DataFrame(retained, index=index)
+
+
+def cohort_retention(customers):
+    """Return the retention matrix of the monthly acquisition cohorts.
+
+    One row per cohort (``YYYY-MM``) with its size in Customers and the
+    retained share in ``Month_0``, ``Month_1``, ... Months not yet observed
+    for a cohort (after the last order date of the data) are NaN.
+    """
+    counts = cohort_counts(customers)
+    if counts.empty:
+        return pd.DataFrame({"Customers": pd.Series(dtype="int64")}).rename_axis("Cohort")
+    size = counts[0]
+    share = counts.div(size.where(size > 0), axis=0)
+    # Month k of a cohort is observed only up to the last month of the data
+    months = len(counts.columns)
+    observed = months - 1 - np.arange(len(counts))
+    share = share.where(np.arange(months) <= observed[:, None])
+    share.columns = [f"Month_{k}" for k in share.columns]
+    share.insert(0, "Customers", size.astype("int64"))
+    share.index = share.index.strftime("%Y-%m").rename("Cohort")
+    return share
@@ -0,0 +1,156 @@
+"""Several store workbooks analyzed as one chain-wide dataset.
+
+Every outlet of the chain produces its own workbook. ``load_stores`` loads
+them through the workbook cache, parsing the new ones concurrently (see
+``WorkbookCache.load_many``), and returns a ``FederatedDataset``: the store
+datasets side by side, read as one dataset with an extra Store column.
+
+The chain's running aggregates are the merge of the per-store aggregates, so
+chain-wide ABC, RFM and sales trends never aggregate the orders twice, and a
+per-store view (``dataset.stores[name]``) reuses its store's aggregates.
+Adding a store parses and aggregates only that store's workbook.
+"""
+import hashlib
+import os
+
+import pandas as pd
+
+from .incremental import dataset_aggregates
+from .loader import workbook_cache
+from .streaming import DEFAULT_CHUNK_ROWS
+
+STORE_COLUMN = "Store"
+
+
+def _concat(frames):
+    # Categorical columns only stay categorical with identical categories
+    frames = list(frames)
+    for column in frames[0].columns:
+        if isinstance(frames[0][column].dtype, pd.CategoricalDtype):
+            categories = pd.api.types.union_categoricals(
+                [frame[column] for frame in frames], ignore_order=True
+            ).categories
+            dtype = pd.CategoricalDtype(categories)
+            frames = [frame.assign(**{column: frame[column].astype(dtype)}) for frame in frames]
+    return pd.concat(frames, ignore_index=True)
+
+
+class FederatedDataset:
+    """The datasets of several stores, read as one dataset with a Store column."""
+
+    # Store datasets live in the workbook cache and are accounted for there
+    nbytes = 0
+    # Derived data is kept by the stores' sidecars, not by the chain
+    path = None
+
+    def __init__(self, stores):
+        self.stores = dict(stores)
+        digest = hashlib.blake2b(digest_size=16)
+        for name, dataset in self.stores.items():
+            digest.update(f"{name}\0{dataset.fingerprint}\0".encode())
+        self.fingerprint = digest.hexdigest()
+        self._store_dtype = pd.CategoricalDtype(list(self.stores))
+
+    def __len__(self):
+        return len(self.stores)
+
+    def _with_store(self, name, frame):
+        store = pd.Categorical([name] * len(frame), dtype=self._store_dtype)
+        return frame.assign(**{STORE_COLUMN: store})
+
+    def _split(self, columns):
+        # The columns to read from the stores, and whether to add the Store column
+        if columns is None:
+            return None, True
+        return [column for column in columns if column != STORE_COLUMN], STORE_COLUMN in columns
+
+    def read(self, sheet, columns=None):
+        """Return a sheet of every store, one after another."""
+        read, store = self._split(columns)
+        frames = []
+        for name, dataset in self.stores.items():
+            frame = dataset.read(sheet, read)
+            frames.append(self._with_store(name, frame) if store else frame)
+        frame = _concat(frames)
+        return frame if columns is None else frame[columns]
+
+    def iter_chunks(self, sheet, columns=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """Yield a sheet store by store, as frames of at most ``chunk_rows`` rows."""
+        read, store = self._split(columns)
+        for name, dataset in self.stores.items():
+            for chunk in dataset.iter_chunks(sheet, read, chunk_rows):
+                chunk = self._with_store(name, chunk) if store else chunk
+                yield chunk if columns is None else chunk[columns]
+
+    def head(self, sheet, n=5):
+        name, dataset = next(iter(self.stores.items()))
+        return self._with_store(name, dataset.head(sheet, n))
+
+    def rows(self, sheet):
+        return sum(dataset.rows(sheet) for dataset in self.stores.values())
+
+    @property
+    def orders(self):
+        return self.read("Orders")
+
+    @property
+    def inventory(self):
+        return self.read("Inventory")
+
+    @property
+    def customers(self):
+        return self.read("Customers")
+
+
+def store_names(sources):
+    """Name a store after its workbook's file name, numbering duplicates."""
+    names = []
+    for source in sources:
+        name = getattr(source, "name", source)
+        name = os.path.splitext(os.path.basename(str(name)))[0] or "Store"
+        base, number = name, 2
+        while name in names:
+            name, number = f"{base} ({number})", number + 1
+        names.append(name)
+    return names
+
+
+def workbook_paths(directory):
+    """Return the workbooks of a directory, sorted by file name."""
+    return [
+        os.path.join(directory, name)
+        for name in sorted(os.listdir(directory))
+        if name.lower().endswith(".xlsx") and not name.startswith("~$")
+    ]
+
+
+def load_stores(sources, names=None, cache=None, backend=None):
+    """Load one workbook per store as a ``FederatedDataset``.
+
+    ``sources`` is a directory of workbooks or a list of uploads or paths;
+    stores are named after the files unless ``names`` are given.
+    """
+    if isinstance(sources, (str, os.PathLike)) and os.path.isdir(sources):
+        sources = workbook_paths(sources)
+    sources = list(sources)
+    if not sources:
+        raise ValueError("No workbooks to load")
+    names = list(names) if names is not None else store_names(sources)
+    cache = cache if cache is not None else workbook_cache
+    return FederatedDataset(zip(names, cache.load_many(sources, backend)))
+
+
+def store_summary(dataset):
+    """Return orders, customers and sales per store of a federated dataset."""
+    rows = []
+    for name, store in dataset.stores.items():
+        aggregates = dataset_aggregates(store)
+        rows.append(
+            {
+                STORE_COLUMN: name,
+                "Orders": aggregates.rows,
+                "Customers": len(aggregates.customers),
+                "Sales": float(aggregates.product_sales.sum()),
+            }
+        )
+    return pd.DataFrame(rows)
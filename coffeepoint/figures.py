@@ -0,0 +1,178 @@
+"""Plotly figures of the analysis results, shared by the app and the CLI.
+
+Every builder reduces its data to ``point_budget`` points first (see
+``coffeepoint.charts``); pass ``None`` for full-resolution figures.
+
+Importing this module imports Plotly Express, and the first figure of a
+process loads Plotly's templates; ``warm_up`` does both ahead of time.
+"""
+import functools
+
+import pandas as pd
+import plotly.express as px
+
+from .charts import DEFAULT_POINT_BUDGET, bin_2d, downsample_line, top_n
+from .profiling import profiled
+
+
+@profiled("figure.abc")
+def abc_figure(abc_result, point_budget=DEFAULT_POINT_BUDGET):
+    chart_data = top_n(abc_result, "Product", "Sales", point_budget, by="Category")
+    return px.bar(chart_data, x="Product", y="Sales", color="Category", title="ABC Analysis")
+
+
+@profiled("figure.rfm_scatter")
+def rfm_scatter_figure(frm_data, point_budget=DEFAULT_POINT_BUDGET):
+    # Many customers are binned into a 2-D histogram sized by customer count
+    chart_data = bin_2d(
+        frm_data, "Recency", "Monetary", point_budget,
+        by="Segment", size="Frequency", count="Customers",
+    )
+    return px.scatter(
+        chart_data,
+        x="Recency",
+        y="Monetary",
+        size="Customers" if "Customers" in chart_data else "Frequency",
+        color="Segment",
+        hover_data=["Frequency"],
+        title="FRM Customer Segmentation",
+        labels={
+            "Recency": "Recency (Days)",
+            "Monetary": "Monetary Value",
+            "Frequency": "Order Frequency",
+        },
+    )
+
+
+@profiled("figure.segment_pie")
+def segment_pie_figure(segment_counts):
+    return px.pie(
+        segment_counts, values="Count", names="Segment", title="Customer Segment Distribution"
+    )
+
+
+@profiled("figure.daily_sales")
+def daily_sales_figure(daily_sales, point_budget=DEFAULT_POINT_BUDGET):
+    chart_data = downsample_line(daily_sales, "Date", "Daily_Sales", point_budget)
+    return px.line(
+        chart_data,
+        x="Date",
+        y="Daily_Sales",
+        title="Daily Sales Trends",
+        labels={"Date": "Date", "Daily_Sales": "Sales Amount"},
+    )
+
+
+@profiled("figure.weekly_sales")
+def weekly_sales_figure(weekly_sales, point_budget=DEFAULT_POINT_BUDGET):
+    chart_data = downsample_line(weekly_sales, "Week", "Weekly_Sales", point_budget)
+    return px.line(
+        chart_data,
+        x="Week",
+        y="Weekly_Sales",
+        title="Weekly Sales Trends",
+        labels={"Week": "Week Number", "Weekly_Sales": "Sales Amount"},
+    )
+
+
+@profiled("figure.rolling_sales")
+def rolling_sales_figure(rolling_sales, point_budget=DEFAULT_POINT_BUDGET):
+    columns = [column for column in rolling_sales.columns if column.startswith("Rolling_")]
+    # Every series is drawn at the days picked for the longest window
+    chart_data = downsample_line(rolling_sales, "Date", columns[-1], point_budget)
+    return px.line(
+        chart_data,
+        x="Date",
+        y=columns,
+        title="Rolling Sales",
+        labels={"value": "Sales Amount", "variable": "Window"},
+    )
+
+
+@profiled("figure.wow_growth")
+def wow_growth_figure(rolling_sales, point_budget=DEFAULT_POINT_BUDGET):
+    chart_data = downsample_line(
+        rolling_sales.dropna(subset=["WoW_Growth"]), "Date", "WoW_Growth", point_budget
+    )
+    figure = px.line(
+        chart_data,
+        x="Date",
+        y="WoW_Growth",
+        title="Week-over-Week Growth (7-day sales)",
+        labels={"WoW_Growth": "Growth"},
+    )
+    figure.update_yaxes(tickformat=".0%")
+    return figure
+
+
+@profiled("figure.cohort_retention")
+def cohort_retention_figure(cohort_retention):
+    months = cohort_retention.drop(columns="Customers")
+    figure = px.imshow(
+        months,
+        x=[column.removeprefix("Month_") for column in months.columns],
+        y=list(months.index),
+        color_continuous_scale="Blues",
+        zmin=0,
+        zmax=1,
+        aspect="auto",
+        title="Monthly Cohort Retention",
+        labels={"x": "Months Since First Order", "y": "Cohort", "color": "Retained"},
+    )
+    figure.update_coloraxes(colorbar_tickformat=".0%")
+    return figure
+
+
+@profiled("figure.inventory_product")
+def inventory_product_figure(inventory, point_budget=DEFAULT_POINT_BUDGET):
+    return px.bar(
+        top_n(inventory, "Product_Name", "Stock", point_budget),
+        x="Product_Name",
+        y="Stock",
+        title="Inventory Levels by Product",
+        labels={"Stock": "Inventory", "Product_Name": "Product"},
+    )
+
+
+@profiled("figure.inventory_category")
+def inventory_category_figure(category_inventory):
+    return px.bar(
+        category_inventory,
+        x="Category",
+        y="Stock",
+        title="Inventory Levels by Category",
+        labels={"Stock": "Inventory", "Category": "Product Category"},
+    )
+
+
+@profiled("figure.inventory_coverage")
+def inventory_coverage_figure(coverage, point_budget=DEFAULT_POINT_BUDGET):
+    # The products closest to running out, at most point_budget of them
+    chart_data = coverage.dropna(subset=["Days_Of_Cover"]).sort_values("Days_Of_Cover")
+    if point_budget is not None:
+        chart_data = chart_data.head(point_budget)
+    return px.bar(
+        chart_data,
+        x="Product_Name",
+        y="Days_Of_Cover",
+        color="ABC_Category",
+        hover_data=[
+            column for column in ("Store", "Stock", "Reorder_Point") if column in chart_data
+        ],
+        title="Days of Cover by Product",
+        labels={"Days_Of_Cover": "Days of Cover", "Product_Name": "Product"},
+    )
+
+
+@profiled("figure.customer_spending")
+def customer_spending_figure(customers, point_budget=DEFAULT_POINT_BUDGET):
+    chart_data = top_n(customers, "Customer_ID", "Total_Spent", point_budget)
+    return px.bar(
+        chart_data, x="Customer_ID", y="Total_Spent", title="Total Spending per Customer"
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def warm_up():
+    """Build a throwaway figure once per process, loading Plotly's templates."""
+    px.bar(pd.DataFrame({"x": [0], "y": [0]}), x="x", y="y").to_plotly_json()
@@ -0,0 +1,567 @@
+"""Running order aggregates that can be extended with new order batches.
+
+ABC classes, RFM scores, the sales trends, the acquisition cohorts and the
+inventory coverage only depend on a handful of small aggregates: sales and
+units sold per product, first and last order date, order count and spend
+per customer, and sales per day and per ISO week. ``OrderAggregates`` keeps
+those aggregates, folds new order batches into them and re-derives the
+analyses from them, so a refresh costs time proportional to the new batch
+instead of the full order history.
+
+The aggregates also carry the summaries of the approximate mode (see
+``coffeepoint.sketches``): the heavy-hitter products and the sketches of the
+customers' RFM metrics are built with every chunk and merged with the rest.
+"""
+import hashlib
+import json
+import os
+
+import pandas as pd
+import pyarrow.feather as feather
+
+from .cohorts import cohort_retention
+from .jobs import report_progress, track
+from .products import ABC_THRESHOLDS, abc_table
+from .profiling import profiled
+from .registry import Registry
+from .rfm import DEFAULT_SEGMENT, SEGMENT_RULES, score_metrics
+from .sketches import (
+    DEFAULT_CAPACITY,
+    DEFAULT_RELATIVE_ACCURACY,
+    CustomerSketches,
+    HeavyHitters,
+    approximate_abc,
+    approximate_rfm,
+)
+from .trends import (
+    ROLLING_WINDOWS,
+    daily_buckets,
+    daily_frame,
+    rolling_sales,
+    sales_amount,
+    weekly_buckets,
+    weekly_frame,
+)
+
+# Layout of saved aggregates; older saves are rebuilt from the orders
+FORMAT_VERSION = 3
+
+# Partial aggregates held before they are combined, when folding chunks
+MERGE_BATCH = 16
+
+# Order columns needed to build the aggregates
+ORDER_COLUMNS = [
+    "Order_ID", "Order_Date", "Customer_ID", "Product_ID", "Quantity", "Price", "Sales_Amount"
+]
+
+
+def _plain_index(data):
+    # Categorical group keys would not align between batches with different categories
+    if isinstance(data.index, pd.CategoricalIndex):
+        data = data.copy(deep=False)
+        data.index = data.index.astype(data.index.categories.dtype)
+    return data
+
+
+def batch_key(orders):
+    """Return a content hash identifying an order batch."""
+    hashed = pd.util.hash_pandas_object(orders[ORDER_COLUMNS], index=False)
+    return format(int(hashed.sum()) & 0xFFFFFFFFFFFFFFFF, "016x")
+
+
+class OrderAggregates:
+    """Mergeable per-product, per-customer and per-period order aggregates."""
+
+    def __init__(
+        self,
+        product_sales=None,
+        customers=None,
+        daily=None,
+        weekly=None,
+        rows=0,
+        batches=(),
+        product_units=None,
+        sketches=None,
+        hitters=None,
+    ):
+        self.product_sales = (
+            product_sales if product_sales is not None else pd.Series(dtype="float64")
+        )
+        # Units sold per product; filtered views (see coffeepoint.orders) have none
+        self.product_units = (
+            product_units if product_units is not None else pd.Series(dtype="int64")
+        )
+        self.customers = (
+            customers
+            if customers is not None
+            else pd.DataFrame(
+                {
+                    "First_Order": pd.Series(dtype="datetime64[ns]"),
+                    "Last_Order": pd.Series(dtype="datetime64[ns]"),
+                    "Frequency": pd.Series(dtype="int64"),
+                    "Monetary": pd.Series(dtype="float64"),
+                }
+            )
+        )
+        self.daily = daily if daily is not None else pd.Series(dtype="float64")
+        self.weekly = weekly if weekly is not None else pd.Series(dtype="float64")
+        self.rows = rows
+        self.batches = set(batches)
+        # Rolling sales tables by window lengths, kept up to date by ``update``
+        self._rolling = {}
+        # Summaries of the approximate mode; built from the tables above when
+        # missing (e.g. for filtered views)
+        self._sketches = sketches
+        self._hitters = hitters
+
+    @classmethod
+    def from_orders(cls, orders):
+        """Aggregate a frame of orders with the ORDER_COLUMNS columns."""
+        amount = sales_amount(orders)
+        product_sales = amount.groupby(orders["Product_ID"], observed=True).sum()
+        # Quantities are downcast on load; sum them as int64
+        product_units = (
+            orders["Quantity"].astype("int64").groupby(orders["Product_ID"], observed=True).sum()
+        )
+        customers = (
+            orders.assign(Sales_Amount=amount)
+            .groupby("Customer_ID", observed=True)
+            .agg(
+                First_Order=("Order_Date", "min"),
+                Last_Order=("Order_Date", "max"),
+                Frequency=("Order_ID", "count"),
+                Monetary=("Sales_Amount", "sum"),
+            )
+        )
+        product_sales, customers = _plain_index(product_sales), _plain_index(customers)
+        return cls(
+            product_sales,
+            customers,
+            daily_buckets(orders),
+            weekly_buckets(orders),
+            rows=len(orders),
+            product_units=_plain_index(product_units),
+            sketches=CustomerSketches.from_customers(customers),
+            hitters=HeavyHitters.from_weights(product_sales.index, product_sales.to_numpy()),
+        )
+
+    @classmethod
+    def from_chunks(cls, chunks, aggregate=None):
+        """Fold an iterable of order frames, holding one chunk at a time.
+
+        Every chunk is aggregated on its own (with ``aggregate``, by default
+        ``from_orders``) and the partial aggregates are combined
+        ``MERGE_BATCH`` at a time, each batch in a single ``merge_all`` pass.
+        """
+        aggregate = aggregate or cls.from_orders
+        parts = []
+        for chunk in chunks:
+            parts.append(aggregate(chunk))
+            if len(parts) > MERGE_BATCH:
+                parts = [cls.merge_all(parts)]
+        return cls.merge_all(parts)
+
+    @classmethod
+    def merge_all(cls, parts):
+        """Return the aggregates of many order sets combined in one pass."""
+        parts = list(parts)
+        batches = set().union(*(part.batches for part in parts))
+        parts = [part for part in parts if part.rows]
+        if len(parts) <= 1:
+            source = parts[0] if parts else cls()
+            return cls(
+                source.product_sales,
+                source.customers,
+                source.daily,
+                source.weekly,
+                rows=source.rows,
+                batches=batches,
+                product_units=source.product_units,
+                sketches=source._sketches,
+                hitters=source._hitters,
+            )
+        stacked = pd.concat([part.customers for part in parts])
+        customers = stacked.groupby(level=0).agg(
+            {"First_Order": "min", "Last_Order": "max", "Frequency": "sum", "Monetary": "sum"}
+        )
+
+        def total(series):
+            return pd.concat(series).groupby(level=list(range(series[0].index.nlevels))).sum()
+
+        return cls(
+            total([part.product_sales for part in parts]),
+            customers,
+            total([part.daily for part in parts]),
+            total([part.weekly for part in parts]),
+            rows=sum(part.rows for part in parts),
+            batches=batches,
+            product_units=total([part.product_units for part in parts]),
+            **_merged_summaries(parts, stacked, customers),
+        )
+
+    def merge(self, other):
+        """Return the aggregates of both order sets combined."""
+        batches = self.batches | other.batches
+        # Empty aggregates carry no index names to align on
+        if not self.rows or not other.rows:
+            source = other if not self.rows else self
+            return OrderAggregates(
+                source.product_sales,
+                source.customers,
+                source.daily,
+                source.weekly,
+                rows=source.rows,
+                batches=batches,
+                product_units=source.product_units,
+                sketches=source._sketches,
+                hitters=source._hitters,
+            )
+        stacked = pd.concat([self.customers, other.customers])
+        customers = stacked.groupby(level=0).agg(
+            {"First_Order": "min", "Last_Order": "max", "Frequency": "sum", "Monetary": "sum"}
+        )
+        return OrderAggregates(
+            self.product_sales.add(other.product_sales, fill_value=0),
+            customers,
+            self.daily.add(other.daily, fill_value=0),
+            self.weekly.add(other.weekly, fill_value=0),
+            rows=self.rows + other.rows,
+            batches=batches,
+            product_units=self.product_units.add(other.product_units, fill_value=0).astype(
+                "int64"
+            ),
+            **_merged_summaries([self, other], stacked, customers),
+        )
+
+    @property
+    def version(self):
+        """Identify the orders folded in so far; changes with every new batch."""
+        state = f"{self.rows}:{','.join(sorted(self.batches))}"
+        return hashlib.blake2b(state.encode(), digest_size=8).hexdigest()
+
+    @property
+    def first_date(self):
+        return pd.Timestamp(self.daily.index.min()) if len(self.daily) else None
+
+    @property
+    def last_date(self):
+        return pd.Timestamp(self.daily.index.max()) if len(self.daily) else None
+
+    def update(self, batch):
+        """Fold a batch of new orders in place.
+
+        Returns False, without changing anything, if the identical batch was
+        already folded in.
+        """
+        key = batch_key(batch)
+        if key in self.batches:
+            return False
+        merged = self.merge(OrderAggregates.from_orders(batch))
+        rolling = self._rolling
+        self.__dict__.update(merged.__dict__)
+        self.batches.add(key)
+        # Only the days from the batch's first order date onward change
+        since = batch["Order_Date"].min()
+        if not pd.isna(since):
+            self._rolling = {
+                windows: rolling_sales(self.daily, windows, previous=frame, since=since)
+                for windows, frame in rolling.items()
+            }
+        return True
+
+    # Derived analyses -----------------------------------------------------
+
+    @profiled("abc_table", rows=len)
+    def abc(self, products=None, thresholds=ABC_THRESHOLDS):
+        """Return the ABC table, keyed by product name given a ``ProductIndex``."""
+        sales = self.product_sales
+        if products is not None:
+            sales = products.sales_by_name(sales)
+        return abc_table(sales, thresholds)
+
+    @profiled("approximate_abc", rows=len)
+    def approximate_abc(self, products=None, thresholds=ABC_THRESHOLDS, capacity=DEFAULT_CAPACITY):
+        """Return the ABC table of the heavy-hitter products, see ``sketches``."""
+        return approximate_abc(self.product_hitters(products, capacity), thresholds)
+
+    def hitters(self, capacity=DEFAULT_CAPACITY):
+        """Return the heavy-hitter summary of sales per Product_ID."""
+        if self._hitters is None:
+            self._hitters = HeavyHitters.from_weights(
+                self.product_sales.index, self.product_sales.to_numpy()
+            )
+        if capacity > self._hitters.capacity:
+            # More products than the kept summary holds
+            return HeavyHitters.from_weights(
+                self.product_sales.index, self.product_sales.to_numpy(), capacity
+            )
+        if capacity < self._hitters.capacity:
+            return HeavyHitters(capacity).merge(self._hitters)
+        return self._hitters
+
+    def product_hitters(self, products=None, capacity=DEFAULT_CAPACITY):
+        """Summarize sales per product, keyed by name given a ``ProductIndex``."""
+        hitters = self.hitters(capacity)
+        if products is None:
+            return hitters
+        return hitters.relabel(products.names_of(hitters.keys), products.ids_per_name)
+
+    def customer_sketches(self, relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+        """Return the ``CustomerSketches`` of the customers' RFM metrics."""
+        if self._sketches is None:
+            self._sketches = CustomerSketches.from_customers(self.customers)
+        if relative_accuracy != self._sketches.relative_accuracy:
+            return CustomerSketches.from_customers(self.customers, relative_accuracy)
+        return self._sketches
+
+    def customer_metrics(self):
+        """Return Recency (days), Frequency and Monetary per customer."""
+        last = self.customers["Last_Order"]
+        metrics = pd.DataFrame(
+            {
+                "Recency": (last.max() - last).dt.days,
+                "Frequency": self.customers["Frequency"],
+                "Monetary": self.customers["Monetary"],
+            }
+        )
+        metrics.index.name = "Customer_ID"
+        return metrics
+
+    @profiled("rfm_scores", rows=len)
+    def rfm(self, quantiles=4, rules=SEGMENT_RULES, default=DEFAULT_SEGMENT):
+        """Return the per-customer RFM table, as ``rfm.rfm_table`` would."""
+        report_progress(0.0, "Computing customer metrics")
+        metrics = self.customer_metrics()
+        report_progress(0.5, "Scoring customers")
+        return score_metrics(metrics, quantiles, rules, default)
+
+    @profiled("approximate_rfm", rows=len)
+    def approximate_rfm(
+        self,
+        quantiles=4,
+        rules=SEGMENT_RULES,
+        default=DEFAULT_SEGMENT,
+        relative_accuracy=DEFAULT_RELATIVE_ACCURACY,
+    ):
+        """Return the RFM table scored against sketched boundaries, see ``sketches``."""
+        report_progress(0.0, "Computing customer metrics")
+        return approximate_rfm(
+            self.customer_metrics(),
+            quantiles,
+            rules,
+            default,
+            sketches=self.customer_sketches(relative_accuracy),
+        )
+
+    @profiled("daily_sales", rows=len)
+    def daily_sales(self):
+        return daily_frame(self.daily)
+
+    @profiled("weekly_sales", rows=len)
+    def weekly_sales(self):
+        return weekly_frame(self.weekly)
+
+    @profiled("rolling_sales", rows=len)
+    def rolling_sales(self, windows=ROLLING_WINDOWS):
+        """Return rolling sales and week-over-week growth per day.
+
+        The table is kept and extended by ``update`` with the days of new
+        batches instead of being recomputed over the whole history.
+        """
+        windows = tuple(windows)
+        frame = self._rolling.get(windows)
+        if frame is None:
+            frame = self._rolling[windows] = rolling_sales(self.daily, windows)
+        return frame
+
+    @profiled("cohort_retention", rows=len)
+    def cohort_retention(self):
+        """Return the monthly acquisition cohort retention matrix."""
+        return cohort_retention(self.customers)
+
+    # Persistence ----------------------------------------------------------
+
+    def save(self, path):
+        """Persist the aggregates as Arrow files in a directory."""
+        os.makedirs(path, exist_ok=True)
+        frames = {
+            "products": self.product_sales.rename("Sales").rename_axis("Product_ID").reset_index(),
+            "units": self.product_units.rename("Units").rename_axis("Product_ID").reset_index(),
+            "customers": self.customers.rename_axis("Customer_ID").reset_index(),
+            "daily": self.daily.rename("Sales").rename_axis("Order_Date").reset_index(),
+            "weekly": self.weekly.rename("Sales").reset_index(),
+        }
+        # Replace each file atomically; meta.json goes last and marks a complete save
+        for name, frame in frames.items():
+            target = os.path.join(path, f"{name}.arrow")
+            feather.write_feather(frame, target + ".tmp")
+            os.replace(target + ".tmp", target)
+        summaries = {
+            "customers": self.customer_sketches().to_dict(),
+            "products": self.hitters().to_dict(),
+        }
+        with open(os.path.join(path, "sketches.json.tmp"), "w") as handle:
+            # Product IDs may be NumPy scalars
+            json.dump(summaries, handle, default=lambda value: value.item())
+        os.replace(os.path.join(path, "sketches.json.tmp"), os.path.join(path, "sketches.json"))
+        meta = {"format": FORMAT_VERSION, "rows": self.rows, "batches": sorted(self.batches)}
+        with open(os.path.join(path, "meta.json.tmp"), "w") as handle:
+            json.dump(meta, handle)
+        os.replace(os.path.join(path, "meta.json.tmp"), os.path.join(path, "meta.json"))
+
+    @classmethod
+    def load(cls, path):
+        """Load aggregates saved with ``save``."""
+
+        def read(name):
+            return feather.read_table(os.path.join(path, f"{name}.arrow")).to_pandas()
+
+        with open(os.path.join(path, "meta.json")) as handle:
+            meta = json.load(handle)
+        try:
+            with open(os.path.join(path, "sketches.json")) as handle:
+                summaries = json.load(handle)
+        except OSError:
+            # Saved before the summaries were kept; they are built on first use
+            summaries = None
+        return cls(
+            read("products").set_index("Product_ID")["Sales"].rename(None),
+            read("customers").set_index("Customer_ID"),
+            read("daily").set_index("Order_Date")["Sales"].rename(None),
+            read("weekly").set_index(["Year", "Week_Number"])["Sales"].rename(None),
+            rows=meta["rows"],
+            batches=meta["batches"],
+            product_units=read("units").set_index("Product_ID")["Units"].rename(None),
+            sketches=summaries and CustomerSketches.from_dict(summaries["customers"]),
+            hitters=summaries and HeavyHitters.from_dict(summaries["products"]),
+        )
+
+
+def _merged_summaries(parts, stacked, customers):
+    # The summaries of the combined parts: merged as they are, then the
+    # partial metrics of the customers found in several parts (``stacked``)
+    # are replaced by their combined metrics (``customers``)
+    sketches, hitters = parts[0].customer_sketches(), parts[0].hitters()
+    for part in parts[1:]:
+        sketches = sketches.merge(part.customer_sketches())
+        hitters = hitters.merge(part.hitters())
+    shared = stacked.index.duplicated(keep=False)
+    if shared.any():
+        sketches.remove(stacked[shared])
+        sketches.add(customers.loc[stacked.index[shared].unique()])
+    return {"sketches": sketches, "hitters": hitters}
+
+
+# Running aggregates of recently used datasets, keyed by fingerprint
+_registry = Registry()
+# Appended order batches of datasets without a sidecar, keyed by fingerprint.
+# Unlike the aggregates they cannot be derived again, so they are never
+# evicted; ``forget`` drops them.
+_appended = {}
+
+
+def _aggregates_path(dataset):
+    # Aggregates live next to the dataset's sidecar files when it has any
+    path = getattr(dataset, "path", None)
+    return os.path.join(path, "aggregates") if path is not None else None
+
+
+def _saved_format(path):
+    try:
+        with open(os.path.join(path, "meta.json")) as handle:
+            return json.load(handle).get("format", 1)
+    except OSError:
+        return None
+
+
+@profiled("aggregate", rows=lambda aggregates: aggregates.rows)
+def _build_aggregates(dataset):
+    stores = getattr(dataset, "stores", None)
+    if stores is not None:
+        # A chain merges the aggregates of its stores, which the per-store
+        # views share (see coffeepoint.federation)
+        aggregates = OrderAggregates.merge_all(
+            dataset_aggregates(store) for store in track(stores.values(), len(stores))
+        )
+        _fold_appended(dataset, aggregates)
+        return aggregates
+    path = _aggregates_path(dataset)
+    saved = _saved_format(path) if path is not None else None
+    if saved == FORMAT_VERSION:
+        aggregates = OrderAggregates.load(path)
+        # Batches stored after the last save of the aggregates
+        if _fold_appended(dataset, aggregates):
+            aggregates.save(path)
+        return aggregates
+    # Imported here: the parallel backends are built on OrderAggregates
+    from .parallel import default_backend
+
+    aggregates = default_backend().aggregate_dataset(dataset)
+    _fold_appended(dataset, aggregates)
+    if path is not None:
+        aggregates.save(path)
+    return aggregates
+
+
+def _fold_appended(dataset, aggregates):
+    # Aggregates built from the dataset's own orders, e.g. again after they
+    # were evicted, lack the appended batches; batches already folded in
+    # are skipped
+    changed = False
+    for batch in appended_batches(dataset):
+        changed |= aggregates.update(batch)
+    return changed
+
+
+def dataset_aggregates(dataset):
+    """Return the running aggregates of a dataset, building them on first use."""
+    return _registry.get_or_create(dataset.fingerprint, lambda: _build_aggregates(dataset))
+
+
+def append_orders(dataset, batch):
+    """Fold a batch of new orders into the dataset's running aggregates.
+
+    Returns False if the batch had already been folded in.
+    """
+    # Built before taking the lock, so other datasets' lookups do not wait for it
+    aggregates = dataset_aggregates(dataset)
+    with _registry.lock:
+        if not aggregates.update(batch[ORDER_COLUMNS]):
+            return False
+        path = _aggregates_path(dataset)
+        if path is None:
+            _appended.setdefault(dataset.fingerprint, []).append(batch[ORDER_COLUMNS])
+        else:
+            # The batch itself is kept for the order index (see coffeepoint.orders)
+            os.makedirs(os.path.join(path, "batches"), exist_ok=True)
+            target = os.path.join(path, "batches", f"{batch_key(batch)}.arrow")
+            feather.write_feather(batch[ORDER_COLUMNS].reset_index(drop=True), target + ".tmp")
+            os.replace(target + ".tmp", target)
+            aggregates.save(path)
+        return True
+
+
+def appended_batches(dataset):
+    """Return the order batches appended to a dataset so far."""
+    path = _aggregates_path(dataset)
+    if path is None:
+        with _registry.lock:
+            return list(_appended.get(dataset.fingerprint, ()))
+    directory = os.path.join(path, "batches")
+    if not os.path.isdir(directory):
+        return []
+    return [
+        feather.read_table(os.path.join(directory, name)).to_pandas()
+        for name in sorted(os.listdir(directory))
+        if name.endswith(".arrow")
+    ]
+
+
+def forget(fingerprint=None):
+    """Drop cached aggregates for one dataset, or for all datasets."""
+    with _registry.lock:
+        _registry.discard(fingerprint)
+        if fingerprint is None:
+            _appended.clear()
+        else:
+            _appended.pop(fingerprint, None)
@@ -0,0 +1,258 @@
+"""Inventory coverage: stock levels joined with the sales velocity of orders.
+
+For every product of the inventory, ``coverage`` derives from its stock and
+its sales velocity (units sold per day over the order history):
+
+- Days_Of_Cover: how many days the stock lasts at that velocity;
+- Reorder_Point: the stock at which to reorder, i.e. the units sold during
+  the supplier lead time plus safety stock. Safety stock is weighted by the
+  product's ABC category, so best sellers (A) get the most days of it;
+- Stockout_Date: the day the stock runs out, counted from the last order.
+
+The computation is split in two: ``SalesVelocity`` holds everything derived
+from the orders and is built once per version of the running aggregates,
+while the stock-dependent columns are a few vectorized array operations over
+all products. New stock levels (``update_stock``) therefore recompute
+coverage without touching the order history. Updated stock is saved next to
+the dataset's sidecar files, or kept in memory for datasets without any. A
+chain gets the coverage of every store, each against its own stock and
+velocity.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from .federation import STORE_COLUMN
+from .incremental import dataset_aggregates
+from .products import abc_table, product_index
+from .profiling import profiled
+from .registry import Registry
+from .settings import ABC_THRESHOLDS
+
+# Days between placing an order with the supplier and the delivery
+LEAD_TIME_DAYS = 7
+# Days of safety stock on top of the lead time demand, per ABC category
+SAFETY_DAYS = (("A", 7), ("B", 4), ("C", 2))
+
+
+class SalesVelocity:
+    """Units sold per day and ABC category of every product of a ``ProductIndex``.
+
+    Arrays are aligned with the product codes. Products without orders have
+    zero velocity and category C; the others are classified with the ABC
+    ``thresholds``.
+    """
+
+    def __init__(self, products, aggregates, thresholds=ABC_THRESHOLDS):
+        units = aggregates.product_units
+        sales = aggregates.product_sales
+        self.units = products.totals(units.index, units.to_numpy()).astype(np.int64)
+        self.sales = products.totals(sales.index, sales.to_numpy())
+        daily = aggregates.daily
+        if len(daily):
+            # Days observed, from the first to the last order date
+            self.as_of = pd.Timestamp(daily.index.max()).normalize()
+            self.days = (self.as_of - pd.Timestamp(daily.index.min()).normalize()).days + 1
+        else:
+            self.as_of, self.days = pd.NaT, 0
+        self.velocity = self.units / self.days if self.days else np.zeros(len(products))
+
+        # Category codes 0..2 for A..C, by cumulative share of sales
+        sold = np.flatnonzero(self.sales > 0)
+        table = abc_table(pd.Series(self.sales[sold], index=sold), thresholds)
+        self.category_codes = np.full(len(products), 2, dtype=np.int8)
+        self.category_codes[table["Product"].to_numpy()] = table["Category"].cat.codes
+
+    def __len__(self):
+        return len(self.velocity)
+
+
+@profiled("inventory_coverage", rows=len)
+def coverage(
+    products, velocity, stock=None, lead_time_days=LEAD_TIME_DAYS, safety_days=SAFETY_DAYS
+):
+    """Return days of cover, reorder point and stockout date of every product.
+
+    ``stock`` is aligned with the codes of ``products`` and defaults to the
+    inventory's stock. Days_Of_Cover and Stockout_Date are missing for
+    products that did not sell.
+    """
+    stock = products.stock if stock is None else stock
+    rate = velocity.velocity
+    selling = rate > 0
+    cover = np.full(len(rate), np.nan)
+    cover[selling] = np.maximum(stock[selling], 0) / rate[selling]
+    safety = np.array([days for _, days in safety_days], dtype=np.float64)
+    reorder_point = np.ceil(rate * (lead_time_days + safety[velocity.category_codes]))
+    stockout = velocity.as_of + pd.to_timedelta(np.floor(cover), unit="D")
+    return pd.DataFrame(
+        {
+            "Product_ID": np.asarray(products.ids),
+            "Product_Name": products.names[products.name_codes],
+            "Category": products.categories[products.category_codes],
+            "ABC_Category": pd.Categorical.from_codes(
+                velocity.category_codes, categories=[label for label, _ in safety_days]
+            ),
+            "Stock": stock,
+            "Units_Sold": velocity.units,
+            "Daily_Velocity": rate,
+            "Days_Of_Cover": cover,
+            "Reorder_Point": reorder_point.astype(np.int64),
+            "Reorder": selling & (stock <= reorder_point),
+            "Stockout_Date": stockout,
+        }
+    )
+
+
+# Sales velocities of recently used datasets, keyed by fingerprint, version and
+# ABC thresholds
+_velocities = Registry(size=16)
+# Update counters and stock levels of the datasets, keyed by fingerprint
+_stock = Registry(size=64)
+# Updated stock levels of datasets without a sidecar, keyed by fingerprint.
+# They cannot be read again from the dataset, so they are never evicted;
+# ``forget`` drops them.
+_updated = {}
+
+
+@profiled("sales_velocity", rows=len)
+def _build_velocity(dataset, thresholds):
+    return SalesVelocity(product_index(dataset), dataset_aggregates(dataset), thresholds)
+
+
+def sales_velocity(dataset, thresholds=ABC_THRESHOLDS):
+    """Return the sales velocity of a dataset's products, built once per order version."""
+    thresholds = tuple(thresholds)
+    key = (dataset.fingerprint, dataset_aggregates(dataset).version, thresholds)
+    return _velocities.get_or_create(key, lambda: _build_velocity(dataset, thresholds))
+
+
+def _stock_path(dataset):
+    # Updated stock lives next to the dataset's sidecar files when it has any
+    path = getattr(dataset, "path", None)
+    return os.path.join(path, "stock.arrow") if path is not None else None
+
+
+def _load_stock(dataset):
+    products = product_index(dataset)
+    path = _stock_path(dataset)
+    if path is None or not os.path.exists(path):
+        return 0, products.stock
+    table = feather.read_table(path)
+    version = int(table.schema.metadata[b"version"])
+    levels = table.to_pandas()
+    # Saved levels are aligned by Product_ID, the product codes may differ
+    stock = products.stock.copy()
+    codes = products.codes(levels["Product_ID"])
+    known = codes >= 0
+    stock[codes[known]] = levels["Stock"].to_numpy(np.int64)[known]
+    return version, stock
+
+
+def _save_stock(dataset, entry):
+    path = _stock_path(dataset)
+    version, stock = entry
+    table = pa.table({"Product_ID": np.asarray(product_index(dataset).ids), "Stock": stock})
+    table = table.replace_schema_metadata({"version": str(version)})
+    feather.write_feather(table, path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+
+def _stock_entry(dataset):
+    entry = _updated.get(dataset.fingerprint)
+    if entry is not None:
+        return entry
+    return _stock.get_or_create(dataset.fingerprint, lambda: _load_stock(dataset))
+
+
+def stock_levels(dataset):
+    """Return the current stock of a dataset's products, aligned with its product codes."""
+    return _stock_entry(dataset)[1]
+
+
+def stock_version(dataset):
+    """Return how often the stock levels of a dataset (or of a chain's stores) were updated."""
+    stores = getattr(dataset, "stores", None)
+    if stores is not None:
+        return tuple(stock_version(store) for store in stores.values())
+    return _stock_entry(dataset)[0]
+
+
+def update_stock(dataset, levels):
+    """Replace stock levels from a frame with Product_ID and Stock columns.
+
+    Products not listed keep their stock, unknown products are ignored. The
+    stock of a product listed twice is summed. For a chain, ``levels`` needs
+    a Store column naming the store of every row; without it ``ValueError``
+    is raised. Returns the number of products updated.
+    """
+    stores = getattr(dataset, "stores", None)
+    if stores is not None:
+        if STORE_COLUMN not in levels.columns:
+            raise ValueError(
+                f"Stock levels of several stores need a {STORE_COLUMN} column "
+                f"naming the store of every row ({', '.join(stores)})"
+            )
+        return sum(
+            update_stock(stores[name], rows)
+            for name, rows in levels.groupby(STORE_COLUMN, observed=True)
+            if name in stores
+        )
+    products = product_index(dataset)
+    totals = pd.Series(levels["Stock"].to_numpy(np.int64)).groupby(
+        products.codes(levels["Product_ID"])
+    ).sum()
+    totals = totals[totals.index >= 0]
+    with _stock.lock:
+        version, stock = _stock_entry(dataset)
+        # Coverage computed from the previous levels keeps its own array
+        stock = stock.copy()
+        stock[totals.index.to_numpy()] = totals.to_numpy()
+        entry = (version + 1, stock)
+        if _stock_path(dataset) is None:
+            _updated[dataset.fingerprint] = entry
+        else:
+            _save_stock(dataset, entry)
+        _stock.put(dataset.fingerprint, entry)
+    return len(totals)
+
+
+def forget(fingerprint=None):
+    """Drop the stock levels held in memory for one dataset, or for all datasets."""
+    with _stock.lock:
+        _stock.discard(fingerprint)
+        if fingerprint is None:
+            _updated.clear()
+        else:
+            _updated.pop(fingerprint, None)
+
+
+def inventory_coverage(
+    dataset, lead_time_days=LEAD_TIME_DAYS, safety_days=SAFETY_DAYS, abc_thresholds=ABC_THRESHOLDS
+):
+    """Return the coverage of a dataset's inventory at its current stock levels.
+
+    Products are classified into ABC categories with ``abc_thresholds``. A
+    chain returns the coverage of every store, with a Store column.
+    """
+    stores = getattr(dataset, "stores", None)
+    if stores is not None:
+        frames = [
+            inventory_coverage(store, lead_time_days, safety_days, abc_thresholds).assign(
+                **{STORE_COLUMN: name}
+            )
+            for name, store in stores.items()
+        ]
+        frame = pd.concat(frames, ignore_index=True)
+        frame[STORE_COLUMN] = pd.Categorical(frame[STORE_COLUMN], categories=list(stores))
+        return frame[[STORE_COLUMN] + [column for column in frame if column != STORE_COLUMN]]
+    return coverage(
+        product_index(dataset),
+        sales_velocity(dataset, abc_thresholds),
+        stock_levels(dataset),
+        lead_time_days,
+        safety_days,
+    )
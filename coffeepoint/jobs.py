@@ -0,0 +1,173 @@
+"""Background execution of slow computations, with progress and cancellation.
+
+Streamlit runs the app script on the thread of the session, so a large parse
+or RFM job blocks every later interaction of that session until it finishes.
+The app submits such computations to the process-wide ``job_runner`` instead
+and renders their progress while they run.
+
+Jobs cooperate through checkpoints: long stages call ``report_progress``,
+which records the progress of the job running on the current thread and
+raises ``Cancelled`` once the job has been cancelled. Outside of a job the
+checkpoints do nothing, so the analysis code runs unchanged in batch use.
+
+``SessionJobs`` tracks the jobs of one session. Jobs a script run no longer
+asks for, because the user navigated to another page or uploaded another
+file, are cancelled at the end of the run.
+
+The number of worker threads is set by ``COFFEEPOINT_JOB_THREADS``.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_THREADS = 4
+
+
+class Cancelled(Exception):
+    """Raised at a checkpoint of a job that was cancelled."""
+
+
+_local = threading.local()
+
+
+def current_job():
+    """Return the job running on this thread, or None."""
+    return getattr(_local, "job", None)
+
+
+def report_progress(fraction, message=None):
+    """Record the progress of the current job and stop it if it was cancelled."""
+    job = current_job()
+    if job is None:
+        return
+    job.progress = min(max(float(fraction), 0.0), 1.0)
+    if message is not None:
+        job.message = message
+    job.check()
+
+
+def check_cancelled():
+    """Raise ``Cancelled`` if the job running on this thread was cancelled."""
+    job = current_job()
+    if job is not None:
+        job.check()
+
+
+def track(items, total, message=None):
+    """Yield from ``items``, reporting progress out of ``total`` items."""
+    for done, item in enumerate(items):
+        report_progress(done / total if total else 0.0, message)
+        yield item
+    report_progress(1.0, message)
+
+
+class Job:
+    """A computation submitted to a ``JobRunner``."""
+
+    def __init__(self, key, function):
+        self.key = key
+        self.function = function
+        self.progress = 0.0
+        self.message = None
+        self.future = None
+        self._cancelled = threading.Event()
+
+    def run(self):
+        previous, _local.job = current_job(), self
+        try:
+            self.check()
+            return self.function()
+        finally:
+            _local.job = previous
+
+    def check(self):
+        if self._cancelled.is_set():
+            raise Cancelled(self.key)
+
+    def cancel(self):
+        """Stop the job: drop it if queued, or at its next checkpoint if running."""
+        self._cancelled.set()
+        self.future.cancel()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def done(self):
+        return self.future.done()
+
+    def result(self, timeout=None):
+        """Return the job's result, waiting at most ``timeout`` seconds.
+
+        Raises ``concurrent.futures.TimeoutError`` if it is still running.
+        """
+        return self.future.result(timeout)
+
+
+class JobRunner:
+    """A pool of threads running jobs in the background."""
+
+    def __init__(self, threads=DEFAULT_THREADS):
+        self.threads = threads
+        self._executor = ThreadPoolExecutor(threads, thread_name_prefix="coffeepoint-job")
+
+    def submit(self, key, function):
+        job = Job(key, function)
+        job.future = self._executor.submit(job.run)
+        return job
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Process-wide runner shared by every Streamlit session
+job_runner = JobRunner(int(os.environ.get("COFFEEPOINT_JOB_THREADS") or DEFAULT_THREADS))
+
+
+class SessionJobs:
+    """The background jobs of one session, keyed by what they compute.
+
+    Call ``begin_run`` at the start and ``end_run`` at the end of every
+    script run; jobs not requested in between are cancelled.
+    """
+
+    def __init__(self, runner=None):
+        self.runner = runner if runner is not None else job_runner
+        self._jobs = {}
+        self._requested = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._jobs)
+
+    def begin_run(self):
+        with self._lock:
+            self._requested = set()
+
+    def request(self, key, function):
+        """Return the job computing ``key``, submitting ``function`` if there is none."""
+        with self._lock:
+            self._requested.add(key)
+            job = self._jobs.get(key)
+            if job is None or job.cancelled:
+                job = self._jobs[key] = self.runner.submit(key, function)
+            return job
+
+    def release(self, key):
+        """Forget a finished job once its result has been used."""
+        with self._lock:
+            self._jobs.pop(key, None)
+
+    def end_run(self):
+        """Cancel the jobs this run did not ask for."""
+        with self._lock:
+            unused = [key for key in self._jobs if key not in self._requested]
+            for key in unused:
+                self._jobs.pop(key).cancel()
+
+    def cancel_all(self):
+        with self._lock:
+            for job in self._jobs.values():
+                job.cancel()
+            self._jobs.clear()
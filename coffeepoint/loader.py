@@ -0,0 +1,305 @@
+"""Cached, fingerprinted loading of Coffee Point workbooks.
+
+Parsing an Excel workbook through openpyxl is by far the slowest step of the
+app, and Streamlit reruns the whole script on every widget interaction. The
+loader hashes the uploaded bytes, parses each sheet once and keeps the parsed
+frames in a process-wide LRU cache bounded by memory size and by the number
+of workbooks, so every session that opens the same file reuses the same
+frames.
+
+When a sidecar store is configured (for the app, by setting
+``COFFEEPOINT_STORE_DIR``), the parsed sheets are also persisted as Arrow
+files (see ``coffeepoint.store``) and later sessions skip openpyxl entirely.
+
+Several workbooks, such as one per store, are loaded with ``load_many``: the
+ones not cached yet are parsed side by side on the worker processes of the
+execution backend (see ``coffeepoint.parallel``). When that backend is serial,
+a pool of ``min(workbooks, CPUs)`` processes is started for the parse.
+"""
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from .jobs import report_progress
+from .profiling import profiled, profiler
+from .schema import enforce, normalize_columns
+from .store import SidecarStore, store_from_env
+from .streaming import DEFAULT_CHUNK_ROWS
+
+SHEETS = ("Orders", "Inventory", "Customers")
+
+# Upper bound for the parsed frames kept in memory by the default cache
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+# Upper bound for the workbooks kept by the default cache; stored workbooks
+# are memory-mapped and do not count towards the byte budget
+DEFAULT_MAX_ENTRIES = 64
+
+
+def fingerprint(data):
+    """Return a short hex digest identifying the raw workbook bytes."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def frame_nbytes(frame):
+    """Return the in-memory size of a DataFrame, including object payloads."""
+    return int(frame.memory_usage(index=True, deep=True).sum())
+
+
+def read_bytes(source):
+    """Return the raw bytes of an uploaded file, a path or a bytes object."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source)
+    if hasattr(source, "getvalue"):
+        return source.getvalue()
+    if hasattr(source, "read"):
+        return source.read()
+    with open(source, "rb") as handle:
+        return handle.read()
+
+
+class Workbook:
+    """The parsed sheets of one workbook, identified by its fingerprint.
+
+    Cached frames are shared between sessions and must be treated as
+    read-only by the analysis code.
+    """
+
+    def __init__(self, fingerprint, sheets):
+        self.fingerprint = fingerprint
+        self.sheets = sheets
+        self.nbytes = sum(frame_nbytes(frame) for frame in sheets.values())
+
+    def read(self, sheet, columns=None):
+        """Return a sheet, restricted to the requested columns."""
+        frame = self.sheets[sheet]
+        return frame if columns is None else frame[columns]
+
+    def iter_chunks(self, sheet, columns=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """Yield a sheet as frames of at most ``chunk_rows`` rows."""
+        frame = self.read(sheet, columns)
+        for start in range(0, len(frame), chunk_rows):
+            yield frame.iloc[start:start + chunk_rows]
+
+    def head(self, sheet, n=5):
+        return self.sheets[sheet].head(n)
+
+    def rows(self, sheet):
+        return len(self.sheets[sheet])
+
+    @property
+    def orders(self):
+        return self.sheets["Orders"]
+
+    @property
+    def inventory(self):
+        return self.sheets["Inventory"]
+
+    @property
+    def customers(self):
+        return self.sheets["Customers"]
+
+
+@profiled("parse_workbook", rows=lambda workbook: sum(map(len, workbook.sheets.values())))
+def parse_workbook(data, key=None):
+    """Parse every sheet of the workbook bytes into a typed Workbook."""
+    excel = pd.ExcelFile(io.BytesIO(data))
+    sheets = {}
+    for done, name in enumerate(SHEETS):
+        report_progress(done / len(SHEETS), f"Parsing the {name} sheet")
+        sheets[name] = enforce(name, excel.parse(name))
+    return Workbook(key or fingerprint(data), sheets)
+
+
+def _ingest(data, key, root=None):
+    """Worker entry point: parse workbook bytes, storing them under ``root`` if given.
+
+    With a store only the fingerprint travels back to the caller.
+    """
+    workbook = parse_workbook(data, key)
+    if root is None:
+        return workbook
+    SidecarStore(root).write(workbook)
+    return None
+
+
+def read_order_batch(source, name=None):
+    """Read a batch of new orders from a CSV file or a workbook's Orders sheet."""
+    name = name or getattr(source, "name", source)
+    data = io.BytesIO(read_bytes(source))
+    if str(name).lower().endswith(".csv"):
+        orders = pd.read_csv(data)
+    else:
+        orders = pd.read_excel(data, sheet_name="Orders")
+    return enforce("Orders", orders)
+
+
+def read_stock_levels(source, name=None):
+    """Read current stock levels from a CSV file or a workbook's Inventory sheet.
+
+    Only Product_ID and Stock are required; a Store column is kept.
+    """
+    name = name or getattr(source, "name", source)
+    data = io.BytesIO(read_bytes(source))
+    if str(name).lower().endswith(".csv"):
+        levels = pd.read_csv(data)
+    else:
+        levels = pd.read_excel(data, sheet_name="Inventory")
+    levels = normalize_columns("Inventory", levels)
+    missing = [column for column in ("Product_ID", "Stock") if column not in levels.columns]
+    if missing:
+        raise ValueError(f"Stock levels are missing columns: {', '.join(missing)}")
+    return levels.astype({"Product_ID": "int64", "Stock": "int64"})
+
+
+class WorkbookCache:
+    """LRU cache of parsed workbooks bounded by their total memory size and count.
+
+    With a sidecar store, cache misses are served from the store when the
+    workbook was already ingested, and new workbooks are written to it.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, store=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.store = store
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            return sum(workbook.nbytes for workbook in self._entries.values())
+
+    def get(self, key):
+        """Return the cached workbook for a fingerprint, or None."""
+        with self._lock:
+            workbook = self._entries.get(key)
+            if workbook is not None:
+                self._entries.move_to_end(key)
+            return workbook
+
+    def put(self, workbook):
+        """Insert a workbook and evict the least recently used ones."""
+        with self._lock:
+            self._entries[workbook.fingerprint] = workbook
+            self._entries.move_to_end(workbook.fingerprint)
+            self._evict()
+
+    def load(self, source):
+        """Return the parsed workbook for an upload, parsing it only once."""
+        with profiler.stage("load_workbook"):
+            return self._load(source)
+
+    def _load(self, source):
+        data = read_bytes(source)
+        key = fingerprint(data)
+        workbook = self.get(key)
+        if workbook is not None:
+            return workbook
+        if self.store is not None:
+            workbook = self.store.open(key)
+        if workbook is None:
+            # Parse outside the lock so other sessions are not blocked
+            workbook = parse_workbook(data, key)
+            if self.store is not None:
+                workbook = self.store.write(workbook)
+        self.put(workbook)
+        return workbook
+
+    def load_many(self, sources, backend=None):
+        """Return the parsed workbooks of several uploads, in order.
+
+        Workbooks neither cached nor stored are parsed concurrently on the
+        ``backend``. By default that is the process-wide execution backend,
+        or, if it is serial, a pool started for the parse with one process
+        per workbook, up to the number of CPUs.
+        """
+        with profiler.stage("load_workbooks") as stage:
+            datasets = self._load_many(sources, backend)
+            stage.rows = len(datasets)
+        return datasets
+
+    def _load_many(self, sources, backend):
+        # Imported here: the execution backends are built on the aggregates
+        from .parallel import ProcessPoolBackend, default_backend
+
+        blobs = {}
+        keys = []
+        for source in sources:
+            data = read_bytes(source)
+            keys.append(fingerprint(data))
+            blobs.setdefault(keys[-1], data)
+        found = {}
+        for key in blobs:
+            workbook = self.get(key)
+            if workbook is None and self.store is not None:
+                workbook = self.store.open(key)
+            if workbook is not None:
+                found[key] = workbook
+        missing = [key for key in blobs if key not in found]
+        if missing:
+            pool = None
+            if backend is None:
+                backend = default_backend()
+                workers = min(len(missing), os.cpu_count() or 1)
+                if backend.workers <= 1 and workers > 1:
+                    # Parsing dominates loading; do not parse one workbook at a time
+                    backend = pool = ProcessPoolBackend(workers)
+            root = self.store.root if self.store is not None else None
+            try:
+                report_progress(0.0, f"Parsing {len(missing)} workbooks")
+                parsed = backend.map(
+                    _ingest, [blobs[key] for key in missing], missing, [root] * len(missing)
+                )
+                for done, (key, workbook) in enumerate(zip(missing, parsed)):
+                    found[key] = workbook if workbook is not None else self.store.open(key)
+                    report_progress((done + 1) / len(missing))
+            finally:
+                if pool is not None:
+                    pool.close()
+        for key in blobs:
+            self.put(found[key])
+        return [found[key] for key in keys]
+
+    def invalidate(self, key=None, purge=False):
+        """Drop one workbook by fingerprint, or every workbook if key is None.
+
+        With ``purge``, the workbook's sidecar is removed from the store too.
+        """
+        with self._lock:
+            keys = list(self._entries) if key is None else [key]
+            for each in keys:
+                self._entries.pop(each, None)
+        if purge and self.store is not None:
+            for each in keys:
+                self.store.remove(each)
+
+    def _evict(self):
+        # Always keep the most recent entry, even if it alone exceeds the budget
+        total = sum(workbook.nbytes for workbook in self._entries.values())
+        while len(self._entries) > 1 and (
+            total > self.max_bytes or len(self._entries) > self.max_entries
+        ):
+            _, evicted = self._entries.popitem(last=False)
+            total -= evicted.nbytes
+
+
+# Process-wide cache shared by every Streamlit session
+workbook_cache = WorkbookCache(store=store_from_env())
+
+
+def load_workbook(source, cache=None):
+    """Load a workbook through the shared cache."""
+    return (cache if cache is not None else workbook_cache).load(source)
@@ -0,0 +1,386 @@
+"""Date-sorted order index for filtered analyses.
+
+The running aggregates cover the whole order history. To analyze a date
+window, a set of product categories or a set of customers, ``OrderIndex``
+keeps the orders sorted by Order_Date as four flat arrays (date, customer
+code, product code, sales amount). A date window is located by binary search
+(``np.searchsorted``) and only the rows inside it are scanned; category and
+customer filters are boolean masks over that slice. The filtered rows are
+folded into ``OrderAggregates`` with ``np.bincount``, so every analysis
+(ABC, RFM, sales trends) works unchanged on the filtered view.
+
+Datasets with a sidecar keep the sorted arrays in an Arrow file next to the
+other sidecar files; later sessions memory-map it instead of sorting again.
+Appended order batches are sorted on their own and merged into the sorted
+arrays, and the extended index is saved again.
+"""
+import json
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from .incremental import OrderAggregates, appended_batches, batch_key, dataset_aggregates
+from .jobs import report_progress
+from .products import product_index
+from .profiling import profiled
+from .registry import Registry
+from .trends import sales_amount
+
+# Filters of an analysis view; None means unfiltered. Dates are inclusive
+# days, categories and customers are tuples of category names and customer IDs.
+OrderFilter = namedtuple("OrderFilter", ["start", "end", "categories", "customers"])
+OrderFilter.__new__.__defaults__ = (None, None, None, None)
+
+_COLUMNS = ["Order_Date", "Customer_ID", "Product_ID", "Sales_Amount"]
+
+
+def is_filtered(filters):
+    return filters is not None and any(value is not None for value in filters)
+
+
+class OrderIndex:
+    """Orders sorted by date, with dense customer and product codes."""
+
+    def __init__(
+        self,
+        dates,
+        customer_codes,
+        product_codes,
+        amounts,
+        customer_ids,
+        product_ids,
+        batches=(),
+    ):
+        self.dates = dates
+        self.customer_codes = customer_codes
+        self.product_codes = product_codes
+        self.amounts = amounts
+        self.customer_ids = pd.Index(customer_ids, name="Customer_ID")
+        self.product_ids = pd.Index(product_ids, name="Product_ID")
+        # Keys of the appended batches merged in (see incremental.batch_key)
+        self.batches = frozenset(batches)
+
+    def __len__(self):
+        return len(self.dates)
+
+    @classmethod
+    def from_orders(cls, orders):
+        """Build the index from orders with Order_Date, IDs and Sales_Amount."""
+        order = np.argsort(orders["Order_Date"].to_numpy("datetime64[ns]"), kind="stable")
+        customer_codes, customer_ids = pd.factorize(orders["Customer_ID"], sort=True)
+        product_codes, product_ids = pd.factorize(orders["Product_ID"], sort=True)
+        return cls(
+            orders["Order_Date"].to_numpy("datetime64[ns]")[order],
+            customer_codes.astype(np.int32)[order],
+            product_codes.astype(np.int32)[order],
+            sales_amount(orders).to_numpy(np.float64)[order],
+            np.asarray(customer_ids),
+            np.asarray(product_ids),
+        )
+
+    def extend(self, orders, key):
+        """Return the index with a batch of orders merged in, under its batch key.
+
+        Only the batch is sorted; its rows are inserted into the sorted
+        arrays after the orders of the same date. IDs not seen before get
+        new codes after the existing ones.
+        """
+        batch = OrderIndex.from_orders(orders)
+        customer_ids, customer_codes = _extend_keys(self.customer_ids, batch.customer_ids)
+        product_ids, product_codes = _extend_keys(self.product_ids, batch.product_ids)
+        positions = np.searchsorted(self.dates, batch.dates, side="right")
+        return OrderIndex(
+            np.insert(self.dates, positions, batch.dates),
+            np.insert(self.customer_codes, positions, customer_codes[batch.customer_codes]),
+            np.insert(self.product_codes, positions, product_codes[batch.product_codes]),
+            np.insert(self.amounts, positions, batch.amounts),
+            customer_ids,
+            product_ids,
+            self.batches | {key},
+        )
+
+    @property
+    def first_date(self):
+        return pd.Timestamp(self.dates[0]) if len(self) else None
+
+    @property
+    def last_date(self):
+        return pd.Timestamp(self.dates[-1]) if len(self) else None
+
+    def window(self, start=None, end=None):
+        """Return the [lo, hi) row range of orders dated within [start, end] (days)."""
+        lo = 0 if start is None else np.searchsorted(
+            self.dates, np.datetime64(pd.Timestamp(start).normalize(), "ns"), side="left"
+        )
+        if end is None:
+            hi = len(self.dates)
+        else:
+            stop = pd.Timestamp(end).normalize() + pd.Timedelta(days=1)
+            hi = np.searchsorted(self.dates, np.datetime64(stop, "ns"), side="left")
+        return int(lo), int(max(hi, lo))
+
+    def products_in(self, products, categories):
+        """Return, per product code, whether the product is in one of the categories.
+
+        ``products`` is the dataset's ``ProductIndex``; products missing from
+        the inventory belong to no category.
+        """
+        selected = np.isin(np.asarray(products.categories), list(categories))
+        rows = products.codes(self.product_ids)
+        known = rows >= 0
+        result = np.zeros(len(self.product_ids), dtype=bool)
+        result[known] = selected[products.category_codes[rows[known]]]
+        return result
+
+    def customers_in(self, customers):
+        """Return, per customer code, whether the customer is one of the IDs.
+
+        IDs are compared as text, so "42" selects customer 42.
+        """
+        codes = pd.Index(self.customer_ids.astype(str)).get_indexer(
+            [str(customer) for customer in customers]
+        )
+        result = np.zeros(len(self.customer_ids), dtype=bool)
+        result[codes[codes >= 0]] = True
+        return result
+
+    def mask(self, lo, hi, filters, products=None):
+        """Return the category and customer filter mask over rows [lo, hi), or None."""
+        mask = None
+        if filters.categories is not None:
+            mask = self.products_in(products, filters.categories)[self.product_codes[lo:hi]]
+        if filters.customers is not None:
+            selected = self.customers_in(filters.customers)[self.customer_codes[lo:hi]]
+            mask = selected if mask is None else mask & selected
+        return mask
+
+    def aggregates(self, filters, products=None):
+        """Fold the orders matching ``filters`` into ``OrderAggregates``.
+
+        A category filter needs the dataset's ``ProductIndex`` as ``products``.
+        """
+        lo, hi = self.window(filters.start, filters.end)
+        mask = self.mask(lo, hi, filters, products)
+        dates = self.dates[lo:hi]
+        customers = self.customer_codes[lo:hi]
+        product_codes = self.product_codes[lo:hi]
+        amounts = self.amounts[lo:hi]
+        if mask is not None:
+            dates, customers = dates[mask], customers[mask]
+            product_codes, amounts = product_codes[mask], amounts[mask]
+        if not len(dates):
+            return OrderAggregates()
+
+        product_counts = np.bincount(product_codes, minlength=len(self.product_ids))
+        product_sales = np.bincount(product_codes, amounts, minlength=len(self.product_ids))
+        sold = product_counts > 0
+
+        frequency = np.bincount(customers, minlength=len(self.customer_ids))
+        monetary = np.bincount(customers, amounts, minlength=len(self.customer_ids))
+        first = np.full(len(self.customer_ids), np.iinfo(np.int64).max)
+        np.minimum.at(first, customers, dates.view(np.int64))
+        last = np.full(len(self.customer_ids), np.iinfo(np.int64).min)
+        np.maximum.at(last, customers, dates.view(np.int64))
+        active = frequency > 0
+        customer_table = pd.DataFrame(
+            {
+                "First_Order": first[active].view("datetime64[ns]"),
+                "Last_Order": last[active].view("datetime64[ns]"),
+                "Frequency": frequency[active].astype(np.int64),
+                "Monetary": monetary[active],
+            },
+            index=self.customer_ids[active],
+        )
+
+        # Dates are sorted, so every distinct date is one contiguous run
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(dates.view(np.int64))) + 1])
+        daily = pd.Series(
+            np.add.reduceat(amounts, starts),
+            index=pd.DatetimeIndex(dates[starts], name="Order_Date"),
+        )
+        days = daily.index.to_series()
+        weekly = daily.groupby(
+            [days.dt.year.rename("Year"), days.dt.isocalendar().week.rename("Week_Number")]
+        ).sum()
+
+        product_sales = pd.Series(product_sales[sold], index=self.product_ids[sold])
+        # IDs of merged batches are coded after the others; keep the IDs sorted
+        if not self.customer_ids.is_monotonic_increasing:
+            customer_table = customer_table.sort_index()
+        if not self.product_ids.is_monotonic_increasing:
+            product_sales = product_sales.sort_index()
+        return OrderAggregates(
+            product_sales,
+            customer_table,
+            daily,
+            weekly,
+            rows=len(dates),
+        )
+
+    # Persistence ----------------------------------------------------------
+
+    def save(self, path):
+        """Write the sorted arrays and the code tables as Arrow files.
+
+        The files are written into a scratch directory that then replaces
+        ``path``, so readers never mix the arrays of one save with the code
+        tables of another.
+        """
+        parent = os.path.dirname(path)
+        os.makedirs(parent, exist_ok=True)
+        scratch = tempfile.mkdtemp(prefix=".tmp-", dir=parent)
+        try:
+            keys = {
+                "customers": pd.DataFrame({"Customer_ID": np.asarray(self.customer_ids)}),
+                "products": pd.DataFrame({"Product_ID": np.asarray(self.product_ids)}),
+            }
+            for name, frame in keys.items():
+                feather.write_feather(frame, os.path.join(scratch, f"{name}.arrow"))
+            with open(os.path.join(scratch, "batches.json"), "w") as handle:
+                json.dump(sorted(self.batches), handle)
+            table = pa.table(
+                {
+                    "Order_Date": self.dates,
+                    "Customer_Code": self.customer_codes,
+                    "Product_Code": self.product_codes,
+                    "Sales_Amount": self.amounts,
+                }
+            )
+            # One record batch, so columns map back as zero-copy arrays
+            feather.write_feather(
+                table,
+                os.path.join(scratch, "orders.arrow"),
+                compression="uncompressed",
+                chunksize=max(len(self), 1),
+            )
+            try:
+                _replace_directory(scratch, path)
+            except OSError:
+                # Another session saved an index at the same time
+                if not os.path.exists(os.path.join(path, "orders.arrow")):
+                    raise
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path):
+        """Memory-map an index written with ``save``."""
+        table = feather.read_table(os.path.join(path, "orders.arrow"), memory_map=True)
+
+        def column(name):
+            return table.column(name).to_numpy()
+
+        def keys(name, column_name):
+            frame = feather.read_table(os.path.join(path, f"{name}.arrow")).to_pandas()
+            return frame[column_name].to_numpy()
+
+        try:
+            with open(os.path.join(path, "batches.json")) as handle:
+                batches = json.load(handle)
+        except OSError:
+            batches = ()
+        return cls(
+            column("Order_Date").astype("datetime64[ns]", copy=False),
+            column("Customer_Code"),
+            column("Product_Code"),
+            column("Sales_Amount"),
+            keys("customers", "Customer_ID"),
+            keys("products", "Product_ID"),
+            batches,
+        )
+
+
+def _replace_directory(source, target):
+    # os.replace cannot replace a non-empty directory: move the old one aside
+    # first, then remove it (mapped files stay readable until unmapped)
+    if os.path.isdir(target):
+        old = tempfile.mkdtemp(prefix=".old-", dir=os.path.dirname(target))
+        os.replace(target, os.path.join(old, "index"))
+        try:
+            os.replace(source, target)
+        finally:
+            shutil.rmtree(old, ignore_errors=True)
+    else:
+        os.replace(source, target)
+
+
+def _extend_keys(ids, new_ids):
+    # Return the IDs extended with the unseen new IDs, and the codes of new_ids
+    codes = ids.get_indexer(new_ids)
+    unseen = codes < 0
+    codes[unseen] = np.arange(len(ids), len(ids) + unseen.sum())
+    extended = np.concatenate([np.asarray(ids), np.asarray(new_ids)[unseen]])
+    return extended, codes.astype(np.int32)
+
+
+# Order indexes of recently used datasets, keyed by fingerprint and version
+_indexes = Registry(size=4)
+# The latest order index of every recently used dataset, keyed by fingerprint;
+# the index of a new version extends it with the batches appended since
+_latest = Registry(size=4)
+
+
+def _index_path(dataset):
+    path = getattr(dataset, "path", None)
+    return os.path.join(path, "order_index") if path is not None else None
+
+
+def _sorted_index(dataset):
+    report_progress(0.0, "Indexing orders by date")
+    return OrderIndex.from_orders(dataset.read("Orders", _COLUMNS))
+
+
+def _stored_index(dataset):
+    path = _index_path(dataset)
+    if path is not None and os.path.exists(os.path.join(path, "orders.arrow")):
+        return OrderIndex.load(path), True
+    return _sorted_index(dataset), False
+
+
+@profiled("order_index", rows=len)
+def _build_index(dataset):
+    batches = {batch_key(batch): batch for batch in appended_batches(dataset)}
+    index, saved = _latest.get_or_create(dataset.fingerprint, lambda: _stored_index(dataset))
+    if not index.batches <= batches.keys():
+        # The index holds batches that were dropped since (see incremental.forget)
+        index, saved = _sorted_index(dataset), False
+    for key, batch in batches.items():
+        if key not in index.batches:
+            index, saved = index.extend(batch[_COLUMNS], key), False
+    path = _index_path(dataset)
+    if path is not None and not saved:
+        report_progress(0.9, "Saving the order index")
+        index.save(path)
+    _latest.put(dataset.fingerprint, (index, True))
+    return index
+
+
+def order_index(dataset):
+    """Return the date-sorted order index of a dataset, building it once."""
+    key = (dataset.fingerprint, dataset_aggregates(dataset).version)
+    return _indexes.get_or_create(key, lambda: _build_index(dataset))
+
+
+@profiled("filter_orders", rows=lambda aggregates: aggregates.rows)
+def _filter(dataset, filters):
+    products = product_index(dataset) if filters.categories is not None else None
+    report_progress(0.0, "Filtering orders")
+    return order_index(dataset).aggregates(filters, products)
+
+
+# Aggregates of recent filtered views, keyed by fingerprint, version and filters
+_views = Registry(size=16)
+
+
+def filtered_aggregates(dataset, filters):
+    """Return the aggregates of the dataset's orders matching ``filters``."""
+    if not is_filtered(filters):
+        return dataset_aggregates(dataset)
+    key = (dataset.fingerprint, dataset_aggregates(dataset).version, filters)
+    return _views.get_or_create(key, lambda: _filter(dataset, filters))
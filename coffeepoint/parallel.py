@@ -0,0 +1,298 @@
+"""Pluggable execution backends for building order aggregates.
+
+``SerialBackend`` aggregates in the calling process. ``ProcessPoolBackend``
+splits the work once across a pool of worker processes, and every worker
+returns one partial aggregate; the partials are combined in a single
+``merge_all`` pass:
+
+- the orders of a stored dataset (see ``coffeepoint.store``) are split into
+  one contiguous row range per worker, and every worker folds its range of
+  the memory-mapped file chunk by chunk; only the range is sent to it;
+- orders held in memory are partitioned by customer and copied once into
+  shared memory blocks, and every worker aggregates one partition;
+- a stream of order chunks (e.g. from a large file) is spread over the
+  workers chunk by chunk, every chunk copied into its own shared memory
+  blocks, with a bounded number of chunks in flight.
+
+Order frames are never pickled to the workers. Inputs below ``min_rows``
+orders are aggregated in the calling process without starting the pool.
+
+Both backends also ``map`` a function over independent work items, such as
+the workbooks of several stores to parse.
+
+The default backend is chosen from the ``COFFEEPOINT_WORKERS`` environment
+variable (unset, 0 or 1 means serial execution).
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from .incremental import ORDER_COLUMNS, OrderAggregates
+from .jobs import report_progress, track
+from .streaming import DEFAULT_CHUNK_ROWS
+
+# Below this many orders the pool's overhead outweighs the speedup
+DEFAULT_MIN_ROWS = 200_000
+
+
+class SerialBackend:
+    """Aggregate orders in the calling process."""
+
+    workers = 1
+
+    def aggregate(self, orders):
+        return OrderAggregates.from_orders(orders)
+
+    def aggregate_chunks(self, chunks):
+        return OrderAggregates.from_chunks(chunks, self.aggregate)
+
+    def aggregate_dataset(self, dataset, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """Aggregate the orders of a dataset, reading them chunk by chunk."""
+        chunks = track(
+            dataset.iter_chunks("Orders", ORDER_COLUMNS, chunk_rows),
+            -(-dataset.rows("Orders") // chunk_rows),
+            "Aggregating orders",
+        )
+        return self.aggregate_chunks(chunks)
+
+    def map(self, function, *iterables):
+        """Apply a module-level function to every item, yielding results in order."""
+        return map(function, *iterables)
+
+    def close(self):
+        pass
+
+
+def _encode(orders):
+    # Shared memory holds plain arrays: the IDs become dense integer codes
+    customer_codes, customers = pd.factorize(orders["Customer_ID"])
+    product_codes, products = pd.factorize(orders["Product_ID"])
+    columns = {
+        "Order_ID": orders["Order_ID"].to_numpy(),
+        "Order_Date": orders["Order_Date"].to_numpy("datetime64[ns]"),
+        "Customer_ID": customer_codes,
+        "Product_ID": product_codes,
+        "Quantity": orders["Quantity"].to_numpy(),
+        "Price": orders["Price"].to_numpy(),
+        "Sales_Amount": orders["Sales_Amount"].to_numpy(),
+    }
+    return columns, customers, products
+
+
+def _share(columns, order=None):
+    """Copy columns (in ``order``, if given) into new shared memory blocks.
+
+    Returns the block handles and the block descriptions sent to workers.
+    """
+    handles, blocks = [], []
+    try:
+        for column in ORDER_COLUMNS:
+            values = columns[column]
+            handle = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            handles.append(handle)
+            shared = np.ndarray(len(values), dtype=values.dtype, buffer=handle.buf)
+            if order is None:
+                shared[:] = values
+            else:
+                np.take(values, order, out=shared)
+            del shared
+            blocks.append((column, handle.name, values.dtype.str, len(values)))
+    except BaseException:
+        _release(handles)
+        raise
+    return handles, blocks
+
+
+def _release(handles):
+    for handle in handles:
+        handle.close()
+        handle.unlink()
+
+
+def _attach(blocks, start, stop):
+    # Map every shared block and return row-range views over them
+    handles, columns = [], {}
+    for column, name, dtype, length in blocks:
+        handle = shared_memory.SharedMemory(name=name)
+        handles.append(handle)
+        columns[column] = np.ndarray(length, dtype=dtype, buffer=handle.buf)[start:stop]
+    return handles, columns
+
+
+def _aggregate_partition(blocks, start, stop):
+    """Worker entry point: aggregate rows [start, stop) of the shared columns."""
+    handles, columns = _attach(blocks, start, stop)
+    try:
+        # Copy the partition out of shared memory so no views outlive the blocks
+        orders = pd.DataFrame({column: values.copy() for column, values in columns.items()})
+        del columns
+        return OrderAggregates.from_orders(orders)
+    finally:
+        for handle in handles:
+            handle.close()
+
+
+def _aggregate_rows(dataset, start, stop, chunk_rows):
+    """Worker entry point: fold orders [start, stop) of a stored dataset."""
+    chunks = dataset.iter_chunks("Orders", ORDER_COLUMNS, chunk_rows, start=start, stop=stop)
+    return OrderAggregates.from_chunks(chunks)
+
+
+def _restore_keys(aggregates, customers, products):
+    # Workers aggregate over dense integer codes; map them back to the IDs
+    customers, products = np.asarray(customers), np.asarray(products)
+    aggregates.customers.index = pd.Index(
+        customers[aggregates.customers.index.to_numpy()], name="Customer_ID"
+    )
+    for name in ("product_sales", "product_units"):
+        series = getattr(aggregates, name)
+        series.index = pd.Index(products[series.index.to_numpy()], name="Product_ID")
+        # Keep the ID order of a serial groupby
+        setattr(aggregates, name, series.sort_index())
+    aggregates.customers = aggregates.customers.sort_index()
+    hitters = aggregates.hitters()
+    hitters.keys = products[hitters.keys.astype(np.int64)]
+    return aggregates
+
+
+class ProcessPoolBackend(SerialBackend):
+    """Aggregate hash partitions of the orders in a pool of processes."""
+
+    def __init__(self, workers=None, min_rows=DEFAULT_MIN_ROWS):
+        self.workers = workers or os.cpu_count() or 1
+        self.min_rows = min_rows
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                # Spawned workers do not inherit the threads of a Streamlit server
+                context = multiprocessing.get_context("spawn")
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=context)
+            return self._pool
+
+    def aggregate(self, orders):
+        if self.workers <= 1 or len(orders) < self.min_rows:
+            return super().aggregate(orders)
+
+        columns, customers, products = _encode(orders)
+        # Order rows by partition so every partition is one contiguous range
+        partition = columns["Customer_ID"] % self.workers
+        order = np.argsort(partition, kind="stable")
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(partition, minlength=self.workers))])
+
+        handles, blocks = _share(columns, order)
+        try:
+            pool = self._executor()
+            futures = [
+                pool.submit(_aggregate_partition, blocks, int(bounds[i]), int(bounds[i + 1]))
+                for i in range(self.workers)
+                if bounds[i + 1] > bounds[i]
+            ]
+            aggregates = OrderAggregates.merge_all(future.result() for future in futures)
+        finally:
+            _release(handles)
+        return _restore_keys(aggregates, customers, products)
+
+    def aggregate_chunks(self, chunks):
+        if self.workers <= 1:
+            return super().aggregate_chunks(chunks)
+        return OrderAggregates.from_chunks(self._submit_chunks(chunks), lambda part: part)
+
+    def _submit_chunks(self, chunks):
+        # Yield the partial aggregates in chunk order, keeping two chunks per
+        # worker in flight so reading the next chunks overlaps aggregation.
+        # Every chunk is copied into shared memory blocks released once its
+        # partial aggregate is back
+        pool, pending = self._executor(), []
+        try:
+            for chunk in chunks:
+                columns, customers, products = _encode(chunk)
+                handles, blocks = _share(columns)
+                future = pool.submit(_aggregate_partition, blocks, 0, len(chunk))
+                pending.append((future, handles, customers, products))
+                if len(pending) >= 2 * self.workers:
+                    yield self._collect(pending.pop(0))
+            while pending:
+                yield self._collect(pending.pop(0))
+        finally:
+            for future, handles, _, _ in pending:
+                future.cancel()
+                _release(handles)
+
+    def _collect(self, submitted):
+        future, handles, customers, products = submitted
+        try:
+            return _restore_keys(future.result(), customers, products)
+        finally:
+            _release(handles)
+
+    def aggregate_dataset(self, dataset, chunk_rows=DEFAULT_CHUNK_ROWS):
+        rows = dataset.rows("Orders")
+        if self.workers <= 1 or rows < self.min_rows:
+            # Not worth starting the pool: every chunk is aggregated here
+            return SerialBackend().aggregate_dataset(dataset, chunk_rows)
+        if getattr(dataset, "path", None) is None:
+            # Orders held in memory: one customer partition per worker
+            report_progress(0.0, "Aggregating orders")
+            return self.aggregate(dataset.read("Orders", ORDER_COLUMNS))
+        # A stored dataset: every worker maps the file and folds its own row range
+        bounds = np.linspace(0, rows, self.workers + 1).astype(np.int64)
+        pool = self._executor()
+        futures = [
+            pool.submit(_aggregate_rows, dataset, int(start), int(stop), chunk_rows)
+            for start, stop in zip(bounds[:-1], bounds[1:])
+            if stop > start
+        ]
+        parts = []
+        for future in futures:
+            report_progress(len(parts) / len(futures), "Aggregating orders")
+            parts.append(future.result())
+        return OrderAggregates.merge_all(parts)
+
+    def map(self, function, *iterables):
+        if self.workers <= 1:
+            return super().map(function, *iterables)
+        return self._executor().map(function, *iterables)
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+
+_default_backend = None
+_default_lock = threading.Lock()
+
+
+def backend_from_env():
+    """Build the backend configured by ``COFFEEPOINT_WORKERS``."""
+    workers = int(os.environ.get("COFFEEPOINT_WORKERS", "1") or 1)
+    return ProcessPoolBackend(workers) if workers > 1 else SerialBackend()
+
+
+def default_backend():
+    """Return the process-wide execution backend."""
+    global _default_backend
+    with _default_lock:
+        if _default_backend is None:
+            _default_backend = backend_from_env()
+            atexit.register(_default_backend.close)
+        return _default_backend
+
+
+def set_backend(backend):
+    """Replace the process-wide execution backend."""
+    global _default_backend
+    with _default_lock:
+        previous, _default_backend = _default_backend, backend
+    if previous is not None and previous is not backend:
+        previous.close()
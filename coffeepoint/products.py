@@ -0,0 +1,114 @@
+"""Product-level analytics: ABC classification and the product dimension."""
+import numpy as np
+import pandas as pd
+
+from .profiling import profiled
+from .registry import Registry
+from .settings import ABC_THRESHOLDS
+
+
+def abc_table(product_sales, thresholds=ABC_THRESHOLDS):
+    """Classify products into A/B/C categories by cumulative share of sales.
+
+    ``product_sales`` is a Series of total sales indexed by product label.
+    """
+    product_sales = product_sales.sort_values(ascending=False)
+    percentage = (product_sales / product_sales.sum()).cumsum()
+    # Rounding can push the last cumulative share just above 1
+    percentage = percentage.clip(upper=1.0)
+    category = pd.cut(percentage, bins=[0, *thresholds, 1], labels=["A", "B", "C"])
+    return pd.DataFrame(
+        {
+            "Product": product_sales.index,
+            "Sales": product_sales.values,
+            "Percentage": percentage.values,
+            "Category": category,
+        }
+    )
+
+
+class ProductIndex:
+    """Dense integer index over the product dimension of a dataset.
+
+    Maps Product_ID to codes 0..n-1 and keeps name, category and stock arrays
+    aligned with the codes, so per-product totals are computed with
+    ``np.bincount`` over codes and names are attached only to the small
+    result, without merging orders with the inventory.
+    """
+
+    def __init__(self, inventory):
+        # A product listed twice (e.g. by several stores) keeps its first name
+        # and category, and its stock is summed
+        stock = pd.Series(inventory["Stock"].to_numpy(np.int64))
+        # Groups in order of first appearance, as drop_duplicates keeps them
+        stock = stock.groupby(np.asarray(inventory["Product_ID"]), sort=False).sum()
+        inventory = inventory.drop_duplicates("Product_ID")
+        self.ids = pd.Index(np.asarray(inventory["Product_ID"]))
+        self.name_codes, self.names = pd.factorize(inventory["Product_Name"], sort=True)
+        self.category_codes, self.categories = pd.factorize(inventory["Category"], sort=True)
+        self.stock = stock.to_numpy(np.int64)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def codes(self, product_ids):
+        """Return the code of every product ID, or -1 for unknown products."""
+        return self.ids.get_indexer(np.asarray(product_ids))
+
+    def totals(self, product_ids, values):
+        """Sum values per product code; unknown products are dropped."""
+        codes = self.codes(product_ids)
+        known = codes >= 0
+        return np.bincount(codes[known], weights=np.asarray(values)[known], minlength=len(self))
+
+    def names_of(self, product_ids):
+        """Return the name of every product ID, or None for unknown products."""
+        codes = self.codes(product_ids)
+        names = np.full(len(codes), None, dtype=object)
+        names[codes >= 0] = self.names[self.name_codes[codes[codes >= 0]]]
+        return names
+
+    @property
+    def ids_per_name(self):
+        """The largest number of product IDs sharing one name."""
+        return int(np.bincount(self.name_codes).max()) if len(self) else 1
+
+    def sales_by_name(self, product_sales):
+        """Re-key per-product sales (a Series indexed by Product_ID) by name.
+
+        Products missing from the inventory are dropped, as in an inner join,
+        and so are names without any product in ``product_sales``, i.e.
+        products that were never ordered.
+        """
+        totals = self.totals(product_sales.index, product_sales.to_numpy())
+        named = np.bincount(self.name_codes, weights=totals, minlength=len(self.names))
+        codes = self.codes(product_sales.index)
+        ordered = np.zeros(len(self.names), dtype=bool)
+        ordered[self.name_codes[codes[codes >= 0]]] = True
+        return pd.Series(named[ordered], index=pd.Index(self.names[ordered], name="Product_Name"))
+
+    def category_stock(self):
+        """Return the total stock per category, sorted by category."""
+        stock = np.bincount(
+            self.category_codes, weights=self.stock, minlength=len(self.categories)
+        )
+        return pd.Series(
+            stock.astype(self.stock.dtype),
+            index=pd.Index(self.categories, name="Category"),
+            name="Stock",
+        )
+
+
+# Product indexes of recently used datasets, keyed by fingerprint
+_indexes = Registry()
+
+
+@profiled("product_index", rows=len)
+def _build_index(dataset):
+    columns = ["Product_ID", "Product_Name", "Category", "Stock"]
+    return ProductIndex(dataset.read("Inventory", columns))
+
+
+def product_index(dataset):
+    """Return the product index of a dataset, building it once."""
+    return _indexes.get_or_create(dataset.fingerprint, lambda: _build_index(dataset))
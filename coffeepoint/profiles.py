@@ -0,0 +1,110 @@
+"""Labeling profiles of the app's variants.
+
+The app ships in variants that run the same analyses and differ only in how
+they name segments, in their thresholds and in a few sentences of their
+explanations. A ``Profile`` holds those differences:
+
+    streamlit run app.py                        # COFFEEPOINT_LABELING_PROFILE, default "vips"
+    python -m coffeepoint analyze data.xlsx --out results/ --profile champions
+
+Results are cached by their parameters, including the segment rules, so
+sessions of different profiles share the per-dataset aggregates but not
+their labeled tables. Like ``coffeepoint.settings`` this module imports
+only the standard library.
+"""
+import os
+from collections import namedtuple
+
+from .settings import ABC_THRESHOLDS
+
+PROFILE_ENV = "COFFEEPOINT_LABELING_PROFILE"
+DEFAULT_PROFILE = "vips"
+
+_Profile = namedtuple(
+    "Profile",
+    [
+        "name",
+        "segment_labels",
+        "quantiles",
+        "abc_thresholds",
+        "growth_advice",
+        "top_segment_heading",
+        "top_segment_description",
+    ],
+)
+
+
+class Profile(_Profile):
+    """Segment labels, thresholds and wording of an app variant.
+
+    ``segment_labels`` are (engine label, shown label) pairs renaming the
+    segments of ``rfm.SEGMENT_RULES``; ``growth_advice`` is the sales advice
+    for category B products. ``top_segment_heading`` and
+    ``top_segment_description`` introduce the top segment in the FRM
+    recommendations, in each variant's own words.
+    """
+
+    __slots__ = ()
+
+    def label(self, segment):
+        """Return the shown label of an engine segment label."""
+        return dict(self.segment_labels).get(segment, segment)
+
+    def rules(self):
+        """Return the RFM segment rules with this profile's labels."""
+        # Imported here: profiles are read before the analysis stack is imported
+        from .rfm import SEGMENT_RULES, relabel
+
+        return relabel(SEGMENT_RULES, dict(self.segment_labels))
+
+    def default_segment(self):
+        """Return the label of customers matching no rule."""
+        from .rfm import DEFAULT_SEGMENT
+
+        return self.label(DEFAULT_SEGMENT)
+
+
+PROFILES = {
+    profile.name: profile
+    for profile in (
+        Profile(
+            "vips",
+            segment_labels=(),
+            quantiles=4,
+            abc_thresholds=ABC_THRESHOLDS,
+            growth_advice="Explore opportunities to increase sales.",
+            top_segment_heading="VIP",
+            top_segment_description=(
+                "These are most valuable customers who purchase frequently, recently, "
+                "and spend the most."
+            ),
+        ),
+        Profile(
+            "champions",
+            segment_labels=(("VIPs", "Champions"),),
+            quantiles=4,
+            abc_thresholds=ABC_THRESHOLDS,
+            growth_advice=(
+                "Explore opportunities to increase sales (e.g., bundling or promotions)."
+            ),
+            top_segment_heading="Champions",
+            top_segment_description=(
+                "These are your most valuable customers who purchase frequently, recently, "
+                "and spend the most."
+            ),
+        ),
+    )
+}
+
+
+def get_profile(name=None):
+    """Return a profile by name; without a name, the one named by the environment."""
+    if isinstance(name, Profile):
+        return name
+    name = name or os.environ.get(PROFILE_ENV) or DEFAULT_PROFILE
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown profile {name!r}; choose from {', '.join(sorted(PROFILES))}"
+        ) from None
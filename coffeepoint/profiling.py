@@ -0,0 +1,225 @@
+"""Per-stage latency, row and memory instrumentation.
+
+The loader, the analyses, the figure builders and the app pages record a
+``StageRecord`` for every call into the process-wide ``profiler``: wall
+time, rows processed and the change in resident memory. The profiler keeps
+a window of recent samples per stage and summarizes them as p50/p95
+latencies for the app's debug panel.
+
+Records can also be exported:
+
+- as structured logs: every record is logged as a JSON line by the
+  ``coffeepoint.profiling`` logger at INFO level, written to the file named
+  by ``COFFEEPOINT_PROFILE_LOG`` when that variable is set;
+- as a Prometheus metrics endpoint, served on the port named by
+  ``COFFEEPOINT_METRICS_PORT`` when that variable is set. It listens on
+  127.0.0.1 unless ``COFFEEPOINT_METRICS_HOST`` names another interface
+  (e.g. ``0.0.0.0`` for a scraper on another machine).
+
+Setting ``COFFEEPOINT_PROFILE=0`` disables recording.
+"""
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque, namedtuple
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Samples kept per stage for the percentiles
+DEFAULT_WINDOW = 1000
+
+StageRecord = namedtuple(
+    "StageRecord", ["stage", "timestamp", "seconds", "rows", "rss_delta_bytes"]
+)
+
+
+def current_rss():
+    """Return the resident memory of this process in bytes (0 when unknown)."""
+    try:
+        with open("/proc/self/statm") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        pass
+    # Without /proc only the peak so far is known (kilobytes on Linux, bytes on macOS)
+    try:
+        # Imported here: the resource module only exists on Unix
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class _Stage:
+    """Handle of a running stage; set ``rows`` before the stage ends."""
+
+    __slots__ = ("rows",)
+
+    def __init__(self):
+        self.rows = None
+
+
+class Profiler:
+    """Thread-safe collector of stage records shared by every session."""
+
+    def __init__(self, window=DEFAULT_WINDOW, enabled=True):
+        self.window = window
+        self.enabled = enabled
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, record):
+        with self._lock:
+            samples = self._samples.get(record.stage)
+            if samples is None:
+                samples = self._samples[record.stage] = deque(maxlen=self.window)
+            samples.append(record)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(record._asdict()))
+
+    @contextmanager
+    def stage(self, name):
+        """Time the body of a ``with`` block as stage ``name``."""
+        handle = _Stage()
+        if not self.enabled:
+            yield handle
+            return
+        rss = current_rss()
+        started = time.perf_counter()
+        try:
+            yield handle
+        finally:
+            seconds = time.perf_counter() - started
+            self.record(
+                StageRecord(name, time.time(), seconds, handle.rows, current_rss() - rss)
+            )
+
+    def records(self, stage=None):
+        """Return the recorded samples of one stage, or of every stage."""
+        with self._lock:
+            if stage is not None:
+                return list(self._samples.get(stage, ()))
+            return [record for samples in self._samples.values() for record in samples]
+
+    def summary(self):
+        """Return per-stage count, latency percentiles, rows and memory delta."""
+        # Imported here: the app imports the profiler before it needs numpy
+        import numpy as np
+
+        with self._lock:
+            snapshot = {stage: list(samples) for stage, samples in self._samples.items()}
+        summary = []
+        for stage, samples in sorted(snapshot.items()):
+            seconds = np.array([record.seconds for record in samples])
+            summary.append(
+                {
+                    "stage": stage,
+                    "count": len(samples),
+                    "last_seconds": samples[-1].seconds,
+                    "p50_seconds": float(np.percentile(seconds, 50)),
+                    "p95_seconds": float(np.percentile(seconds, 95)),
+                    "total_seconds": float(seconds.sum()),
+                    "last_rows": samples[-1].rows,
+                    "last_rss_delta_bytes": samples[-1].rss_delta_bytes,
+                }
+            )
+        return summary
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    def metrics_text(self):
+        """Render the summary in the Prometheus text exposition format."""
+        lines = [
+            "# HELP coffeepoint_stage_seconds Latency of instrumented stages.",
+            "# TYPE coffeepoint_stage_seconds summary",
+        ]
+        for entry in self.summary():
+            label = f'stage="{entry["stage"]}"'
+            lines += [
+                f'coffeepoint_stage_seconds{{{label},quantile="0.5"}} {entry["p50_seconds"]}',
+                f'coffeepoint_stage_seconds{{{label},quantile="0.95"}} {entry["p95_seconds"]}',
+                f"coffeepoint_stage_seconds_sum{{{label}}} {entry['total_seconds']}",
+                f"coffeepoint_stage_seconds_count{{{label}}} {entry['count']}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide profiler shared by every Streamlit session
+profiler = Profiler(enabled=os.environ.get("COFFEEPOINT_PROFILE", "1") != "0")
+
+
+def profiled(stage, rows=None):
+    """Decorate a function to record each call as ``stage``.
+
+    ``rows`` maps the function's result to the number of rows it processed.
+    """
+
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with profiler.stage(stage) as handle:
+                result = function(*args, **kwargs)
+                if rows is not None:
+                    handle.rows = rows(result)
+            return result
+
+        return wrapper
+
+    return decorate
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = profiler.metrics_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_configured = False
+_configure_lock = threading.Lock()
+
+# Local only by default: the endpoint has no authentication
+DEFAULT_METRICS_HOST = "127.0.0.1"
+
+
+def serve_metrics(port, host=DEFAULT_METRICS_HOST):
+    """Serve ``/metrics`` on a background thread and return the server."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def configure_from_env():
+    """Set up the log file and metrics endpoint from the environment, once."""
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+        _configured = True
+        path = os.environ.get("COFFEEPOINT_PROFILE_LOG")
+        if path:
+            handler = logging.FileHandler(path)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+        port = os.environ.get("COFFEEPOINT_METRICS_PORT")
+        if port:
+            host = os.environ.get("COFFEEPOINT_METRICS_HOST") or DEFAULT_METRICS_HOST
+            serve_metrics(int(port), host)
@@ -0,0 +1,92 @@
+"""Bounded registry of objects derived from a dataset, keyed by fingerprint."""
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError
+
+from .jobs import Cancelled, check_cancelled
+
+# How often a caller waiting for another caller's build checks whether its own
+# job was cancelled
+WAIT_INTERVAL = 0.1
+
+
+class Registry:
+    """Thread-safe LRU map holding at most ``size`` derived objects.
+
+    Objects are built outside the lock and single-flight: while one caller
+    builds the object of a key, lookups of other keys go ahead and callers
+    asking for the same key wait for that build. ``lock`` is reentrant, so
+    callers can hold it around a lookup of an existing object while they
+    update it.
+    """
+
+    def __init__(self, size=32):
+        self.size = size
+        self.lock = threading.RLock()
+        self._entries = OrderedDict()
+        self._flights = {}
+
+    def get_or_create(self, key, factory):
+        """Return the object stored under key, building it with factory once."""
+        while True:
+            with self.lock:
+                value = self._entries.get(key)
+                if value is not None:
+                    self._entries.move_to_end(key)
+                    return value
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = Future()
+            if leader:
+                break
+            # Another caller is building this object
+            try:
+                return self._wait(flight)
+            except Cancelled:
+                # The building caller's job was cancelled; take over
+                check_cancelled()
+
+        try:
+            value = factory()
+        except BaseException as error:
+            with self.lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.set_exception(error)
+            raise
+        with self.lock:
+            # Not stored if the key was discarded while the object was built
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+                self._store(key, value)
+        flight.set_result(value)
+        return value
+
+    def _wait(self, flight):
+        while True:
+            try:
+                return flight.result(WAIT_INTERVAL)
+            except TimeoutError:
+                check_cancelled()
+
+    def _store(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def put(self, key, value):
+        """Store value under key, replacing any previous value."""
+        with self.lock:
+            self._store(key, value)
+
+    def discard(self, key=None):
+        """Drop one entry, or every entry if key is None."""
+        with self.lock:
+            if key is None:
+                self._entries.clear()
+                self._flights.clear()
+            else:
+                self._entries.pop(key, None)
+                self._flights.pop(key, None)
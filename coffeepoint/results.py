@@ -0,0 +1,317 @@
+"""Cross-session cache of analysis results.
+
+Several sessions viewing the same dataset ask for identical ABC tables, RFM
+segments and sales series. ``ResultCache`` stores each result once, keyed by
+the dataset fingerprint, the version of its running aggregates (so appended
+orders produce new keys) and the analysis parameters:
+
+- the in-process tier is an LRU bounded by the memory size of the results;
+- the optional disk tier keeps results as Arrow files that survive restarts
+  and are shared between server processes, bounded by total file size;
+- concurrent requests for a missing key are single-flight: one session
+  computes the result while the others wait for it. If the computing
+  session's job is cancelled (see ``coffeepoint.jobs``), a waiting session
+  takes over the computation.
+
+The disk tier is enabled by the ``COFFEEPOINT_RESULT_DIR`` environment
+variable.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError
+
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from .incremental import dataset_aggregates
+from .jobs import Cancelled, check_cancelled
+from .loader import frame_nbytes
+from .orders import filtered_aggregates, is_filtered
+from .products import ABC_THRESHOLDS, product_index
+from .rfm import DEFAULT_SEGMENT, SEGMENT_RULES
+from .sketches import DEFAULT_CAPACITY, DEFAULT_RELATIVE_ACCURACY
+from .trends import ROLLING_WINDOWS
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_DISK_BYTES = 1024 * 1024 * 1024
+# How often a waiting session checks whether its own job was cancelled
+WAIT_INTERVAL = 0.1
+
+
+class ResultCache:
+    """Size-bounded, single-flight cache of DataFrame results."""
+
+    def __init__(
+        self, max_bytes=DEFAULT_MAX_BYTES, root=None, max_disk_bytes=DEFAULT_MAX_DISK_BYTES
+    ):
+        self.max_bytes = max_bytes
+        self.root = root
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = self.misses = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            return sum(self._sizes.values())
+
+    def get_or_compute(self, key, compute):
+        """Return the result stored under key, computing it at most once.
+
+        ``key`` is a tuple starting with the dataset fingerprint. Callers
+        must treat the returned frame as read-only.
+        """
+        while True:
+            with self._lock:
+                result = self._entries.get(key)
+                if result is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return result
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = Future()
+            if leader:
+                break
+            # Another session is computing this result
+            try:
+                return self._wait(flight)
+            except Cancelled:
+                # The computing session gave up; try to take over
+                check_cancelled()
+
+        try:
+            result = self._read_disk(key)
+            if result is None:
+                with self._lock:
+                    self.misses += 1
+                result = compute()
+                self._write_disk(key, result)
+        except BaseException as error:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.set_exception(error)
+            raise
+        self._put(key, result)
+        flight.set_result(result)
+        return result
+
+    def _wait(self, flight):
+        while True:
+            try:
+                return flight.result(WAIT_INTERVAL)
+            except TimeoutError:
+                check_cancelled()
+
+    def invalidate(self, fingerprint=None):
+        """Drop the results of one dataset, or every result, from both tiers."""
+        with self._lock:
+            for key in list(self._entries):
+                if fingerprint is None or key[0] == fingerprint:
+                    del self._entries[key]
+                    del self._sizes[key]
+        if self.root is None or not os.path.isdir(self.root):
+            return
+        for name in os.listdir(self.root):
+            if fingerprint is None or name.startswith(f"{fingerprint}-"):
+                try:
+                    os.remove(os.path.join(self.root, name))
+                except OSError:
+                    pass
+
+    def _put(self, key, result):
+        with self._lock:
+            # Stored and released in one step, so no caller misses both
+            self._flights.pop(key, None)
+            self._entries[key] = result
+            self._sizes[key] = frame_nbytes(result)
+            # Always keep the most recent entry, even if it alone exceeds the budget
+            total = sum(self._sizes.values())
+            while total > self.max_bytes and len(self._entries) > 1:
+                evicted, _ = self._entries.popitem(last=False)
+                total -= self._sizes.pop(evicted)
+
+    # Disk tier ------------------------------------------------------------
+
+    def _path(self, key):
+        digest = hashlib.blake2b(repr(key[1:]).encode(), digest_size=16).hexdigest()
+        return os.path.join(self.root, f"{key[0]}-{digest}.arrow")
+
+    def _read_disk(self, key):
+        if self.root is None:
+            return None
+        path = self._path(key)
+        try:
+            table = feather.read_table(path, memory_map=True)
+        except (OSError, pa.ArrowException):
+            return None
+        # Touch the file so disk eviction is least recently used
+        os.utime(path)
+        with self._lock:
+            self.hits += 1
+        return table.to_pandas(split_blocks=True)
+
+    def _write_disk(self, key, result):
+        if self.root is None:
+            return
+        path = self._path(key)
+        scratch = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            feather.write_feather(
+                pa.Table.from_pandas(result), scratch, compression="uncompressed"
+            )
+            os.replace(scratch, path)
+            self._evict_disk()
+        except (OSError, pa.ArrowException):
+            # The disk tier is best effort (e.g. a full disk or a column Arrow
+            # cannot store); the result is still cached in memory
+            if os.path.exists(scratch):
+                os.remove(scratch)
+
+    def _evict_disk(self):
+        files = []
+        for name in os.listdir(self.root):
+            if not name.endswith(".arrow"):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files)[:-1]:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+
+# Process-wide cache shared by every Streamlit session
+result_cache = ResultCache(root=os.environ.get("COFFEEPOINT_RESULT_DIR") or None)
+
+
+def cached_result(dataset, analysis, params, compute, filters=None, cache=None):
+    """Return an analysis result of a dataset through the result cache.
+
+    ``params`` is a hashable tuple of the parameters the result depends on;
+    ``compute`` receives the aggregates of the orders matching ``filters``
+    (an ``OrderFilter``, see ``coffeepoint.orders``).
+    """
+    filters = filters if is_filtered(filters) else None
+    key = (dataset.fingerprint, dataset_aggregates(dataset).version, analysis, params, filters)
+    cache = cache if cache is not None else result_cache
+    return cache.get_or_compute(key, lambda: compute(filtered_aggregates(dataset, filters)))
+
+
+def abc_result(dataset, thresholds=ABC_THRESHOLDS, filters=None, cache=None):
+    """Return the ABC table of a dataset, keyed by product name."""
+    products = product_index(dataset)
+    return cached_result(
+        dataset,
+        "abc",
+        tuple(thresholds),
+        lambda aggregates: aggregates.abc(products, thresholds),
+        filters,
+        cache,
+    )
+
+
+def rfm_result(
+    dataset, quantiles=4, rules=SEGMENT_RULES, default=DEFAULT_SEGMENT, filters=None, cache=None
+):
+    """Return the per-customer RFM table of a dataset."""
+    return cached_result(
+        dataset,
+        "rfm",
+        (quantiles, tuple(rules), default),
+        lambda aggregates: aggregates.rfm(quantiles, rules, default),
+        filters,
+        cache,
+    )
+
+
+def approximate_abc_result(
+    dataset, thresholds=ABC_THRESHOLDS, capacity=DEFAULT_CAPACITY, filters=None, cache=None
+):
+    """Return the ABC table of a dataset's heavy-hitter products, with error bounds.
+
+    The summary is kept with the running aggregates; a chain's is the merge
+    of its stores' summaries.
+    """
+    products = product_index(dataset)
+    return cached_result(
+        dataset,
+        "approximate_abc",
+        (tuple(thresholds), capacity),
+        lambda aggregates: aggregates.approximate_abc(products, thresholds, capacity),
+        filters,
+        cache,
+    )
+
+
+def approximate_rfm_result(
+    dataset,
+    quantiles=4,
+    rules=SEGMENT_RULES,
+    default=DEFAULT_SEGMENT,
+    relative_accuracy=DEFAULT_RELATIVE_ACCURACY,
+    filters=None,
+    cache=None,
+):
+    """Return the per-customer RFM table scored against sketched boundaries."""
+    return cached_result(
+        dataset,
+        "approximate_rfm",
+        (quantiles, tuple(rules), default, relative_accuracy),
+        lambda aggregates: aggregates.approximate_rfm(
+            quantiles, rules, default, relative_accuracy
+        ),
+        filters,
+        cache,
+    )
+
+
+def daily_sales_result(dataset, filters=None, cache=None):
+    return cached_result(
+        dataset, "daily_sales", (), lambda aggregates: aggregates.daily_sales(), filters, cache
+    )
+
+
+def weekly_sales_result(dataset, filters=None, cache=None):
+    return cached_result(
+        dataset, "weekly_sales", (), lambda aggregates: aggregates.weekly_sales(), filters, cache
+    )
+
+
+def rolling_sales_result(dataset, windows=ROLLING_WINDOWS, filters=None, cache=None):
+    """Return the rolling sales and week-over-week growth of a dataset."""
+    return cached_result(
+        dataset,
+        "rolling_sales",
+        tuple(windows),
+        lambda aggregates: aggregates.rolling_sales(windows),
+        filters,
+        cache,
+    )
+
+
+def cohort_result(dataset, filters=None, cache=None):
+    """Return the monthly acquisition cohort retention matrix of a dataset."""
+    return cached_result(
+        dataset, "cohorts", (), lambda aggregates: aggregates.cohort_retention(), filters, cache
+    )
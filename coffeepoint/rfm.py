@@ -0,0 +1,172 @@
+"""Vectorized RFM (Recency, Frequency, Monetary) engine.
+
+The engine has no Streamlit dependency and can be used from batch jobs:
+
+    from coffeepoint.rfm import rfm_table
+    segments = rfm_table(orders)["Segment"]
+
+Customers are aggregated in a single grouped pass, scored into integer
+quantile arrays and assigned a segment through a lookup table over the
+score cube, instead of classifying concatenated score strings row by row.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .trends import sales_amount
+
+# A segment matches when every score lies within the rule's bounds (inclusive)
+SegmentRule = namedtuple(
+    "SegmentRule", ["label", "min_recency", "max_recency", "min_frequency", "min_monetary"]
+)
+
+# Rules are evaluated in order; the first match wins. Their bounds are
+# scores out of RULE_QUANTILES; scores out of other quantile counts are
+# mapped onto that scale before matching (see ``rule_scores``)
+RULE_QUANTILES = 4
+SEGMENT_RULES = (
+    SegmentRule("VIPs", 4, 4, 3, 3),
+    SegmentRule("Loyal Customers", 3, 4, 3, 1),
+    SegmentRule("Potential Loyalists", 3, 4, 2, 1),
+    SegmentRule("Need Attention", 2, 2, 2, 1),
+    SegmentRule("At Risk", 1, 1, 2, 1),
+)
+DEFAULT_SEGMENT = "Lost Customers"
+
+
+def relabel(rules, labels):
+    """Return the rules with segment labels renamed through a mapping."""
+    return tuple(rule._replace(label=labels.get(rule.label, rule.label)) for rule in rules)
+
+
+def segment_labels(rules=SEGMENT_RULES, default=DEFAULT_SEGMENT):
+    """Return the distinct segment labels in rule order, default last."""
+    labels = []
+    for label in [rule.label for rule in rules] + [default]:
+        if label not in labels:
+            labels.append(label)
+    return labels
+
+
+def rule_scores(quantiles):
+    """Return the rule-scale score of each score 1..quantiles.
+
+    A score covers a band of percentiles; it is matched as the score out of
+    RULE_QUANTILES whose band holds the middle of it, so quintile 3 (the
+    40th-60th percentiles) counts as quartile 2 and four quantiles map onto
+    themselves.
+    """
+    middle = (np.arange(1, quantiles + 1) - 0.5) / quantiles
+    return np.ceil(middle * RULE_QUANTILES).astype(np.int64)
+
+
+def segment_table(quantiles=4, rules=SEGMENT_RULES, default=DEFAULT_SEGMENT):
+    """Return the segment code of every cell of the score cube.
+
+    The result is indexed as ``table[recency - 1, frequency - 1, monetary - 1]``
+    and holds positions into ``segment_labels(rules, default)``.
+    """
+    labels = segment_labels(rules, default)
+    scores = rule_scores(quantiles)
+    recency, frequency, monetary = np.meshgrid(scores, scores, scores, indexing="ij")
+    table = np.full(recency.shape, labels.index(default), dtype=np.int8)
+    assigned = np.zeros(recency.shape, dtype=bool)
+    for rule in rules:
+        match = (
+            ~assigned
+            & (recency >= rule.min_recency)
+            & (recency <= rule.max_recency)
+            & (frequency >= rule.min_frequency)
+            & (monetary >= rule.min_monetary)
+        )
+        table[match] = labels.index(rule.label)
+        assigned |= match
+    return table
+
+
+def quantile_scores(values, quantiles=4, reverse=False, boundaries=None):
+    """Score values into 1..quantiles by equal-frequency bins.
+
+    With ``reverse`` the lowest values get the highest score, as for recency.
+    When ties make bin edges repeat (e.g. most customers of a short date
+    window ordered once), values are binned by their percentile rank
+    instead, with tied values sharing their average rank, so equal values
+    always get equal scores.
+    Given the ``quantiles - 1`` inner bin edges as ``boundaries`` (e.g. from
+    a sketch, see ``coffeepoint.sketches``), values are binned by those.
+    """
+    if boundaries is not None:
+        # Bins include their upper edge, as with qcut
+        codes = np.searchsorted(np.asarray(boundaries), values.to_numpy(), side="left")
+        codes = codes.astype(np.int8)
+        return quantiles - codes if reverse else codes + 1
+    try:
+        codes = pd.qcut(values, q=quantiles, labels=False)
+    except ValueError:
+        percentile = values.rank(method="average", pct=True).to_numpy()
+        codes = np.minimum(np.ceil(percentile * quantiles), quantiles) - 1
+    codes = np.asarray(codes).astype(np.int8)
+    return quantiles - codes if reverse else codes + 1
+
+
+def customer_metrics(orders):
+    """Aggregate Recency (days), Frequency and Monetary per customer.
+
+    Expects the Order_ID, Order_Date, Customer_ID, Quantity and Price columns.
+    """
+    grouped = orders.assign(Sales_Amount=sales_amount(orders)).groupby(
+        "Customer_ID", observed=True
+    )
+    metrics = grouped.agg(
+        Last_Order=("Order_Date", "max"),
+        Frequency=("Order_ID", "count"),
+        Monetary=("Sales_Amount", "sum"),
+    )
+    recency = (orders["Order_Date"].max() - metrics["Last_Order"]).dt.days
+    return pd.DataFrame(
+        {"Recency": recency, "Frequency": metrics["Frequency"], "Monetary": metrics["Monetary"]}
+    )
+
+
+def score_metrics(
+    metrics, quantiles=4, rules=SEGMENT_RULES, default=DEFAULT_SEGMENT, boundaries=None
+):
+    """Add quantile scores, the combined score and the segment to RFM metrics.
+
+    ``boundaries`` optionally maps metric names to precomputed inner bin edges.
+    """
+    boundaries = boundaries or {}
+    recency = quantile_scores(
+        metrics["Recency"], quantiles, reverse=True, boundaries=boundaries.get("Recency")
+    )
+    frequency = quantile_scores(
+        metrics["Frequency"], quantiles, boundaries=boundaries.get("Frequency")
+    )
+    monetary = quantile_scores(
+        metrics["Monetary"], quantiles, boundaries=boundaries.get("Monetary")
+    )
+
+    table = segment_table(quantiles, rules, default)
+    codes = table[recency - 1, frequency - 1, monetary - 1]
+    segments = pd.Categorical.from_codes(codes, categories=segment_labels(rules, default))
+
+    return metrics.assign(
+        Recency_Score=recency,
+        Frequency_Score=frequency,
+        Monetary_Score=monetary,
+        FRM_Score=(recency.astype(np.int16) * 100 + frequency * 10 + monetary).astype(np.int16),
+        Segment=segments,
+    )
+
+
+def segment_counts(rfm):
+    """Return the number of customers per segment, in segment order."""
+    counts = rfm["Segment"].value_counts(sort=False).reset_index()
+    counts.columns = ["Segment", "Count"]
+    return counts
+
+
+def rfm_table(orders, quantiles=4, rules=SEGMENT_RULES, default=DEFAULT_SEGMENT):
+    """Return per-customer RFM metrics, scores and segments for the orders."""
+    return score_metrics(customer_metrics(orders), quantiles, rules, default)
@@ -0,0 +1,11 @@
+"""Defaults of the app's settings.
+
+This module imports nothing but the standard library, so the app can draw
+its sidebar before pandas, numpy or Plotly are imported (see
+``coffeepoint.startup``).
+"""
+
+# Default number of points sent to the browser per chart
+DEFAULT_POINT_BUDGET = 2000
+# Upper bounds of the cumulative sales share for categories A and B
+ABC_THRESHOLDS = (0.7, 0.9)
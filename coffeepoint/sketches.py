@@ -0,0 +1,439 @@
+"""Mergeable sketches for the approximate analysis mode.
+
+Exact RFM scores sort every customer's metrics (``pd.qcut``) and the exact
+ABC table sorts every product's sales. The approximate mode replaces both
+with small summaries that are built slice by slice, store by store or in
+worker processes, and then merged:
+
+- ``QuantileSketch`` is a relative-error quantile sketch in the style of
+  DDSketch. Values are counted in logarithmic buckets in linear time, and
+  every estimated quantile is within ``relative_accuracy`` of the exact
+  value at that rank. It gives the Recency/Frequency/Monetary score
+  boundaries.
+- ``HeavyHitters`` is a weighted Misra-Gries summary holding at most
+  ``capacity`` products. It undercounts any product's sales by at most
+  ``error``, and ``error`` never exceeds total sales / (capacity + 1), so
+  every product whose sales exceed that bound is listed.
+
+- ``CustomerSketches`` holds the Recency, Frequency and Monetary
+  distributions of a set of customers and gives their score boundaries.
+
+Both summaries merge associatively, and a merged summary keeps the bounds.
+``OrderAggregates`` builds them chunk by chunk as the orders are ingested
+(in worker processes too) and merges them with the other aggregates, so the
+approximate mode reads them instead of summarizing the exact tables.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+from .jobs import report_progress
+from .products import ABC_THRESHOLDS
+from .rfm import DEFAULT_SEGMENT, SEGMENT_RULES, score_metrics
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+DEFAULT_CAPACITY = 1000
+# Rows summarized at a time; every slice gets its own sketch, merged afterwards
+DEFAULT_SLICE_ROWS = 250_000
+
+_EMPTY_STORE = (0, np.zeros(0))
+
+
+def _add_counts(store, keys, counts):
+    # A store is (first bucket key, dense counts of the buckets from there on)
+    offset, dense = store
+    if not len(keys):
+        return store
+    if len(dense):
+        low, high = min(offset, keys.min()), max(offset + len(dense) - 1, keys.max())
+    else:
+        low, high = keys.min(), keys.max()
+    merged = np.zeros(high - low + 1)
+    merged[offset - low:offset - low + len(dense)] = dense
+    merged += np.bincount(keys - low, weights=counts, minlength=len(merged))
+    return int(low), merged
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with relative value error."""
+
+    def __init__(self, relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        # Buckets of positive values and of the magnitudes of negative values
+        self._positive = self._negative = _EMPTY_STORE
+        self.zeros = 0
+        self.count = 0
+
+    @classmethod
+    def from_values(cls, values, relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+        return cls(relative_accuracy).add(values)
+
+    def __len__(self):
+        """Number of buckets held, i.e. the size of the sketch."""
+        return len(self._positive[1]) + len(self._negative[1]) + 1
+
+    def _keys(self, magnitudes):
+        # Bucket k holds the magnitudes in (gamma^(k-1), gamma^k]
+        return np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64)
+
+    def add(self, values, weight=1):
+        """Count an array of values ``weight`` times each; NaNs are ignored.
+
+        A weight of -1 uncounts values counted before (see ``remove``).
+        """
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        positive, negative = values[values > 0], -values[values < 0]
+        self._positive = _add_counts(
+            self._positive, self._keys(positive), np.full(len(positive), float(weight))
+        )
+        self._negative = _add_counts(
+            self._negative, self._keys(negative), np.full(len(negative), float(weight))
+        )
+        self.zeros += weight * (len(values) - len(positive) - len(negative))
+        self.count += weight * len(values)
+        return self
+
+    def remove(self, values):
+        """Uncount values counted before, e.g. superseded running totals."""
+        return self.add(values, -1)
+
+    def merge(self, other):
+        """Return a sketch of the values of both sketches."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Only sketches with the same relative accuracy can be merged")
+        merged = QuantileSketch(self.relative_accuracy)
+        for name in ("_positive", "_negative"):
+            store = getattr(self, name)
+            offset, dense = getattr(other, name)
+            keys = np.arange(offset, offset + len(dense), dtype=np.int64)
+            setattr(merged, name, _add_counts(store, keys, dense))
+        merged.zeros = self.zeros + other.zeros
+        merged.count = self.count + other.count
+        return merged
+
+    def _values(self, store, sign):
+        offset, dense = store
+        keys = np.arange(offset, offset + len(dense), dtype=np.float64)
+        # The estimate within (gamma^(k-1), gamma^k] that is never further
+        # than relative_accuracy from any value of the bucket
+        return sign * 2 * self._gamma ** keys / (self._gamma + 1)
+
+    def to_dict(self):
+        """Return the sketch as plain lists and numbers, e.g. to save it as JSON."""
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "positive": [self._positive[0], self._positive[1].tolist()],
+            "negative": [self._negative[0], self._negative[1].tolist()],
+            "zeros": self.zeros,
+            "count": self.count,
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        sketch = cls(state["relative_accuracy"])
+        sketch._positive = (int(state["positive"][0]), np.asarray(state["positive"][1], float))
+        sketch._negative = (int(state["negative"][0]), np.asarray(state["negative"][1], float))
+        sketch.zeros, sketch.count = state["zeros"], state["count"]
+        return sketch
+
+    def quantile(self, q):
+        """Estimate the values at ranks ``q`` (floats in [0, 1]).
+
+        The rank of ``q`` is ``floor(q * (count - 1))``, i.e. the lower of the
+        two values around a fractional rank; the estimate is within
+        ``relative_accuracy`` of the exact value at that rank.
+        """
+        q = np.atleast_1d(np.asarray(q, dtype=np.float64))
+        if not self.count:
+            return np.full(len(q), np.nan)
+        # All buckets in increasing value order: negatives, zero, positives
+        values = np.concatenate(
+            [
+                self._values(self._negative, -1)[::-1],
+                [0.0],
+                self._values(self._positive, 1),
+            ]
+        )
+        counts = np.concatenate([self._negative[1][::-1], [self.zeros], self._positive[1]])
+        ranks = np.floor(q * (self.count - 1))
+        return values[np.searchsorted(np.cumsum(counts), ranks, side="right")]
+
+
+class HeavyHitters:
+    """Weighted Misra-Gries summary of the keys with the largest totals."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.keys = np.empty(0, dtype=object)
+        self.counts = np.zeros(0)
+        self.total = 0.0
+        # The most by which any key's count undercounts its true total
+        self.error = 0.0
+
+    @classmethod
+    def from_weights(cls, keys, weights, capacity=DEFAULT_CAPACITY):
+        """Summarize the totals of ``weights`` per key, e.g. sales per product."""
+        summary = cls(capacity)
+        return summary._fold(np.asarray(keys), np.asarray(weights, dtype=np.float64))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _fold(self, keys, weights):
+        totals = pd.Series(weights).groupby(keys, sort=False).sum()
+        keys, counts = totals.index.to_numpy(), totals.to_numpy(np.float64)
+        self.total += float(counts.sum())
+        if len(counts) > self.capacity:
+            # Subtract the (capacity + 1)-th largest count from every counter
+            cut = np.partition(counts, len(counts) - self.capacity - 1)[-self.capacity - 1]
+            counts = counts - cut
+            kept = counts > 0
+            keys, counts = keys[kept], counts[kept]
+            self.error += float(cut)
+        self.keys, self.counts = keys, counts
+        return self
+
+    def merge(self, other):
+        """Return a summary of the weights of both summaries."""
+        merged = HeavyHitters(min(self.capacity, other.capacity))
+        merged.error = self.error + other.error
+        merged._fold(
+            np.concatenate([self.keys, other.keys]),
+            np.concatenate([self.counts, other.counts]),
+        )
+        # Folding counted the kept counts only; the totals are exact
+        merged.total = self.total + other.total
+        return merged
+
+    def relabel(self, labels, keys_per_label=1):
+        """Return the summary keyed by ``labels``, one label per kept key.
+
+        Keys labeled None are dropped and the counts of keys sharing a label
+        are added up. A label can stand for up to ``keys_per_label`` keys, each
+        undercounted by up to ``error``, so the error grows by that factor.
+        """
+        labels = pd.Series(labels, dtype=object)
+        kept = labels.notna().to_numpy()
+        totals = pd.Series(self.counts[kept]).groupby(labels[kept].to_numpy(), sort=False).sum()
+        summary = HeavyHitters(self.capacity)
+        summary.keys, summary.counts = totals.index.to_numpy(), totals.to_numpy(np.float64)
+        summary.total = self.total
+        summary.error = self.error * keys_per_label
+        return summary
+
+    def to_dict(self):
+        """Return the summary as plain lists and numbers, e.g. to save it as JSON."""
+        return {
+            "capacity": self.capacity,
+            "keys": self.keys.tolist(),
+            "counts": self.counts.tolist(),
+            "total": self.total,
+            "error": self.error,
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        summary = cls(state["capacity"])
+        summary.keys = np.asarray(state["keys"])
+        summary.counts = np.asarray(state["counts"], dtype=np.float64)
+        summary.total, summary.error = state["total"], state["error"]
+        return summary
+
+    def top(self):
+        """Return the kept keys by count, as a Series from key to lower bound."""
+        order = np.argsort(-self.counts, kind="stable")
+        return pd.Series(self.counts[order], index=pd.Index(self.keys[order]))
+
+
+class CustomerSketches:
+    """Mergeable summaries of the RFM metrics of a set of customers.
+
+    Frequency and Monetary are ``QuantileSketch``es. Recency is measured from
+    the newest order of all customers, which moves as orders arrive, so the
+    customers are counted per last order date instead; that is one entry per
+    distinct date (at most one per day of the history for daily dates) and
+    gives exact Recency boundaries.
+
+    A customer's metrics grow with every order. ``remove`` uncounts metrics
+    that were superseded, so the summaries of partial order sets combine as
+    in ``OrderAggregates.merge``: merged, with the partial metrics of the
+    customers found in several parts replaced by their combined metrics.
+    """
+
+    def __init__(self, relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.frequency = QuantileSketch(relative_accuracy)
+        self.monetary = QuantileSketch(relative_accuracy)
+        # Number of customers per last order date
+        self.last_orders = pd.Series(dtype="int64", index=pd.DatetimeIndex([]))
+
+    @classmethod
+    def from_customers(cls, customers, relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+        """Summarize customers with Last_Order, Frequency and Monetary columns."""
+        return cls(relative_accuracy).add(customers)
+
+    @property
+    def count(self):
+        return self.frequency.count
+
+    def add(self, customers, weight=1):
+        """Count customers ``weight`` times each; -1 uncounts them (see ``remove``)."""
+        self.frequency.add(customers["Frequency"].to_numpy(np.float64), weight)
+        self.monetary.add(customers["Monetary"].to_numpy(np.float64), weight)
+        dates = customers["Last_Order"].value_counts(sort=False).rename_axis(None) * weight
+        self.last_orders = self._add_dates(self.last_orders, dates)
+        return self
+
+    def remove(self, customers):
+        return self.add(customers, -1)
+
+    @staticmethod
+    def _add_dates(counts, other):
+        counts = counts.add(other, fill_value=0).astype("int64").rename(None)
+        return counts[counts != 0]
+
+    def merge(self, other):
+        """Return the summaries of both sets of customers, counted side by side."""
+        merged = CustomerSketches(self.relative_accuracy)
+        merged.frequency = self.frequency.merge(other.frequency)
+        merged.monetary = self.monetary.merge(other.monetary)
+        merged.last_orders = self._add_dates(self.last_orders, other.last_orders)
+        return merged
+
+    def boundaries(self, quantiles=4):
+        """Return the inner score boundaries of every metric, as ``score_boundaries``."""
+        ranks = np.arange(1, quantiles) / quantiles
+        return {
+            "Recency": self._recency(ranks),
+            "Frequency": self.frequency.quantile(ranks),
+            "Monetary": self.monetary.quantile(ranks),
+        }
+
+    def _recency(self, ranks):
+        if not self.count:
+            return np.full(len(ranks), np.nan)
+        # Newest last order first, i.e. by increasing Recency
+        last = self.last_orders.sort_index(ascending=False)
+        recency = (last.index[0] - last.index).days.to_numpy(np.float64)
+        counts = np.cumsum(last.to_numpy())
+        return recency[np.searchsorted(counts, np.floor(ranks * (self.count - 1)), side="right")]
+
+    def to_dict(self):
+        """Return the summaries as plain lists and numbers, e.g. to save them as JSON."""
+        dates = self.last_orders.index.as_unit("ns").asi8
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "frequency": self.frequency.to_dict(),
+            "monetary": self.monetary.to_dict(),
+            "last_orders": [dates.tolist(), self.last_orders.tolist()],
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        sketches = cls(state["relative_accuracy"])
+        sketches.frequency = QuantileSketch.from_dict(state["frequency"])
+        sketches.monetary = QuantileSketch.from_dict(state["monetary"])
+        dates, counts = state["last_orders"]
+        sketches.last_orders = pd.Series(
+            np.asarray(counts, dtype=np.int64),
+            index=pd.DatetimeIndex(np.asarray(dates, dtype="datetime64[ns]")),
+        )
+        return sketches
+
+
+def _slices(data, slice_rows):
+    slice_rows = slice_rows or DEFAULT_SLICE_ROWS
+    for start in range(0, len(data), slice_rows):
+        report_progress(start / len(data))
+        yield data.iloc[start:start + slice_rows]
+
+
+def rfm_sketches(metrics, relative_accuracy=DEFAULT_RELATIVE_ACCURACY, slice_rows=None):
+    """Sketch the Recency, Frequency and Monetary columns of customer metrics.
+
+    Every slice of ``slice_rows`` customers is sketched on its own and the
+    sketches are merged, as the partitions of a parallel build would be.
+    """
+    sketches = {
+        column: QuantileSketch(relative_accuracy)
+        for column in ("Recency", "Frequency", "Monetary")
+    }
+    for part in _slices(metrics, slice_rows):
+        for column, sketch in sketches.items():
+            sketches[column] = sketch.merge(
+                QuantileSketch.from_values(part[column], relative_accuracy)
+            )
+    return sketches
+
+
+def score_boundaries(sketches, quantiles=4):
+    """Return the inner score boundaries of every sketched metric."""
+    ranks = np.arange(1, quantiles) / quantiles
+    return {column: sketch.quantile(ranks) for column, sketch in sketches.items()}
+
+
+def approximate_rfm(
+    metrics,
+    quantiles=4,
+    rules=SEGMENT_RULES,
+    default=DEFAULT_SEGMENT,
+    relative_accuracy=DEFAULT_RELATIVE_ACCURACY,
+    slice_rows=None,
+    sketches=None,
+):
+    """Score customer metrics against sketched quantile boundaries.
+
+    Returns the columns of ``rfm.score_metrics``. Every boundary is within
+    ``relative_accuracy`` of the exact one, so only customers whose metric
+    lies that close to a boundary can get a neighbouring score. Customers
+    with equal metrics always get equal scores, whereas the exact scores
+    split ties at a boundary by rank.
+
+    ``sketches`` are the ``CustomerSketches`` of the same customers, e.g.
+    kept by ``OrderAggregates``; without them the metrics are sketched here.
+    """
+    if sketches is not None:
+        boundaries = sketches.boundaries(quantiles)
+    else:
+        boundaries = score_boundaries(
+            rfm_sketches(metrics, relative_accuracy, slice_rows), quantiles
+        )
+    # Recency and Frequency are whole numbers: the nearest one is at least as close
+    for column in ("Recency", "Frequency"):
+        boundaries[column] = np.round(boundaries[column])
+    return score_metrics(metrics, quantiles, rules, default, boundaries=boundaries)
+
+
+def sales_hitters(product_sales, capacity=DEFAULT_CAPACITY, slice_rows=None):
+    """Summarize per-product sales (a Series indexed by product), slice by slice."""
+    summary = HeavyHitters(capacity)
+    for part in _slices(product_sales, slice_rows):
+        summary = summary.merge(HeavyHitters.from_weights(part.index, part.to_numpy(), capacity))
+    return summary
+
+
+def approximate_abc(hitters, thresholds=ABC_THRESHOLDS):
+    """Return the ABC table of the products kept by a ``HeavyHitters`` summary.
+
+    Sales are lower bounds and Sales_Upper upper bounds of every product's
+    sales; Percentage is the cumulative share of the lower bounds in the
+    exact total. Products not listed sold at most ``hitters.error`` each.
+    """
+    sales = hitters.top()
+    percentage = (sales.cumsum() / hitters.total).clip(upper=1.0)
+    category = pd.cut(percentage, bins=[0, *thresholds, 1], labels=["A", "B", "C"])
+    return pd.DataFrame(
+        {
+            "Product": sales.index,
+            "Sales": sales.values,
+            "Sales_Upper": sales.values + hitters.error,
+            "Percentage": percentage.values,
+            "Category": category,
+        }
+    )
@@ -0,0 +1,94 @@
+"""Cold-start budget of the Streamlit app.
+
+    python -m coffeepoint startup app.py --budget 1.0
+
+Every replica of the app imports its module-level imports before it can
+show the upload page. This check times those imports in fresh interpreters
+(the fastest of ``--repeat`` runs, to damp noise) and fails when
+
+- they take longer than the budget, or
+- they import one of the deferred modules: the analysis stack (pandas,
+  numpy, pyarrow, openpyxl) and Plotly Express load only for the pages that
+  need them.
+
+The report also lists the coffeepoint modules the imports load. It is
+meant to run next to the benchmarks, e.g. in CI, and exits with
+status 1 on a regression.
+"""
+import ast
+import json
+import os
+import subprocess
+import sys
+
+DEFAULT_BUDGET_SECONDS = 1.0
+DEFAULT_REPEAT = 3
+DEFERRED_MODULES = ("pandas", "numpy", "pyarrow", "openpyxl", "plotly.express")
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+exec({imports!r})
+seconds = time.perf_counter() - started
+print(json.dumps({{
+    "seconds": seconds,
+    "loaded": [m for m in {deferred!r} if m in sys.modules],
+    "package": sorted(m for m in sys.modules if m.split(".")[0] == "coffeepoint"),
+}}))
+"""
+
+
+def startup_imports(path):
+    """Return the import statements a script runs at module level, as source lines."""
+    with open(path) as handle:
+        tree = ast.parse(handle.read(), path)
+    return [
+        ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))
+    ]
+
+
+def measure(imports, repeat=DEFAULT_REPEAT, deferred=DEFERRED_MODULES):
+    """Run import statements in ``repeat`` fresh interpreters; return the fastest run."""
+    code = _PROBE.format(imports="\n".join(imports), deferred=list(deferred))
+    # The package is imported from the working directory, as the app does
+    path = [os.getcwd(), os.environ.get("PYTHONPATH")]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, path)))
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True, env=env
+        ).stdout
+        runs.append(json.loads(output))
+    return min(runs, key=lambda run: run["seconds"])
+
+
+def check(path, budget=DEFAULT_BUDGET_SECONDS, repeat=DEFAULT_REPEAT):
+    """Measure the startup imports of an app script and return a report."""
+    imports = startup_imports(path)
+    run = measure(imports, repeat)
+    problems = []
+    if run["seconds"] > budget:
+        problems.append(f"startup imports took {run['seconds']:.3f}s, budget {budget:.3f}s")
+    for module in run["loaded"]:
+        problems.append(f"startup imports load the deferred module {module}")
+    return {
+        "app": path,
+        "imports": imports,
+        "seconds": round(run["seconds"], 4),
+        "budget_seconds": budget,
+        "deferred_loaded": run["loaded"],
+        "package_modules": run["package"],
+        "problems": problems,
+    }
+
+
+def main(args):
+    reports = [check(path, args.budget, args.repeat) for path in args.app]
+    json.dump(reports, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    problems = [
+        f"{report['app']}: {problem}" for report in reports for problem in report["problems"]
+    ]
+    for problem in problems:
+        print(f"regression: {problem}", file=sys.stderr)
+    return 1 if problems else 0
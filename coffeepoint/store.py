@@ -0,0 +1,213 @@
+"""Columnar Arrow sidecar store for parsed workbooks.
+
+The first upload of a workbook is parsed through openpyxl once and written
+as one uncompressed Arrow IPC (Feather v2) file per sheet under a directory
+named after the workbook fingerprint. Later sessions (and later processes)
+open the sidecar instead, reading only the projected columns through
+memory-mapped files. Arrow IPC keeps the enforced dtypes, including the
+categorical ID columns, which Parquet would store as plain integers.
+
+Every sheet is written as a single record batch, so reading it back yields
+zero-copy, read-only columns that point into the memory-mapped file: the
+page cache holds one copy of a dataset however many sessions or processes
+read it.
+
+The store is bounded: after every write, the sidecars of other format
+versions and abandoned scratch directories are removed, and the least
+recently opened sidecars are removed until the store fits ``max_bytes``.
+"""
+import os
+import re
+import shutil
+import tempfile
+import time
+
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from .schema import SCHEMA
+from .streaming import DEFAULT_CHUNK_ROWS
+
+# Bumped when the stored columns or dtypes change; older sidecars are removed
+FORMAT_VERSION = 2
+
+# Upper bound for the size of a store, derived data of its sidecars included
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024 * 1024
+# Scratch directories older than this were left behind by a crashed writer
+SCRATCH_MAX_AGE_SECONDS = 24 * 60 * 60
+
+# The app's workbook cache only writes sidecars when this names a directory;
+# the CLI stores them under DEFAULT_ROOT unless told otherwise
+STORE_ENV = "COFFEEPOINT_STORE_DIR"
+DEFAULT_ROOT = os.environ.get(
+    STORE_ENV, os.path.join(os.path.expanduser("~"), ".cache", "coffeepoint", "store")
+)
+
+
+def _filename(sheet):
+    return f"{sheet.lower()}.arrow"
+
+
+class SidecarDataset:
+    """A workbook backed by the Arrow files of a sidecar directory."""
+
+    # Decoded frames are not held in memory, so the cache budget is unaffected
+    nbytes = 0
+
+    def __init__(self, fingerprint, path):
+        self.fingerprint = fingerprint
+        self.path = path
+
+    def _file(self, sheet):
+        return os.path.join(self.path, _filename(sheet))
+
+    def read(self, sheet, columns=None):
+        """Read a sheet, decoding only the requested columns.
+
+        Numeric and date columns are read-only views of the mapped file.
+        """
+        table = feather.read_table(self._file(sheet), columns=columns, memory_map=True)
+        return table.to_pandas(split_blocks=True)
+
+    def iter_chunks(self, sheet, columns=None, chunk_rows=DEFAULT_CHUNK_ROWS, start=0, stop=None):
+        """Yield rows [start, stop) of a sheet as frames of at most ``chunk_rows`` rows."""
+        table = feather.read_table(self._file(sheet), columns=columns, memory_map=True)
+        stop = table.num_rows if stop is None else min(stop, table.num_rows)
+        for offset in range(start, stop, chunk_rows):
+            yield table.slice(offset, min(chunk_rows, stop - offset)).to_pandas(split_blocks=True)
+
+    def rows(self, sheet):
+        """Return the row count of a sheet without decoding it."""
+        return feather.read_table(self._file(sheet), memory_map=True).num_rows
+
+    def head(self, sheet, n=5):
+        """Read the first rows of a sheet without touching the whole file."""
+        reader = pa.ipc.open_file(pa.memory_map(self._file(sheet)))
+        if reader.num_record_batches == 0:
+            return reader.schema.empty_table().to_pandas()
+        return reader.get_batch(0).slice(0, n).to_pandas()
+
+    @property
+    def orders(self):
+        return self.read("Orders")
+
+    @property
+    def inventory(self):
+        return self.read("Inventory")
+
+    @property
+    def customers(self):
+        return self.read("Customers")
+
+
+def _size(path):
+    total = 0
+    for folder, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(folder, name))
+            except OSError:
+                pass
+    return total
+
+
+class SidecarStore:
+    """Directory of Arrow sidecars keyed by workbook fingerprint."""
+
+    def __init__(self, root=DEFAULT_ROOT, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def path(self, key):
+        return os.path.join(self.root, f"v{FORMAT_VERSION}", key)
+
+    def has(self, key):
+        return all(
+            os.path.exists(os.path.join(self.path(key), _filename(sheet))) for sheet in SCHEMA
+        )
+
+    def open(self, key):
+        """Return the stored dataset for a fingerprint, or None if absent."""
+        if not self.has(key):
+            return None
+        try:
+            # The modification time of a sidecar orders eviction
+            os.utime(self.path(key))
+        except OSError:
+            pass
+        return SidecarDataset(key, self.path(key))
+
+    def write(self, workbook):
+        """Write every sheet of a parsed workbook and return the stored dataset."""
+        parent = os.path.dirname(self.path(workbook.fingerprint))
+        os.makedirs(parent, exist_ok=True)
+        # Write into a scratch directory and rename it into place, so readers
+        # in other sessions never observe a partially written sidecar
+        scratch = tempfile.mkdtemp(prefix=".tmp-", dir=parent)
+        try:
+            for sheet in SCHEMA:
+                frame = workbook.read(sheet)
+                feather.write_feather(
+                    frame,
+                    os.path.join(scratch, _filename(sheet)),
+                    compression="uncompressed",
+                    chunksize=max(len(frame), 1),
+                )
+            os.replace(scratch, self.path(workbook.fingerprint))
+        except OSError:
+            # Another process stored the same fingerprint first
+            shutil.rmtree(scratch, ignore_errors=True)
+            if not self.has(workbook.fingerprint):
+                raise
+        self.prune(keep=workbook.fingerprint)
+        return SidecarDataset(workbook.fingerprint, self.path(workbook.fingerprint))
+
+    def remove(self, key):
+        shutil.rmtree(self.path(key), ignore_errors=True)
+
+    def prune(self, keep=None):
+        """Remove stale sidecars; return the fingerprints of the removed ones.
+
+        Sidecars of other format versions go first, then the least recently
+        opened sidecars until the store fits ``max_bytes``. The sidecar of
+        ``keep`` (e.g. the one just written) is never removed.
+        """
+        try:
+            versions = os.listdir(self.root)
+        except OSError:
+            return []
+        for name in versions:
+            if re.fullmatch(r"v\d+", name) and name != f"v{FORMAT_VERSION}":
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+        try:
+            entries = list(os.scandir(os.path.join(self.root, f"v{FORMAT_VERSION}")))
+        except OSError:
+            return []
+        sidecars, now = [], time.time()
+        for entry in entries:
+            try:
+                modified = entry.stat().st_mtime
+            except OSError:
+                continue
+            if entry.name.startswith(".tmp-"):
+                if now - modified > SCRATCH_MAX_AGE_SECONDS:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+            elif entry.is_dir():
+                sidecars.append((modified, entry.name, _size(entry.path)))
+        total = sum(size for _, _, size in sidecars)
+        removed = []
+        for _, key, size in sorted(sidecars):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            self.remove(key)
+            removed.append(key)
+            total -= size
+        return removed
+
+
+def store_from_env():
+    """Return the store configured by ``COFFEEPOINT_STORE_DIR``, or None if unset."""
+    root = os.environ.get(STORE_ENV)
+    return SidecarStore(root) if root else None
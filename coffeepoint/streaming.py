@@ -0,0 +1,93 @@
+"""Chunked ingestion of order files that do not fit in memory.
+
+Orders are read in bounded chunks from CSV, xlsx, Arrow IPC or Parquet files
+and every chunk is folded into ``OrderAggregates`` before the next one is
+read, so peak memory depends on the chunk size and the size of the
+aggregates, not on the length of the order history.
+
+    from coffeepoint.streaming import aggregate_orders_file
+    aggregates = aggregate_orders_file("orders-2024.csv")
+    abc = aggregates.abc()
+"""
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .incremental import OrderAggregates
+from .schema import enforce
+
+# Rows per chunk; each chunk is a regular DataFrame of that many orders
+DEFAULT_CHUNK_ROWS = 250_000
+
+
+def _extension(source):
+    name = getattr(source, "name", source)
+    return os.path.splitext(str(name))[1].lower()
+
+
+def _csv_chunks(source, chunk_rows):
+    yield from pd.read_csv(source, chunksize=chunk_rows)
+
+
+def _xlsx_chunks(source, chunk_rows, sheet):
+    # openpyxl is already required by pandas to read xlsx; its read-only mode
+    # streams rows instead of building the whole sheet in memory
+    from openpyxl import load_workbook
+
+    book = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = book[sheet].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        buffer = []
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            buffer.append(row)
+            if len(buffer) >= chunk_rows:
+                yield pd.DataFrame(buffer, columns=header)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=header)
+    finally:
+        book.close()
+
+
+def _arrow_chunks(source, chunk_rows):
+    table = pa.ipc.open_file(pa.memory_map(str(source))).read_all()
+    for start in range(0, table.num_rows, chunk_rows):
+        yield table.slice(start, chunk_rows).to_pandas()
+
+
+def _parquet_chunks(source, chunk_rows):
+    for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_rows):
+        yield batch.to_pandas()
+
+
+def iter_order_chunks(source, chunk_rows=DEFAULT_CHUNK_ROWS, sheet="Orders"):
+    """Yield typed chunks of at most ``chunk_rows`` orders from a file.
+
+    The format is chosen from the file extension: ``.csv``, ``.xlsx``,
+    ``.arrow``/``.feather`` or ``.parquet``.
+    """
+    extension = _extension(source)
+    if extension == ".csv":
+        chunks = _csv_chunks(source, chunk_rows)
+    elif extension in (".xlsx", ".xlsm"):
+        chunks = _xlsx_chunks(source, chunk_rows, sheet)
+    elif extension in (".arrow", ".feather"):
+        chunks = _arrow_chunks(source, chunk_rows)
+    elif extension == ".parquet":
+        chunks = _parquet_chunks(source, chunk_rows)
+    else:
+        raise ValueError(f"Unsupported order file format: {extension or source!r}")
+    for chunk in chunks:
+        yield enforce("Orders", chunk)
+
+
+def aggregate_orders_file(source, chunk_rows=DEFAULT_CHUNK_ROWS, sheet="Orders"):
+    """Stream an order file into ``OrderAggregates`` one chunk at a time."""
+    return OrderAggregates.from_chunks(iter_order_chunks(source, chunk_rows, sheet))
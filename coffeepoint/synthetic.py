@@ -0,0 +1,148 @@
+"""Seeded synthetic Coffee Point data at any scale.
+
+The generated sheets follow ``coffeepoint.schema`` and mimic real order
+data more closely than uniform noise:
+
+- product popularity follows a Pareto (Zipf) law, so a few products carry
+  most of the sales, as ABC analysis expects;
+- customer activity is Pareto distributed as well, and every customer orders
+  in bursts around a few active periods instead of uniformly over time.
+
+Orders are generated chunk by chunk, so tens of millions of rows can be
+written to disk without holding them in memory. The output depends only on
+the seed and the generation parameters (including ``chunk_rows``).
+"""
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from .schema import enforce
+from .streaming import DEFAULT_CHUNK_ROWS
+
+CATEGORIES = ("Coffee", "Tea", "Cakes")
+START_DATE = "2023-01-01"
+
+# Shape of the product popularity (Zipf exponent) and customer activity
+# (Pareto index; about 1.16 gives the 80/20 rule) distributions
+PRODUCT_SKEW = 1.1
+CUSTOMER_SKEW = 1.16
+# Active periods per customer and the mean spread of orders around them
+BURSTS = 3
+BURST_DAYS = 10
+
+
+class Generator:
+    """A seeded generator of synthetic orders, inventory and customers."""
+
+    def __init__(self, customers=1000, products=50, days=730, start=START_DATE, seed=0):
+        self.customers = customers
+        self.products = products
+        self.days = days
+        self.start = pd.Timestamp(start)
+        self.seed = seed
+        rng = np.random.default_rng([seed, 0])
+        popularity = 1.0 / np.arange(1, products + 1) ** PRODUCT_SKEW
+        self._product_cdf = np.cumsum(rng.permutation(popularity) / popularity.sum())
+        activity = rng.pareto(CUSTOMER_SKEW, customers) + 1.0
+        self._customer_cdf = np.cumsum(activity / activity.sum())
+        self._bursts = rng.integers(0, days, (customers, BURSTS))
+        self.prices = rng.uniform(2, 40, products).round(2)
+
+    def _draw(self, cdf, rng, rows):
+        # Inverse-CDF sampling; searchsorted is much faster than rng.choice(p=...)
+        return np.minimum(np.searchsorted(cdf, rng.random(rows)), len(cdf) - 1)
+
+    def orders(self, rows, first_id=1, rng=None):
+        """Return ``rows`` synthetic orders numbered from ``first_id``."""
+        rng = rng if rng is not None else np.random.default_rng([self.seed, 1])
+        customers = self._draw(self._customer_cdf, rng, rows)
+        products = self._draw(self._product_cdf, rng, rows)
+        centers = self._bursts[customers, rng.integers(0, BURSTS, rows)]
+        offsets = np.round(rng.laplace(0, BURST_DAYS, rows)).astype(np.int64)
+        days = np.clip(centers + offsets, 0, self.days - 1)
+        return pd.DataFrame(
+            {
+                "Order_ID": np.arange(first_id, first_id + rows, dtype=np.int64),
+                "Order_Date": self.start + pd.to_timedelta(days, unit="D"),
+                "Customer_ID": customers + 1,
+                "Product_ID": products + 1,
+                "Quantity": rng.geometric(0.45, rows).astype(np.int64),
+                "Price": self.prices[products],
+            }
+        )
+
+    def iter_orders(self, rows, chunk_rows=DEFAULT_CHUNK_ROWS, typed=True):
+        """Yield ``rows`` orders in chunks of at most ``chunk_rows``.
+
+        With ``typed`` the chunks have the enforced schema dtypes (categorical
+        IDs), otherwise the raw int64 IDs as written to files.
+        """
+        seeds = np.random.SeedSequence([self.seed, 2])
+        for start, seed in zip(range(0, rows, chunk_rows), seeds.spawn(-(-rows // chunk_rows))):
+            chunk = self.orders(
+                min(chunk_rows, rows - start), start + 1, np.random.default_rng(seed)
+            )
+            yield enforce("Orders", chunk) if typed else chunk
+
+    def inventory(self):
+        rng = np.random.default_rng([self.seed, 3])
+        ids = np.arange(1, self.products + 1)
+        return enforce(
+            "Inventory",
+            pd.DataFrame(
+                {
+                    "Product_ID": ids,
+                    "Product_Name": [f"Product_{i}" for i in ids],
+                    "Category": rng.choice(CATEGORIES, self.products),
+                    "Stock": rng.integers(0, 100, self.products),
+                }
+            ),
+        )
+
+    def customers_sheet(self, orders):
+        """Return the Customers sheet consistent with a frame of orders."""
+        spend = orders["Quantity"] * orders["Price"]
+        grouped = orders.assign(Total_Spent=spend).groupby("Customer_ID", observed=True)
+        sheet = grouped.agg(
+            Last_Purchase_Date=("Order_Date", "max"), Total_Spent=("Total_Spent", "sum")
+        )
+        return enforce("Customers", sheet.reset_index())
+
+    def workbook(self, rows):
+        """Return the three sheets for ``rows`` orders, held in memory."""
+        orders = enforce("Orders", self.orders(rows))
+        return {
+            "Orders": orders,
+            "Inventory": self.inventory(),
+            "Customers": self.customers_sheet(orders),
+        }
+
+
+def scaled(rows, seed=0):
+    """Return a generator with customer and product counts scaled to ``rows``."""
+    return Generator(
+        customers=max(rows // 25, 20),
+        products=int(np.clip(rows // 2000, 15, 2000)),
+        seed=seed,
+    )
+
+
+def write_orders_arrow(generator, path, rows, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Stream ``rows`` generated orders into an Arrow IPC file."""
+    writer = None
+    try:
+        for chunk in generator.iter_orders(rows, chunk_rows, typed=False):
+            batch = pa.RecordBatch.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pa.ipc.new_file(str(path), batch.schema)
+            writer.write_batch(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def write_workbook(generator, path, rows):
+    """Write a workbook with ``rows`` generated orders (at most about 1M rows)."""
+    with pd.ExcelWriter(path) as writer:
+        for sheet, frame in generator.workbook(rows).items():
+            frame.to_excel(writer, sheet_name=sheet, index=False)
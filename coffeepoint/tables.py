@@ -0,0 +1,96 @@
+"""Server-side sorted, filtered and paginated views of result tables.
+
+``st.dataframe`` serializes the whole frame to the browser on every rerun.
+``PagedTable`` keeps the frame on the server and returns one page at a time;
+the sort order of a column is computed once per direction (a stable argsort)
+and reused for every page and every later rerun, and the rows matching a
+filter are cached until the filter changes. Tables are keyed by the version
+of the data they show, so new data gets a new table and new sort orders.
+"""
+import threading
+
+import numpy as np
+
+from .registry import Registry
+
+DEFAULT_PAGE_SIZE = 50
+
+
+class PagedTable:
+    """A read-only frame served in pages."""
+
+    def __init__(self, frame):
+        self.frame = frame.reset_index(drop=True)
+        self.columns = list(self.frame.columns)
+        self._orders = {}
+        self._filter = (None, None, None)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.frame)
+
+    def sort_order(self, column, descending=False):
+        """Return the row positions ordering the table by a column.
+
+        The sort is stable both ways: rows with equal values keep their
+        order in the frame.
+        """
+        with self._lock:
+            order = self._orders.get((column, descending))
+            if order is None:
+                values = self.frame[column].to_numpy()
+                if descending:
+                    # Sorting the reversed values and reversing the result
+                    # keeps equal values in frame order
+                    reverse = np.argsort(values[::-1], kind="stable")[::-1]
+                    order = len(values) - 1 - reverse
+                else:
+                    order = np.argsort(values, kind="stable")
+                self._orders[column, descending] = order
+            return order
+
+    def matches(self, column, text):
+        """Return a boolean mask of rows whose column contains text, or None."""
+        if not column or not text:
+            return None
+        with self._lock:
+            cached_column, cached_text, mask = self._filter
+            if (cached_column, cached_text) != (column, text):
+                values = self.frame[column].astype(str)
+                mask = values.str.contains(text, case=False, regex=False).to_numpy()
+                self._filter = (column, text, mask)
+            return mask
+
+    def rows(self, sort=None, descending=False, filter_column=None, filter_text=None):
+        """Return the row positions of the table in display order."""
+        if sort is not None:
+            positions = self.sort_order(sort, descending)
+        else:
+            positions = np.arange(len(self.frame))
+        mask = self.matches(filter_column, filter_text)
+        if mask is not None:
+            positions = positions[mask[positions]]
+        return positions
+
+    def page(self, number, size=DEFAULT_PAGE_SIZE, **view):
+        """Return page ``number`` (from 0) of the view and the view's row count.
+
+        Numbers past either end return the first or the last page.
+        """
+        positions = self.rows(**view)
+        number = min(max(number, 0), page_count(len(positions), size) - 1)
+        start = number * size
+        return self.frame.iloc[positions[start:start + size]], len(positions)
+
+
+# Paged tables of recent results, keyed by dataset fingerprint and table name
+_tables = Registry(size=64)
+
+
+def paged_table(key, build):
+    """Return the paged table stored under key, building its frame once."""
+    return _tables.get_or_create(key, lambda: PagedTable(build()))
+
+
+def page_count(rows, size=DEFAULT_PAGE_SIZE):
+    return max(1, -(-rows // size))
@@ -0,0 +1,104 @@
+"""Daily and ISO-week sales series, rolling windows and growth rates."""
+import numpy as np
+import pandas as pd
+
+from .profiling import profiled
+
+# Window lengths (days) of the rolling sales columns
+ROLLING_WINDOWS = (7, 28)
+# Days between the periods compared by the week-over-week growth
+GROWTH_LAG = 7
+
+
+@profiled("sales_amount", rows=len)
+def sales_amount(orders):
+    """Return Quantity * Price for every order line.
+
+    Uses the Sales_Amount column precomputed on load when present.
+    """
+    if "Sales_Amount" in orders:
+        return orders["Sales_Amount"]
+    return orders["Quantity"] * orders["Price"]
+
+
+def daily_buckets(orders):
+    """Return total sales per Order_Date."""
+    return sales_amount(orders).groupby(orders["Order_Date"]).sum()
+
+
+def weekly_buckets(orders):
+    """Return total sales per (calendar year, ISO week number)."""
+    dates = orders["Order_Date"]
+    keys = [dates.dt.year.rename("Year"), dates.dt.isocalendar().week.rename("Week_Number")]
+    return sales_amount(orders).groupby(keys).sum()
+
+
+def daily_frame(daily):
+    """Format daily buckets as the Date/Daily_Sales table of the trends page."""
+    frame = daily.sort_index().reset_index()
+    frame.columns = ["Date", "Daily_Sales"]
+    return frame
+
+
+def weekly_frame(weekly):
+    """Format weekly buckets as the table plotted by the trends page."""
+    frame = weekly.sort_index().reset_index()
+    frame.columns = ["Year", "Week_Number", "Weekly_Sales"]
+    frame["Week"] = (
+        "Year " + frame["Year"].astype(str) + " - Week " + frame["Week_Number"].astype(str)
+    )
+    return frame
+
+
+def rolling_sales(daily, windows=ROLLING_WINDOWS, previous=None, since=None):
+    """Return rolling sales sums and week-over-week growth per calendar day.
+
+    ``daily`` holds total sales per Order_Date; days without orders count as
+    zero sales. Besides Date and Daily_Sales the table has a
+    ``Rolling_<n>_Day_Sales`` column per window and ``WoW_Growth``, the
+    change of the 7-day sum against the 7 days before it (NaN without sales
+    to compare to).
+
+    To extend an earlier table after new orders arrive, pass it as
+    ``previous`` with ``since``, the first day whose sales changed: its rows
+    before that day are kept and only the later days are computed again.
+    """
+    daily = daily.sort_index()
+    if daily.empty:
+        columns = ["Date", "Daily_Sales"] + [f"Rolling_{w}_Day_Sales" for w in windows]
+        return pd.DataFrame(columns=columns + ["WoW_Growth"])
+    first, last = daily.index[0], daily.index[-1]
+    start = first
+    if previous is not None and since is not None and len(previous):
+        since = pd.Timestamp(since).normalize()
+        first = min(first, previous["Date"].iloc[0])
+        if since > first:
+            # Windows ending on or after ``since`` reach back this many days
+            start = max(first, since - pd.Timedelta(days=max(windows) - 1 + GROWTH_LAG))
+        else:
+            previous = None
+    else:
+        previous = None
+
+    calendar = pd.date_range(start, last, freq="D", name="Date")
+    sales = daily.reindex(calendar, fill_value=0.0).astype("float64")
+    frame = pd.DataFrame({"Daily_Sales": sales})
+    for window in windows:
+        frame[f"Rolling_{window}_Day_Sales"] = sales.rolling(window, min_periods=1).sum()
+    week = sales.rolling(GROWTH_LAG).sum()
+    growth = week / week.shift(GROWTH_LAG) - 1
+    frame["WoW_Growth"] = growth.replace([np.inf, -np.inf], np.nan)
+    frame = frame.reset_index()
+    if previous is None:
+        return frame
+    return pd.concat(
+        [previous[previous["Date"] < since], frame[frame["Date"] >= since]], ignore_index=True
+    )
+
+
+def daily_sales(orders):
+    return daily_frame(daily_buckets(orders))
+
+
+def weekly_sales(orders):
+    return weekly_frame(weekly_buckets(orders))
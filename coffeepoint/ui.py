@@ -0,0 +1,525 @@
+"""Streamlit UI of the Coffee Point app.
+
+The UI only lays out pages: every analysis comes from the computation
+modules of the package (through the result cache, as background jobs), and
+whatever differs between variants of the app comes from a labeling profile
+(see ``coffeepoint.profiles``). An app script only runs it:
+
+    from coffeepoint import ui
+
+    ui.main("champions")
+
+Only light modules are imported up front: every page imports the analysis
+modules it needs, so the upload page shows without pandas or Plotly.
+"""
+import streamlit as st
+
+from .jobs import job_runner
+from .profiles import get_profile
+from .profiling import configure_from_env, profiled, profiler
+from .settings import DEFAULT_POINT_BUDGET
+from .widgets import background, order_filters, paged_dataframe, profiling_panel, session_jobs
+
+
+def _warm_up():
+    from . import figures
+
+    figures.warm_up()
+
+
+@st.cache_resource
+def warm_up_figures():
+    return job_runner.submit("warm_up_figures", _warm_up)
+
+
+# Define ABC Analysis function
+@profiled("page.abc_analysis")
+def abc_analysis(dataset, point_budget, profile, filters=None, approximate=False):
+    from . import figures
+    from .incremental import dataset_aggregates
+    from .results import abc_result, approximate_abc_result
+    from .sketches import DEFAULT_CAPACITY
+    from .tables import paged_table
+
+    st.subheader("ABC Analysis: Product Classification")
+
+    # Classify products into A, B, and C categories from the running per-product sales
+    # (computed once per dataset in the background and shared by every session);
+    # approximate mode keeps only the best-selling products in a heavy-hitters summary
+    classify = approximate_abc_result if approximate else abc_result
+    # Sessions of other profiles may classify with other thresholds
+    thresholds = tuple(profile.abc_thresholds)
+    abc_table = background(
+        ("abc", dataset.fingerprint, thresholds, filters, approximate),
+        lambda: classify(dataset, thresholds, filters=filters),
+        "Classifying products",
+    )
+    if abc_table is None:
+        return
+    aggregates = dataset_aggregates(dataset)
+
+    # Display results (one page at a time, sorted and filtered on the server)
+    st.write("ABC Analysis Results:")
+    if approximate:
+        # The bound is the same for every product
+        error = (abc_table["Sales_Upper"] - abc_table["Sales"]).max() if len(abc_table) else 0.0
+        st.caption(
+            f"Approximate: the {DEFAULT_CAPACITY} best-selling products at most are listed. "
+            f"Sales are lower bounds and may be up to {error:,.2f} higher (Sales_Upper); "
+            "every product not listed sold at most that much."
+        )
+    table = paged_table(
+        (dataset.fingerprint, "abc", aggregates.version, thresholds, filters, approximate),
+        lambda: abc_table,
+    )
+    paged_dataframe(table, key="abc")
+
+    # Plotting the results
+    st.plotly_chart(figures.abc_figure(abc_table, point_budget))
+
+    # Explanation and Recommendations
+    a_share, b_bound = profile.abc_thresholds
+    b_share, c_share = b_bound - a_share, 1 - b_bound
+    st.markdown(f"""
+        ### Criteria for ABC Classification:
+        - **Category A**: Top {a_share:.0%} of total sales (most critical products).
+        - **Category B**: Next {b_share:.0%} of total sales (important but less critical).
+        - **Category C**: Bottom {c_share:.0%} of total sales (least critical products).
+
+        ### Conclusions and Recommendations:
+        - **Category A (High Priority)**:
+          - **Criteria**: These products contribute to {a_share:.0%} of total sales.
+          - **Recommendations**:
+            - Ensure optimal stock levels to avoid stockouts.
+            - Prioritize these products in marketing campaigns and sales strategies.
+            - Monitor demand trends closely to ensure availability.
+        - **Category B (Medium Priority)**:
+          - **Criteria**: These products contribute to the next {b_share:.0%} of total sales.
+          - **Recommendations**:
+            - Maintain moderate stock levels, balancing availability and cost.
+            - {profile.growth_advice}
+            - Keep monitoring performance and move high-performing products to
+              Category A if possible.
+        - **Category C (Low Priority)**:
+          - **Criteria**: These products contribute to the bottom {c_share:.0%} of total sales.
+          - **Recommendations**:
+            - Minimize inventory and reduce investment in these products.
+            - Consider discontinuing or replacing low-performing items with better alternatives.
+            - Focus on streamlining the product portfolio to improve efficiency.
+    """)
+
+
+# Define FRM Analysis function with segmentation, pie chart, and benchmarks
+@profiled("page.frm_analysis")
+def frm_analysis(dataset, point_budget, profile, filters=None, approximate=False):
+    from . import figures
+    from .incremental import dataset_aggregates
+    from .results import approximate_rfm_result, rfm_result
+    from .rfm import segment_counts
+    from .sketches import DEFAULT_RELATIVE_ACCURACY
+    from .tables import paged_table
+
+    st.subheader("FRM Analysis: Customer Behavior")
+
+    # Score the running per-customer Recency/Frequency/Monetary aggregates into segments
+    # named by the profile (in the background, so other pages stay responsive meanwhile);
+    # approximate mode takes the score boundaries from mergeable quantile sketches
+    # instead of sorting
+    score = approximate_rfm_result if approximate else rfm_result
+    # Sessions of other profiles label the segments differently
+    segments = (profile.quantiles, profile.rules(), profile.default_segment())
+    frm_data = background(
+        ("frm", dataset.fingerprint, segments, filters, approximate),
+        lambda: score(dataset, *segments, filters=filters),
+        "Scoring customers",
+    )
+    if frm_data is None:
+        return
+    aggregates = dataset_aggregates(dataset)
+
+    st.write("FRM Analysis Results:")
+    if approximate:
+        st.caption(
+            "Approximate: every score boundary is within "
+            f"{DEFAULT_RELATIVE_ACCURACY:.0%} of the exact quantile, so customers that close "
+            "to a boundary may get a neighbouring score."
+        )
+    table = paged_table(
+        (dataset.fingerprint, "frm", aggregates.version, segments, filters, approximate),
+        lambda: frm_data.reset_index(),
+    )
+    paged_dataframe(table, key="frm")
+
+    # Plotting FRM results: Scatter Plot (binned into a 2-D histogram for many customers)
+    st.plotly_chart(figures.rfm_scatter_figure(frm_data, point_budget))
+
+    # Adding a Pie Chart for Segment Distribution
+    st.plotly_chart(figures.segment_pie_figure(segment_counts(frm_data)))
+
+    # Conclusions and Recommendations with Benchmarks
+    label = profile.label
+    st.markdown(f"""
+        ### Conclusions and Recommendations with Benchmarks:
+
+        - **{profile.top_segment_heading}** (Recency: 4, Frequency: 3-4, Monetary: 3-4):
+          - {profile.top_segment_description}
+          - **Recommendations**:
+            - Reward them with VIP programs, exclusive discounts, and personalized offers.
+            - Engage them further to encourage advocacy and word-of-mouth referrals.
+
+        - **{label('Loyal Customers')}** (Recency: 3-4, Frequency: 3-4, Monetary: 2-3):
+          - These customers are regular buyers but may not spend as much as {label('VIPs')}.
+          - **Recommendations**:
+            - Promote cross-sell and upsell opportunities to increase their spending.
+            - Keep them engaged with loyalty rewards and updates on new products.
+
+        - **{label('Potential Loyalists')}** (Recency: 3-4, Frequency: 2-3, Monetary: 2-3):
+          - These are relatively new customers who show potential to become loyal.
+          - **Recommendations**:
+            - Nurture them with targeted discounts, welcome offers, or loyalty programs.
+            - Monitor their purchasing behavior to transition them into
+              {label('Loyal Customers')} or {label('VIPs')}.
+
+        - **{label('Need Attention')}** (Recency: 2, Frequency: 2-3, Monetary: 1-2):
+          - These customers haven't purchased recently and are at risk of disengaging.
+          - **Recommendations**:
+            - Re-engage them with personalized offers or reminders.
+            - Address any issues they might have faced during previous purchases.
+
+        - **{label('At Risk')}** (Recency: 1, Frequency: 2-3, Monetary: 1-2):
+          - These customers have low recent activity and could be close to churning.
+          - **Recommendations**:
+            - Use win-back campaigns, such as discounts or reactivation emails.
+            - Offer incentives to bring them back to the purchasing cycle.
+
+        - **{label('Lost Customers')}** (Recency: 1, Frequency: 1-2, Monetary: 1-2):
+          - These customers haven't purchased in a long time and may no longer be active.
+          - **Recommendations**:
+            - Evaluate if it's worth re-engaging them or focus resources on acquiring
+              new customers.
+            - If attempting re-engagement, target them with significant offers or new
+              product launches.
+    """)
+
+
+# Define Customer Behavior Analysis
+@profiled("page.customer_behavior")
+def customer_behavior(dataset, point_budget):
+    from . import figures
+    from .tables import paged_table
+
+    st.subheader("Customer Behavior Analysis")
+    customers = dataset.read("Customers")
+    # Visualize total spending
+    st.plotly_chart(figures.customer_spending_figure(customers, point_budget))
+
+    # Recent Purchase Dates (most recent first)
+    st.write("Recent Purchase Dates:")
+    table = paged_table((dataset.fingerprint, "customers"), lambda: customers)
+    paged_dataframe(table, key="customers", sort="Last_Purchase_Date", descending=True)
+
+
+# Define function to visualize sales trends (daily and weekly with week numbers)
+@profiled("page.sales_trends")
+def sales_trends(dataset, point_budget, filters=None):
+    from . import figures
+    from .results import (
+        cohort_result,
+        daily_sales_result,
+        rolling_sales_result,
+        weekly_sales_result,
+    )
+
+    st.subheader("Sales Trends")
+    # Daily and weekly sales from the running per-period buckets, rolling windows
+    # over the daily series and cohorts from the customers' first and last orders
+    sales = background(
+        ("sales_trends", dataset.fingerprint, filters),
+        lambda: (
+            daily_sales_result(dataset, filters=filters),
+            weekly_sales_result(dataset, filters=filters),
+            rolling_sales_result(dataset, filters=filters),
+            cohort_result(dataset, filters=filters),
+        ),
+        "Computing sales trends",
+    )
+    if sales is None:
+        return
+    daily_sales, weekly_sales, rolling_sales, cohorts = sales
+
+    # Daily Sales Line Chart
+    st.markdown("### Daily Sales Trends")
+    st.plotly_chart(figures.daily_sales_figure(daily_sales, point_budget))
+
+    # Weekly Sales Line Chart
+    st.markdown("### Weekly Sales Trends")
+    st.plotly_chart(figures.weekly_sales_figure(weekly_sales, point_budget))
+
+    # 7- and 28-day rolling sales and week-over-week growth
+    st.markdown("### Rolling Sales and Growth")
+    st.plotly_chart(figures.rolling_sales_figure(rolling_sales, point_budget))
+    st.plotly_chart(figures.wow_growth_figure(rolling_sales, point_budget))
+
+    # Share of each month's new customers still ordering in the following months
+    st.markdown("### Customer Cohorts")
+    st.plotly_chart(figures.cohort_retention_figure(cohorts))
+    st.caption(
+        "A customer counts as retained in a month if their last order falls "
+        "in that month or later."
+    )
+
+
+# Define function to visualize inventory status
+@profiled("page.inventory_status")
+def inventory_status(dataset, point_budget, profile):
+    from . import figures
+    from .incremental import dataset_aggregates
+    from .inventory import (
+        LEAD_TIME_DAYS,
+        SAFETY_DAYS,
+        inventory_coverage,
+        stock_version,
+        update_stock,
+    )
+    from .loader import read_stock_levels
+    from .products import product_index
+    from .tables import paged_table
+
+    st.subheader("Inventory Status")
+    inventory = dataset.read("Inventory", columns=["Product_Name", "Category", "Stock"])
+
+    # Product-level inventory chart
+    st.plotly_chart(figures.inventory_product_figure(inventory, point_budget))
+
+    # Category-level inventory chart
+    category_inventory = product_index(dataset).category_stock().reset_index()
+    st.plotly_chart(figures.inventory_category_figure(category_inventory))
+
+    # Fresh stock counts replace the workbook's stock; the sales velocity from the
+    # orders is reused, so only the stock-dependent columns are recomputed
+    levels = st.file_uploader(
+        "Update stock levels (optional; Product_ID and Stock, plus Store for several stores)",
+        type=["xlsx", "csv"],
+    )
+    if levels:
+        upload_key = (dataset.fingerprint, getattr(levels, "file_id", levels.name))
+        if st.session_state.get("stock_levels") != upload_key:
+            try:
+                updated = update_stock(dataset, read_stock_levels(levels))
+            except ValueError as error:
+                st.error(str(error))
+            else:
+                st.session_state["stock_levels"] = upload_key
+                st.success(f"Stock levels of {updated} products updated.")
+
+    # Coverage of the stock at the sales velocity of every product
+    st.subheader("Inventory Coverage")
+    version = (
+        dataset_aggregates(dataset).version,
+        stock_version(dataset),
+        tuple(profile.abc_thresholds),
+    )
+    coverage = background(
+        ("coverage", dataset.fingerprint, version),
+        lambda: inventory_coverage(dataset, abc_thresholds=profile.abc_thresholds),
+        "Computing inventory coverage",
+    )
+    if coverage is None:
+        return
+    st.write(
+        f"{int(coverage['Reorder'].sum())} products are at or below their reorder point."
+    )
+    table = paged_table((dataset.fingerprint, "coverage", version), lambda: coverage)
+    paged_dataframe(table, key="coverage")
+    st.plotly_chart(figures.inventory_coverage_figure(coverage, point_budget))
+
+    safety = ", ".join(f"{days} days for category {label}" for label, days in SAFETY_DAYS)
+    st.markdown(f"""
+        ### How coverage is computed:
+        - **Daily velocity**: units sold per day, from the first to the last order date.
+        - **Days of cover**: current stock divided by the daily velocity.
+        - **Reorder point**: units sold during the {LEAD_TIME_DAYS}-day lead time plus
+          safety stock weighted by ABC category ({safety}).
+        - **Stockout date**: the last order date plus the days of cover.
+    """)
+
+
+def main(profile=None):
+    """Run the app with a labeling profile (a ``Profile`` or its name)."""
+    profile = get_profile(profile)
+
+    # Structured stage logs and the metrics endpoint, if configured
+    configure_from_env()
+
+    # Streamlit App
+    st.title("Coffee Point Data Analysis App")
+
+    # Sidebar for navigation
+    st.sidebar.title("Navigation")
+    page = st.sidebar.selectbox(
+        "Choose a page:",
+        [
+            "Home",
+            "ABC Analysis",
+            "FRM Analysis",
+            "Sales Trends",
+            "Inventory Status",
+            "Customer Behavior",
+        ],
+    )
+
+    # Charts with more points than the budget are reduced on the server before plotting
+    full_resolution = st.sidebar.checkbox("Full-resolution charts", value=False)
+    point_budget = None if full_resolution else st.sidebar.number_input(
+        "Chart point budget", min_value=100, value=DEFAULT_POINT_BUDGET, step=100
+    )
+
+    # Sketch-based ABC and FRM results with error bounds, for very large datasets
+    approximate = st.sidebar.checkbox("Approximate mode", value=False)
+
+    # Slow computations run as background jobs of this session; the jobs this run
+    # does not ask for again (after navigating away or a new upload) are cancelled
+    jobs = session_jobs()
+    jobs.begin_run()
+
+    # File upload for primary dataset: one workbook, or one workbook per store of the chain
+    uploaded_files = st.file_uploader(
+        "Upload your Coffee Point data file (Excel format; one file per store for several stores)",
+        type=["xlsx"],
+        accept_multiple_files=True,
+    )
+
+    dataset = chain = None
+    if uploaded_files:
+        # Imported here: the analysis stack loads once there is a file to analyze
+        from . import incremental, inventory
+        from .federation import FederatedDataset, load_stores, store_summary
+        from .incremental import append_orders
+        from .loader import load_workbook, read_order_batch, workbook_cache
+        from .orders import filtered_aggregates
+        from .products import product_index
+        from .results import result_cache
+
+        # Load primary data (parsed once per file content and stored as Arrow files;
+        # the files of several stores are parsed side by side)
+        upload_key = tuple(getattr(upload, "file_id", upload.name) for upload in uploaded_files)
+        if len(uploaded_files) == 1:
+            dataset = background(
+                ("load", upload_key),
+                lambda: load_workbook(uploaded_files[0]),
+                "Loading the data file",
+            )
+        else:
+            dataset = chain = background(
+                ("load", upload_key),
+                lambda: load_stores(uploaded_files),
+                "Loading the data files of every store",
+            )
+    else:
+        st.info("Please upload a valid Excel file to proceed.")
+
+    if dataset is not None:
+        # Chain-wide analyses, or the analyses of a single store
+        if isinstance(chain, FederatedDataset):
+            store = st.sidebar.selectbox("Store", ["All stores"] + list(chain.stores))
+            if store != "All stores":
+                dataset = chain.stores[store]
+
+        if st.sidebar.button("Reload data file"):
+            jobs.cancel_all()
+            reloaded = [dataset] if chain is None else [chain] + list(chain.stores.values())
+            for each in reloaded:
+                workbook_cache.invalidate(each.fingerprint, purge=True)
+                incremental.forget(each.fingerprint)
+                inventory.forget(each.fingerprint)
+                result_cache.invalidate(each.fingerprint)
+            st.rerun()
+
+        # Optional batch of new orders, folded into the running aggregates only once
+        # (for a single workbook; the aggregates of a chain are merged from its stores)
+        new_orders = None
+        if chain is None:
+            new_orders = st.sidebar.file_uploader(
+                "Append new orders (optional)", type=["xlsx", "csv"]
+            )
+        if new_orders:
+            # The batch is parsed once per upload, not on every rerun
+            batch_key = (dataset.fingerprint, getattr(new_orders, "file_id", new_orders.name))
+            appended = st.session_state.get("new_orders")
+            if appended is None or appended[0] != batch_key:
+                appended = (batch_key, append_orders(dataset, read_order_batch(new_orders)))
+                st.session_state["new_orders"] = appended
+            if appended[1]:
+                st.sidebar.success("New orders added to the analyses.")
+            else:
+                st.sidebar.info("These orders were already added.")
+
+        # Date range, category and customer filters of the order-based analyses
+        order_pages = ("ABC Analysis", "FRM Analysis", "Sales Trends")
+        filters = view = None
+        if page in order_pages:
+            # The date bounds come from the running aggregates; the order index
+            # is only built once a filter is set (see filtered_aggregates)
+            aggregates = background(
+                ("aggregates", dataset.fingerprint),
+                lambda: incremental.dataset_aggregates(dataset),
+                "Aggregating orders",
+            )
+            if aggregates is not None:
+                filters = order_filters(aggregates, product_index(dataset).categories)
+                view = background(
+                    ("view", dataset.fingerprint, filters),
+                    lambda: filtered_aggregates(dataset, filters),
+                    "Filtering orders",
+                )
+
+        # Navigation Logic
+        if page in order_pages and view is None:
+            # Still indexing or filtering; the progress bar is shown above
+            pass
+
+        elif view is not None and view.rows == 0:
+            st.info("No orders match the selected filters.")
+
+        elif page == "Home":
+            st.write("Welcome to the Coffee Point Data Analysis App!")
+            if chain is not None:
+                summary = background(
+                    ("stores", chain.fingerprint),
+                    lambda: store_summary(chain),
+                    "Summarizing stores",
+                )
+                if summary is not None:
+                    st.write(f"Stores ({len(chain)}):")
+                    st.dataframe(summary, hide_index=True)
+            st.write("Preview of Orders data:")
+            st.dataframe(dataset.head("Orders"))
+            st.write("Preview of Inventory data:")
+            st.dataframe(dataset.head("Inventory"))
+            st.write("Preview of Customers data:")
+            st.dataframe(dataset.head("Customers"))
+
+        elif page == "ABC Analysis":
+            abc_analysis(dataset, point_budget, profile, filters, approximate)
+
+        elif page == "FRM Analysis":
+            frm_analysis(dataset, point_budget, profile, filters, approximate)
+
+        elif page == "Sales Trends":
+            sales_trends(dataset, point_budget, filters)
+
+        elif page == "Inventory Status":
+            inventory_status(dataset, point_budget, profile)
+
+        elif page == "Customer Behavior":
+            customer_behavior(dataset, point_budget)
+
+    jobs.end_run()
+
+    # Once per process, after the first page is drawn, import Plotly and load its
+    # templates in the background, so the first chart does not wait for them
+    warm_up_figures()
+
+    # Optional debug panel with per-stage timings across all sessions
+    if st.sidebar.checkbox("Show performance panel", value=False):
+        profiling_panel(profiler)
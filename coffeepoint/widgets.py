@@ -0,0 +1,147 @@
+"""Streamlit widgets shared by the app pages.
+
+The app imports this module before any file is uploaded, so the analysis
+modules (and pandas with them) are only imported by the widgets that show
+analysis data.
+"""
+from concurrent.futures import TimeoutError
+
+import streamlit as st
+
+from .jobs import SessionJobs
+
+
+def paged_dataframe(table, key, sort=None, descending=False, page_size=None):
+    """Show one page of a ``PagedTable`` with sort, filter and page controls.
+
+    Only the rows of the visible page are sent to the browser.
+    """
+    # Imported here: the tables need numpy (see the module docstring)
+    from .tables import DEFAULT_PAGE_SIZE, page_count
+
+    page_size = page_size or DEFAULT_PAGE_SIZE
+    columns = table.columns
+    sort_options = ["(none)"] + columns
+    controls = st.columns(4)
+    sort = controls[0].selectbox(
+        "Sort by", sort_options, index=sort_options.index(sort or "(none)"), key=f"{key}-sort"
+    )
+    descending = controls[1].checkbox("Descending", value=descending, key=f"{key}-descending")
+    filter_column = controls[2].selectbox("Filter column", columns, key=f"{key}-filter-column")
+    filter_text = controls[3].text_input("Contains", key=f"{key}-filter-text")
+
+    view = {
+        "sort": None if sort == "(none)" else sort,
+        "descending": descending,
+        "filter_column": filter_column,
+        "filter_text": filter_text,
+    }
+    rows = len(table.rows(**view))
+    pages = page_count(rows, page_size)
+    number = st.number_input("Page", min_value=1, max_value=pages, value=1, key=f"{key}-page")
+    page, rows = table.page(min(number, pages) - 1, page_size, **view)
+    st.dataframe(page)
+    start = (min(number, pages) - 1) * page_size
+    st.caption(f"Rows {min(start + 1, rows)}-{start + len(page)} of {rows}")
+
+
+def profiling_panel(profiler):
+    """Show per-stage latency percentiles, rows and memory deltas in the sidebar."""
+    summary = profiler.summary()
+    with st.sidebar.expander("Performance", expanded=True):
+        if not summary:
+            st.caption("No stages recorded yet.")
+            return
+        st.dataframe(
+            [
+                {
+                    "Stage": entry["stage"],
+                    "Calls": entry["count"],
+                    "Last (ms)": round(entry["last_seconds"] * 1000, 1),
+                    "p50 (ms)": round(entry["p50_seconds"] * 1000, 1),
+                    "p95 (ms)": round(entry["p95_seconds"] * 1000, 1),
+                    "Rows": entry["last_rows"],
+                    "Memory (MiB)": round(entry["last_rss_delta_bytes"] / 2**20, 1),
+                }
+                for entry in summary
+            ],
+            hide_index=True,
+        )
+        if st.button("Reset timings"):
+            profiler.clear()
+
+
+def order_filters(span, categories, key="filters"):
+    """Show date range, category and customer filters in the sidebar.
+
+    ``span`` has the ``first_date`` and ``last_date`` of the dataset's orders
+    (its ``OrderAggregates`` or ``OrderIndex``) and ``categories`` the
+    inventory's category names. Returns an ``OrderFilter``; filters left at
+    their defaults are None, so the unfiltered view shares its cached results.
+    """
+    # Imported here: the order index needs pandas (see the module docstring)
+    import pandas as pd
+
+    from .orders import OrderFilter
+
+    with st.sidebar.expander("Filters"):
+        if span.first_date is None:
+            return OrderFilter()
+        first, last = span.first_date.date(), span.last_date.date()
+        dates = st.date_input(
+            "Order dates", value=(first, last), min_value=first, max_value=last, key=f"{key}-dates"
+        )
+        # While a range is being picked only its start is set
+        start, end = (tuple(dates) + (last,))[:2] if dates else (first, last)
+        selected = st.multiselect("Categories", list(categories), key=f"{key}-categories")
+        text = st.text_input("Customer IDs (comma-separated)", key=f"{key}-customers")
+    customers = tuple(sorted({part.strip() for part in text.split(",") if part.strip()}))
+    return OrderFilter(
+        start=None if start <= first else pd.Timestamp(start),
+        end=None if end >= last else pd.Timestamp(end),
+        categories=tuple(sorted(selected)) or None,
+        customers=customers or None,
+    )
+
+
+# Results that arrive within this many seconds are shown without a progress bar
+QUICK_SECONDS = 0.2
+# Polling interval of the progress bar of a running job
+POLL_SECONDS = 0.5
+
+
+def session_jobs():
+    """Return the background jobs of the current session."""
+    if "coffeepoint-jobs" not in st.session_state:
+        st.session_state["coffeepoint-jobs"] = SessionJobs()
+    return st.session_state["coffeepoint-jobs"]
+
+
+@st.fragment(run_every=POLL_SECONDS)
+def _job_progress(job, label):
+    if job.done():
+        # Render the page again, now with the result
+        st.rerun()
+    st.progress(job.progress, text=job.message or label)
+
+
+def background(key, function, label):
+    """Return ``function()``, computed by a background job of this session.
+
+    While the job runs, a progress bar is shown and None is returned; the
+    page reruns by itself once the result is ready. Later runs asking for
+    the same ``key`` reuse the running job instead of starting another.
+    """
+    jobs = session_jobs()
+    job = jobs.request(key, function)
+    try:
+        return job.result(QUICK_SECONDS)
+    except TimeoutError:
+        if job.done():
+            raise
+        _job_progress(job, label)
+        return None
+    finally:
+        # Finished jobs, failed ones included, are submitted again next time
+        if job.done():
+            jobs.release(key)
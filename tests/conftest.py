@@ -0,0 +1,19 @@
+import pytest
+
+from coffeepoint.synthetic import Generator
+
+
+@pytest.fixture(scope="session")
+def generator():
+    return Generator(customers=400, products=30, days=365, seed=7)
+
+
+@pytest.fixture(scope="session")
+def workbook(generator):
+    """The sheets of a small synthetic workbook, with enforced dtypes."""
+    return generator.workbook(20_000)
+
+
+@pytest.fixture(scope="session")
+def orders(workbook):
+    return workbook["Orders"]
@@ -0,0 +1,76 @@
+"""Comparisons shared by the tests."""
+import numpy as np
+import pandas as pd
+
+# Ranks at which the quantile sketches of two aggregates are compared
+RANKS = np.linspace(0, 1, 41)
+
+
+def plain(series):
+    """Return a Series with a plain (non-categorical) index, sorted by it."""
+    series = series.copy()
+    if isinstance(series.index, pd.CategoricalIndex):
+        series.index = series.index.astype(series.index.categories.dtype)
+    return series.sort_index()
+
+
+def assert_summaries_equal(actual, expected):
+    """Assert that two ``OrderAggregates`` hold the same approximate-mode summaries."""
+    sketches, expected_sketches = actual.customer_sketches(), expected.customer_sketches()
+    assert sketches.count == expected_sketches.count
+    pd.testing.assert_series_equal(
+        sketches.last_orders.sort_index(),
+        expected_sketches.last_orders.sort_index(),
+        check_index_type=False,
+        check_freq=False,
+    )
+    for name in ("frequency", "monetary"):
+        np.testing.assert_array_equal(
+            getattr(sketches, name).quantile(RANKS),
+            getattr(expected_sketches, name).quantile(RANKS),
+        )
+    for quantiles in (3, 4, 5):
+        for column, values in sketches.boundaries(quantiles).items():
+            np.testing.assert_array_equal(
+                values, expected_sketches.boundaries(quantiles)[column], err_msg=column
+            )
+    hitters, expected_hitters = actual.hitters(), expected.hitters()
+    assert np.isclose(hitters.total, expected_hitters.total)
+    pd.testing.assert_series_equal(
+        plain(hitters.top()).astype("float64"),
+        plain(expected_hitters.top()).astype("float64"),
+        check_index_type=False,
+    )
+
+
+def assert_aggregates_equal(actual, expected, units=True):
+    """Assert that two ``OrderAggregates`` describe the same orders.
+
+    Filtered views have no units sold; pass ``units=False`` to skip them.
+    The summaries of the approximate mode are compared as well.
+    """
+    assert actual.rows == expected.rows
+    pd.testing.assert_series_equal(
+        plain(actual.product_sales), plain(expected.product_sales), check_names=False
+    )
+    if units:
+        pd.testing.assert_series_equal(
+            plain(actual.product_units).astype("int64"),
+            plain(expected.product_units).astype("int64"),
+            check_names=False,
+        )
+    customers = actual.customers.sort_index()
+    expected_customers = expected.customers.sort_index()
+    pd.testing.assert_frame_equal(
+        customers.reset_index(drop=True),
+        expected_customers.reset_index(drop=True),
+        check_dtype=False,
+    )
+    assert list(customers.index.astype("int64")) == list(expected_customers.index.astype("int64"))
+    pd.testing.assert_series_equal(
+        plain(actual.daily), plain(expected.daily), check_names=False, check_freq=False
+    )
+    pd.testing.assert_series_equal(
+        plain(actual.weekly), plain(expected.weekly), check_names=False, check_dtype=False
+    )
+    assert_summaries_equal(actual, expected)
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from coffeepoint import bench, cli
+
+STAGES = [
+    "generate", "load_xlsx", "aggregate", "abc_analysis", "frm_analysis", "sales_trends",
+    "cohorts", "approximate_abc", "approximate_frm", "inventory_coverage",
+]
+
+
+def report(seconds):
+    return {
+        "results": [
+            {"size": 1_000, "stage": stage, "seconds": value}
+            for stage, value in seconds.items()
+        ]
+    }
+
+
+@pytest.mark.parametrize(
+    "text, rows", [("10k", 10_000), ("1m", 1_000_000), ("2.5M", 2_500_000), ("1_500", 1_500)]
+)
+def test_parse_size(text, rows):
+    assert bench.parse_size(text) == rows
+
+
+def test_compare_reports_only_real_slowdowns():
+    baseline = report({"aggregate": 1.0, "cohorts": 0.01, "abc_analysis": 2.0})
+    current = report(
+        {
+            "aggregate": 1.5,  # 50% slower
+            "cohorts": 0.03,  # 200% slower, but below the absolute noise floor
+            "abc_analysis": 2.1,  # within the tolerance
+            "inventory_coverage": 9.0,  # not in the baseline
+        }
+    )
+    assert bench.compare(baseline, current) == [(1_000, "aggregate", 1.0, 1.5)]
+    assert bench.compare(baseline, current, tolerance=0.6) == []
+    assert bench.compare(baseline, current, min_seconds=0.0) == [
+        (1_000, "aggregate", 1.0, 1.5),
+        (1_000, "cohorts", 0.01, 0.03),
+    ]
+
+
+def test_bench_times_every_stage_of_a_tiny_dataset(tmp_path):
+    records = bench.run([1_000], xlsx_max_rows=1_000, workdir=str(tmp_path))["results"]
+
+    assert [record["stage"] for record in records] == STAGES
+    for record in records:
+        assert record["size"] == record["rows"] == 1_000
+        assert record["seconds"] > 0 and record["peak_rss_bytes"] > 0
+    # The generated files are removed with the scratch directory
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_bench_command_writes_the_report(tmp_path):
+    out = tmp_path / "bench.json"
+    argv = ["bench", "--sizes", "1k", "--xlsx-max-rows", "0", "--workdir", str(tmp_path)]
+    assert cli.main([*argv, "--out", str(out)]) == 0
+
+    written = json.loads(out.read_text())
+    assert written["environment"]["pandas"]
+    stages = [record["stage"] for record in written["results"]]
+    assert stages == [stage for stage in STAGES if stage != "load_xlsx"]
+
+
+@pytest.mark.parametrize("baseline_seconds, code", [(1.0, 1), (1.4, 0)])
+def test_bench_command_fails_on_regressions(
+    tmp_path, monkeypatch, capsys, baseline_seconds, code
+):
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(report({"aggregate": baseline_seconds})))
+    monkeypatch.setattr(bench, "run", lambda *args, **kwargs: report({"aggregate": 1.5}))
+
+    argv = ["bench", "--sizes", "1k", "--out", str(tmp_path / "bench.json")]
+    assert cli.main([*argv, "--baseline", str(baseline)]) == code
+    regressions = "regression: aggregate at 1,000 rows" in capsys.readouterr().err
+    assert regressions == bool(code)
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from coffeepoint.charts import bin_2d, downsample_line, lttb_indices, top_n
+
+
+@pytest.fixture(scope="module")
+def series():
+    days = pd.date_range("2024-01-01", periods=5_000, freq="h")
+    sales = np.sin(np.arange(len(days)) / 200) * 100 + 500
+    sales[1_234] = 5_000  # a spike
+    sales[3_210] = -2_000  # a dip
+    return pd.DataFrame({"Date": days, "Sales": sales})
+
+
+@pytest.fixture(scope="module")
+def customers():
+    rng = np.random.default_rng(5)
+    return pd.DataFrame(
+        {
+            "Customer_ID": np.arange(20_000),
+            "Recency": rng.integers(0, 365, 20_000),
+            "Frequency": rng.integers(1, 30, 20_000),
+            "Monetary": rng.lognormal(4, 1, 20_000),
+            "Segment": rng.choice(["VIPs", "At Risk", "Lost Customers"], 20_000),
+        }
+    )
+
+
+@pytest.mark.parametrize("budget", [3, 100, 999])
+def test_lttb_keeps_the_budget_the_ends_and_the_extremes(series, budget):
+    kept = lttb_indices(series["Date"], series["Sales"], budget)
+
+    assert len(kept) == budget
+    assert kept[0] == 0 and kept[-1] == len(series) - 1
+    assert np.all(np.diff(kept) > 0)
+    if budget > 3:
+        assert {1_234, 3_210} <= set(kept)
+
+
+def test_series_within_the_budget_are_unchanged(series):
+    assert downsample_line(series, "Date", "Sales", budget=len(series)) is series
+    assert len(downsample_line(series, "Date", "Sales", budget=500)) == 500
+
+
+def test_top_n_folds_the_rest_into_other(customers):
+    bars = top_n(customers, "Customer_ID", "Monetary", budget=50)
+
+    assert len(bars) == 50
+    largest = customers.nlargest(49, "Monetary")
+    assert list(bars["Customer_ID"][:49]) == list(largest["Customer_ID"].astype(str))
+    assert bars["Customer_ID"].iloc[-1] == "Other"
+    other = customers["Monetary"].sum() - largest["Monetary"].sum()
+    assert bars["Monetary"].iloc[-1] == pytest.approx(other)
+
+
+def test_top_n_keeps_one_other_bar_per_group(customers):
+    bars = top_n(customers, "Customer_ID", "Monetary", budget=50, by="Segment")
+
+    assert len(bars) == 50
+    others = bars[bars["Customer_ID"].str.startswith("Other")]
+    assert sorted(others["Customer_ID"]) == [
+        "Other (At Risk)", "Other (Lost Customers)", "Other (VIPs)"
+    ]
+    totals = bars.groupby("Segment")["Monetary"].sum()
+    expected = customers.groupby("Segment")["Monetary"].sum()
+    pd.testing.assert_series_equal(totals, expected, check_names=False)
+
+
+@pytest.mark.parametrize("by", [None, "Segment"])
+def test_bins_count_every_point(customers, by):
+    binned = bin_2d(customers, "Recency", "Monetary", budget=400, by=by, size="Frequency")
+
+    assert len(binned) <= 400
+    assert binned["Count"].sum() == len(customers)
+    if by is not None:
+        counts = binned.groupby(by)["Count"].sum()
+        pd.testing.assert_series_equal(
+            counts, customers[by].value_counts().sort_index(), check_names=False
+        )
+    # Bin centers lie within the range of the data, sizes are bin means
+    assert binned["Recency"].between(0, customers["Recency"].max()).all()
+    assert binned["Frequency"].between(1, 29).all()
+
+
+def test_small_scatters_are_unchanged(customers):
+    small = customers.head(100)
+    assert bin_2d(small, "Recency", "Monetary", budget=100) is small
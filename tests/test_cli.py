@@ -0,0 +1,57 @@
+import json
+
+import pandas as pd
+import pytest
+
+from coffeepoint import cli
+from coffeepoint.synthetic import Generator, write_workbook
+
+
+@pytest.fixture(scope="module")
+def workbook_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("cli") / "coffee.xlsx"
+    write_workbook(Generator(customers=100, products=15, seed=3), path, 2_000)
+    return str(path)
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        ["--quantiles", "1"],
+        ["--quantiles", "10"],
+        ["--abc-thresholds", "0.9", "0.7"],
+        ["--abc-thresholds", "0", "0.9"],
+        ["--abc-thresholds", "0.7", "1"],
+    ],
+)
+def test_rejects_invalid_options(workbook_path, tmp_path, options, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main(["analyze", workbook_path, "--out", str(tmp_path), "--no-store", *options])
+    assert exit_info.value.code == 2
+    assert "must" in capsys.readouterr().err
+
+
+def test_analyze_writes_results(workbook_path, tmp_path, capsys):
+    argv = [
+        "analyze", workbook_path, "--out", str(tmp_path), "--no-store", "--charts", "none",
+        "--profile", "champions", "--abc-thresholds", "0.6", "0.85",
+    ]
+    assert cli.main(argv) == 0
+    manifest = json.loads(capsys.readouterr().out)
+    assert manifest["profile"] == "champions"
+    assert manifest["abc_thresholds"] == [0.6, 0.85]
+    segments = pd.read_parquet(tmp_path / manifest["files"]["segments"])
+    assert "Champions" in set(segments["Segment"]) and "VIPs" not in set(segments["Segment"])
+    assert segments["Count"].sum() == 100
+
+
+def test_analyze_scores_other_quantile_counts(workbook_path, tmp_path, capsys):
+    argv = [
+        "analyze", workbook_path, "--out", str(tmp_path), "--no-store", "--charts", "none",
+        "--quantiles", "5",
+    ]
+    assert cli.main(argv) == 0
+    manifest = json.loads(capsys.readouterr().out)
+    assert manifest["quantiles"] == 5
+    segments = pd.read_parquet(tmp_path / manifest["files"]["segments"])
+    assert segments["Count"].sum() == 100
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+from coffeepoint.cohorts import cohort_retention
+from coffeepoint.incremental import OrderAggregates
+from coffeepoint.trends import rolling_sales
+
+
+def baseline_retention(orders):
+    # Retention counted customer by customer from the orders
+    months = orders["Order_Date"].dt.to_period("M")
+    first = months.groupby(orders["Customer_ID"]).min()
+    last = months.groupby(orders["Customer_ID"]).max()
+    end = months.max()
+    rows = {}
+    for cohort in sorted(first.unique()):
+        members = first == cohort
+        lifetime = (last[members] - first[members]).map(lambda offset: offset.n)
+        span = (end - cohort).n
+        row = {"Customers": int(members.sum())}
+        for k in range(len(pd.period_range(first.min(), end, freq="M"))):
+            row[f"Month_{k}"] = (lifetime >= k).mean() if k <= span else np.nan
+        rows[cohort.strftime("%Y-%m")] = row
+    return pd.DataFrame.from_dict(rows, orient="index").rename_axis("Cohort")
+
+
+def baseline_rolling(orders, windows=(7, 28)):
+    # Rolling sums over every calendar day, from the orders of each window
+    amount = orders["Quantity"] * orders["Price"]
+    days = orders["Order_Date"].dt.normalize()
+    rows = []
+    for day in pd.date_range(days.min(), days.max(), freq="D"):
+        row = {"Date": day, "Daily_Sales": amount[days == day].sum()}
+        for window in windows:
+            inside = (days > day - pd.Timedelta(days=window)) & (days <= day)
+            row[f"Rolling_{window}_Day_Sales"] = amount[inside].sum()
+        rows.append(row)
+    frame = pd.DataFrame(rows)
+    week = frame["Daily_Sales"].rolling(7).sum()
+    frame["WoW_Growth"] = (week / week.shift(7) - 1).replace([np.inf, -np.inf], np.nan)
+    return frame
+
+
+def test_cohort_retention_matches_pandas(orders):
+    actual = cohort_retention(OrderAggregates.from_orders(orders).customers)
+    pd.testing.assert_frame_equal(actual, baseline_retention(orders), check_dtype=False)
+
+
+def test_cohort_retention_of_no_customers():
+    retention = cohort_retention(OrderAggregates().customers)
+    assert retention.empty and list(retention.columns) == ["Customers"]
+
+
+def test_rolling_sales_match_pandas(orders):
+    aggregates = OrderAggregates.from_orders(orders)
+    pd.testing.assert_frame_equal(
+        rolling_sales(aggregates.daily),
+        baseline_rolling(orders),
+        check_dtype=False,
+        check_freq=False,
+    )
@@ -0,0 +1,105 @@
+import pandas as pd
+import pytest
+
+from coffeepoint import incremental
+from coffeepoint.federation import (
+    STORE_COLUMN,
+    FederatedDataset,
+    load_stores,
+    store_names,
+    store_summary,
+)
+from coffeepoint.incremental import OrderAggregates, dataset_aggregates
+from coffeepoint.inventory import inventory_coverage
+from coffeepoint.loader import Workbook, WorkbookCache
+from coffeepoint.synthetic import Generator, write_workbook
+
+from .helpers import assert_aggregates_equal
+
+STORES = ("Downtown", "Airport", "Campus")
+
+
+@pytest.fixture(autouse=True)
+def fresh_registries():
+    incremental.forget()
+
+
+@pytest.fixture(scope="module")
+def chain():
+    # The stores share products and some customers, with their own order histories
+    return FederatedDataset(
+        (name, Workbook(name, Generator(customers=150, products=20, seed=seed).workbook(3_000)))
+        for seed, name in enumerate(STORES)
+    )
+
+
+def test_chain_aggregates_are_the_sum_of_the_stores(chain):
+    combined = dataset_aggregates(chain)
+    stores = [dataset_aggregates(store) for store in chain.stores.values()]
+
+    assert combined.rows == sum(store.rows for store in stores) == 9_000
+    expected_sales = sum(store.product_sales.sum() for store in stores)
+    assert combined.product_sales.sum() == pytest.approx(expected_sales)
+    assert combined.product_units.sum() == sum(store.product_units.sum() for store in stores)
+    # The same as aggregating the orders of every store at once
+    assert_aggregates_equal(combined, OrderAggregates.from_orders(chain.read("Orders")))
+
+
+def test_reads_keep_the_store_of_every_row(chain):
+    orders = chain.read("Orders")
+
+    assert list(orders[STORE_COLUMN].cat.categories) == list(STORES)
+    assert orders[STORE_COLUMN].value_counts(sort=False).to_dict() == dict.fromkeys(STORES, 3_000)
+    for name, store in chain.stores.items():
+        rows = orders[orders[STORE_COLUMN] == name].drop(columns=STORE_COLUMN)
+        pd.testing.assert_frame_equal(
+            rows.reset_index(drop=True),
+            store.read("Orders").reset_index(drop=True),
+            check_categorical=False,
+        )
+
+    columns = [STORE_COLUMN, "Quantity"]
+    chunks = list(chain.iter_chunks("Orders", columns, chunk_rows=1_000))
+    assert len(chunks) == 9 and all(list(chunk.columns) == columns for chunk in chunks)
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), orders[columns])
+    assert chain.head("Inventory", 3)[STORE_COLUMN].tolist() == ["Downtown"] * 3
+    assert "Store" not in chain.read("Orders", ["Quantity"]).columns
+
+
+def test_chain_coverage_is_the_coverage_of_every_store(chain):
+    coverage = inventory_coverage(chain)
+
+    assert coverage.columns[0] == STORE_COLUMN
+    assert list(coverage[STORE_COLUMN].cat.categories) == list(STORES)
+    for name, store in chain.stores.items():
+        rows = coverage[coverage[STORE_COLUMN] == name].drop(columns=STORE_COLUMN)
+        pd.testing.assert_frame_equal(
+            rows.reset_index(drop=True), inventory_coverage(store).reset_index(drop=True)
+        )
+
+
+def test_store_summary(chain):
+    summary = store_summary(chain)
+    assert list(summary[STORE_COLUMN]) == list(STORES)
+    assert list(summary["Orders"]) == [3_000] * 3
+    assert summary["Sales"].sum() == pytest.approx(dataset_aggregates(chain).product_sales.sum())
+
+
+def test_stores_are_loaded_from_a_directory(tmp_path):
+    for seed, name in enumerate(["b-store", "a-store"]):
+        generator = Generator(customers=50, products=15, seed=seed)
+        write_workbook(generator, tmp_path / f"{name}.xlsx", 500)
+    (tmp_path / "~$a-store.xlsx").write_bytes(b"lock file")
+    (tmp_path / "notes.txt").write_text("not a workbook")
+
+    chain = load_stores(str(tmp_path), cache=WorkbookCache())
+    assert list(chain.stores) == ["a-store", "b-store"]
+    assert chain.rows("Orders") == 1_000
+    with pytest.raises(ValueError):
+        load_stores([], cache=WorkbookCache())
+
+
+def test_duplicate_store_names_are_numbered():
+    assert store_names(["x/outlet.xlsx", "y/outlet.xlsx", "outlet.xlsx", "x/"]) == [
+        "outlet", "outlet (2)", "outlet (3)", "Store"
+    ]
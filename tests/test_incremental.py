@@ -0,0 +1,98 @@
+import pandas as pd
+import pytest
+
+from coffeepoint import incremental
+from coffeepoint.incremental import OrderAggregates, append_orders, dataset_aggregates
+from coffeepoint.loader import Workbook
+from coffeepoint.store import SidecarStore
+
+from .helpers import assert_aggregates_equal
+
+
+@pytest.fixture(autouse=True)
+def fresh_registries():
+    incremental.forget()
+
+
+def split(orders, parts=4):
+    # The history and the batches appended to it later, in date order
+    orders = orders.sort_values("Order_Date", kind="stable").reset_index(drop=True)
+    bounds = [len(orders) * part // parts for part in range(parts + 1)]
+    return [orders.iloc[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+def test_appended_batches_match_full_recompute(orders):
+    history, *batches = split(orders)
+    aggregates = OrderAggregates.from_orders(history)
+    # Derived tables built before the batches are kept up to date by update
+    aggregates.rolling_sales()
+    for batch in batches:
+        assert aggregates.update(batch)
+
+    expected = OrderAggregates.from_orders(orders)
+    assert_aggregates_equal(aggregates, expected)
+    pd.testing.assert_frame_equal(aggregates.rfm().sort_index(), expected.rfm().sort_index())
+    pd.testing.assert_frame_equal(aggregates.abc(), expected.abc())
+    pd.testing.assert_frame_equal(aggregates.rolling_sales(), expected.rolling_sales())
+    pd.testing.assert_frame_equal(aggregates.cohort_retention(), expected.cohort_retention())
+
+
+def test_a_batch_is_folded_in_once(orders):
+    history, batch = split(orders, 2)
+    aggregates = OrderAggregates.from_orders(history)
+    assert aggregates.update(batch)
+    version = aggregates.version
+
+    assert not aggregates.update(batch)
+    assert aggregates.version == version
+    assert aggregates.rows == len(orders)
+
+
+@pytest.mark.parametrize("stored", [False, True])
+def test_appended_orders_survive_a_reload(workbook, tmp_path, stored):
+    history, *batches = split(workbook["Orders"], 3)
+    sheets = dict(workbook, Orders=history.reset_index(drop=True))
+    dataset = Workbook("history", sheets)
+    if stored:
+        dataset = SidecarStore(str(tmp_path)).write(dataset)
+    for batch in batches:
+        assert append_orders(dataset, batch)
+    assert not append_orders(dataset, batches[0])
+
+    expected = OrderAggregates.from_orders(workbook["Orders"])
+    assert_aggregates_equal(dataset_aggregates(dataset), expected)
+    if stored:
+        # A new process loads the saved aggregates with the batches folded in
+        incremental.forget()
+        reopened = SidecarStore(str(tmp_path)).open("history")
+        assert_aggregates_equal(dataset_aggregates(reopened), expected)
+
+
+def test_appended_batches_survive_eviction(workbook, generator):
+    history, batch = split(workbook["Orders"], 2)
+    dataset = Workbook("history", dict(workbook, Orders=history.reset_index(drop=True)))
+    assert append_orders(dataset, batch)
+
+    # Enough other datasets to evict the aggregates of the first one
+    others = generator.workbook(50)
+    for number in range(incremental._registry.size + 8):
+        dataset_aggregates(Workbook(f"other-{number}", others))
+    assert dataset.fingerprint not in incremental._registry._entries
+
+    expected = OrderAggregates.from_orders(workbook["Orders"])
+    assert_aggregates_equal(dataset_aggregates(dataset), expected)
+    assert not append_orders(dataset, batch)
+
+
+def test_batches_stored_after_the_last_save_are_folded_in(workbook, tmp_path):
+    history, batch = split(workbook["Orders"], 2)
+    sheets = dict(workbook, Orders=history.reset_index(drop=True))
+    dataset = SidecarStore(str(tmp_path)).write(Workbook("history", sheets))
+    dataset_aggregates(dataset)
+    assert append_orders(dataset, batch)
+    # A process stopped between storing the batch and saving the aggregates
+    OrderAggregates.from_orders(history).save(incremental._aggregates_path(dataset))
+    incremental.forget()
+
+    expected = OrderAggregates.from_orders(workbook["Orders"])
+    assert_aggregates_equal(dataset_aggregates(dataset), expected)
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from coffeepoint import incremental, inventory
+from coffeepoint.federation import FederatedDataset
+from coffeepoint.inventory import SAFETY_DAYS, inventory_coverage, update_stock
+from coffeepoint.loader import Workbook
+from coffeepoint.store import SidecarStore
+
+
+@pytest.fixture(autouse=True)
+def fresh_registries():
+    incremental.forget()
+    inventory._velocities.discard()
+    inventory.forget()
+
+
+@pytest.fixture
+def dataset(workbook):
+    return Workbook("synthetic", workbook)
+
+
+def baseline_coverage(orders, stock, thresholds):
+    # Days of cover and reorder points computed row by row with pandas
+    days = (orders["Order_Date"].max().normalize() - orders["Order_Date"].min().normalize()).days
+    units = orders.groupby("Product_ID")["Quantity"].sum()
+    units = units.reindex(stock.index, fill_value=0)
+    velocity = units / (days + 1)
+    sales = orders.groupby("Product_ID")["Sales_Amount"].sum().sort_values(ascending=False)
+    share = (sales / sales.sum()).cumsum().clip(upper=1.0)
+    category = pd.cut(share, bins=[0, *thresholds, 1], labels=["A", "B", "C"])
+    category = category.reindex(stock.index).fillna("C").astype(str)
+    safety = category.map(dict(SAFETY_DAYS))
+    reorder_point = np.ceil(velocity * (inventory.LEAD_TIME_DAYS + safety)).astype("int64")
+    return pd.DataFrame(
+        {
+            "ABC_Category": category,
+            "Units_Sold": units,
+            "Days_Of_Cover": (stock.clip(lower=0) / velocity).where(velocity > 0),
+            "Reorder_Point": reorder_point,
+            "Reorder": (velocity > 0) & (stock <= reorder_point),
+        }
+    )
+
+
+def check_coverage(actual, orders, stock, thresholds):
+    actual = actual.set_index("Product_ID")
+    actual["ABC_Category"] = actual["ABC_Category"].astype(str)
+    expected = baseline_coverage(orders, stock, thresholds)
+    pd.testing.assert_frame_equal(
+        actual[expected.columns],
+        expected,
+        check_dtype=False,
+        check_index_type=False,
+        check_names=False,
+    )
+
+
+@pytest.mark.parametrize("thresholds", [(0.7, 0.9), (0.3, 0.6)])
+def test_coverage_matches_pandas(dataset, workbook, thresholds):
+    stock = workbook["Inventory"].groupby("Product_ID")["Stock"].sum().astype("int64")
+    actual = inventory_coverage(dataset, abc_thresholds=thresholds)
+    check_coverage(actual, workbook["Orders"], stock, thresholds)
+
+
+def test_updated_stock_reuses_the_velocity(dataset, workbook):
+    stock = workbook["Inventory"].groupby("Product_ID")["Stock"].sum().astype("int64")
+    inventory_coverage(dataset)
+    levels = pd.DataFrame({"Product_ID": stock.index[:5], "Stock": [0, 1, 2, 3, 10_000]})
+
+    assert update_stock(dataset, levels) == 5
+    stock.iloc[:5] = levels["Stock"].to_numpy()
+    check_coverage(inventory_coverage(dataset), workbook["Orders"], stock, (0.7, 0.9))
+    assert len(inventory._velocities._entries) == 1
+
+
+def test_chain_stock_levels_need_a_store_column(workbook):
+    chain = FederatedDataset({"north": Workbook("north", workbook)})
+    levels = pd.DataFrame({"Product_ID": [1], "Stock": [3]})
+
+    with pytest.raises(ValueError, match="Store column"):
+        update_stock(chain, levels)
+    assert update_stock(chain, levels.assign(Store=["north"])) == 1
+    assert inventory.stock_levels(chain.stores["north"])[0] == 3
+
+
+def test_updated_stock_survives_eviction(dataset, generator):
+    levels = pd.DataFrame({"Product_ID": [dataset.read("Inventory")["Product_ID"][0]]})
+    assert update_stock(dataset, levels.assign(Stock=[0])) == 1
+
+    # Enough other datasets to evict the stock entry of the first one
+    others = generator.workbook(50)
+    for number in range(inventory._stock.size + 8):
+        inventory.stock_levels(Workbook(f"other-{number}", others))
+    assert dataset.fingerprint not in inventory._stock._entries
+
+    assert inventory.stock_levels(dataset)[0] == 0
+    assert inventory.stock_version(dataset) == 1
+
+
+def test_updated_stock_is_saved_with_the_sidecar(workbook, tmp_path):
+    dataset = SidecarStore(str(tmp_path)).write(Workbook("synthetic", workbook))
+    ids = workbook["Inventory"]["Product_ID"]
+    levels = pd.DataFrame({"Product_ID": ids[:3], "Stock": [1, 1, 1]})
+    assert update_stock(dataset, levels) == 3
+    assert update_stock(dataset, levels.assign(Stock=[5, 6, 7])) == 3
+
+    # A new process reads the updated stock back
+    inventory.forget()
+    reopened = SidecarStore(str(tmp_path)).open("synthetic")
+    assert list(inventory.stock_levels(reopened)[:3]) == [5, 6, 7]
+    assert inventory.stock_version(reopened) == 2
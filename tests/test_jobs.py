@@ -0,0 +1,152 @@
+import threading
+from concurrent.futures import CancelledError
+
+import pandas as pd
+import pytest
+
+from coffeepoint.jobs import (
+    Cancelled,
+    JobRunner,
+    SessionJobs,
+    check_cancelled,
+    current_job,
+    report_progress,
+    track,
+)
+from coffeepoint.results import ResultCache
+
+
+@pytest.fixture
+def runner():
+    runner = JobRunner(threads=2)
+    yield runner
+    runner.shutdown()
+
+
+def blocking(started, release, steps=None):
+    # A job that waits at checkpoints until released
+    def run():
+        started.set()
+        while not release.wait(0.01):
+            report_progress(0.5, "Waiting")
+            if steps is not None:
+                steps.append(1)
+        return "done"
+
+    return run
+
+
+def test_checkpoints_do_nothing_outside_of_jobs():
+    assert current_job() is None
+    report_progress(0.5, "Parsing")
+    check_cancelled()
+    assert list(track(range(3), 3)) == [0, 1, 2]
+
+
+def test_jobs_report_progress(runner):
+    seen, release = [], threading.Event()
+
+    def run():
+        for item in track(range(4), 4, "Counting"):
+            seen.append((current_job().progress, current_job().message))
+        report_progress(2.0)
+        release.wait(5)
+        return current_job().key
+
+    job = runner.submit("count", run)
+    while job.progress < 1.0:
+        threading.Event().wait(0.01)
+    assert job.message == "Counting" and not job.done()
+    release.set()
+
+    assert job.result(5) == "count"
+    assert seen == [(0.0, "Counting"), (0.25, "Counting"), (0.5, "Counting"), (0.75, "Counting")]
+    assert job.progress == 1.0
+
+
+def test_errors_reach_the_caller(runner):
+    job = runner.submit("fail", lambda: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        job.result(5)
+    assert job.done() and not job.cancelled
+
+
+def test_running_jobs_stop_at_the_next_checkpoint(runner):
+    started, release, steps = threading.Event(), threading.Event(), []
+    job = runner.submit("slow", blocking(started, release, steps))
+    assert started.wait(5)
+
+    job.cancel()
+    with pytest.raises(Cancelled):
+        job.result(5)
+    stopped = len(steps)
+    release.set()
+    assert job.cancelled and len(steps) == stopped
+
+
+def test_queued_jobs_are_dropped(runner):
+    release = threading.Event()
+    running = [runner.submit(f"busy-{n}", blocking(threading.Event(), release)) for n in (1, 2)]
+    calls = []
+    queued = runner.submit("queued", lambda: calls.append(1))
+
+    queued.cancel()
+    release.set()
+    for job in running:
+        assert job.result(5) == "done"
+    with pytest.raises(CancelledError):
+        queued.result(5)
+    assert calls == []
+
+
+def test_session_cancels_the_jobs_a_run_no_longer_asks_for(runner):
+    jobs = SessionJobs(runner)
+    release = threading.Event()
+    jobs.begin_run()
+    abc = jobs.request("abc", blocking(threading.Event(), release))
+    rfm = jobs.request("rfm", blocking(threading.Event(), release))
+    assert jobs.request("abc", pytest.fail) is abc
+    jobs.end_run()
+    assert len(jobs) == 2
+
+    # The next run only asks for the ABC table
+    jobs.begin_run()
+    assert jobs.request("abc", pytest.fail) is abc
+    jobs.end_run()
+    assert rfm.cancelled and not abc.cancelled and len(jobs) == 1
+
+    # A cancelled job is submitted again when asked for
+    jobs.cancel_all()
+    assert abc.cancelled and len(jobs) == 0
+    release.set()
+    again = jobs.request("abc", lambda: "again")
+    assert again is not abc and again.result(5) == "again"
+    jobs.release("abc")
+    assert len(jobs) == 0
+
+
+def test_a_waiting_session_takes_over_a_cancelled_computation(runner):
+    cache = ResultCache()
+    started, release = threading.Event(), threading.Event()
+    computed = []
+
+    def slow():
+        started.set()
+        while not release.wait(0.01):
+            check_cancelled()
+        computed.append("first")
+        return pd.DataFrame({"Value": [1]})
+
+    first = runner.submit("first", lambda: cache.get_or_compute(("key",), slow))
+    assert started.wait(5)
+    result = pd.DataFrame({"Value": [2]})
+    second = runner.submit(
+        "second",
+        lambda: cache.get_or_compute(("key",), lambda: computed.append("second") or result),
+    )
+    first.cancel()
+
+    assert second.result(5) is result
+    with pytest.raises(Cancelled):
+        first.result(5)
+    assert computed == ["second"]
@@ -0,0 +1,105 @@
+import pandas as pd
+import pytest
+
+from coffeepoint import loader, parallel
+from coffeepoint.loader import WorkbookCache, parse_workbook
+from coffeepoint.store import STORE_ENV, store_from_env
+from coffeepoint.synthetic import Generator, write_workbook
+
+
+@pytest.fixture(scope="module")
+def uploads(tmp_path_factory):
+    """The bytes of two small workbooks, such as the uploads of two stores."""
+    root = tmp_path_factory.mktemp("uploads")
+    blobs = []
+    for seed in (1, 2):
+        path = root / f"store{seed}.xlsx"
+        write_workbook(Generator(customers=50, products=10, days=60, seed=seed), path, 300)
+        blobs.append(path.read_bytes())
+    return blobs
+
+
+@pytest.fixture
+def pools(monkeypatch):
+    """Record the parsing pools started by ``load_many`` over a serial backend."""
+    started = []
+
+    class RecordingPool(parallel.ProcessPoolBackend):
+        def __init__(self, workers=None, **kwargs):
+            super().__init__(workers, **kwargs)
+            started.append(self)
+
+    monkeypatch.setattr(parallel, "ProcessPoolBackend", RecordingPool)
+    monkeypatch.setattr(parallel, "_default_backend", parallel.SerialBackend())
+    monkeypatch.setattr(loader.os, "cpu_count", lambda: 4)
+    return started
+
+
+def test_load_many_parses_on_a_pool_sized_by_workbooks(uploads, pools):
+    datasets = WorkbookCache().load_many(uploads)
+
+    assert [pool.workers for pool in pools] == [2]
+    assert pools[0]._pool is None  # closed after the parse
+    for data, dataset in zip(uploads, datasets):
+        expected = parse_workbook(data)
+        assert dataset.fingerprint == expected.fingerprint
+        for sheet in loader.SHEETS:
+            pd.testing.assert_frame_equal(dataset.read(sheet), expected.read(sheet))
+
+
+def test_load_many_keeps_an_explicit_backend(uploads, pools):
+    WorkbookCache().load_many(uploads, parallel.SerialBackend())
+    assert pools == []
+
+
+def test_single_workbook_is_parsed_in_process(uploads, pools):
+    WorkbookCache().load_many(uploads[:1])
+    assert pools == []
+
+
+class Stored:
+    """Stands in for a memory-mapped dataset, which has no decoded frames."""
+
+    nbytes = 0
+
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+
+
+def test_cache_bounds_the_number_of_workbooks():
+    cache = WorkbookCache(max_entries=3)
+    for key in "abcde":
+        cache.put(Stored(key))
+    cache.get("c")
+    cache.put(Stored("f"))
+
+    assert len(cache) == 3
+    assert [key for key in "abcdef" if key in cache] == ["c", "e", "f"]
+
+
+def test_app_cache_stores_sidecars_only_when_configured(monkeypatch, tmp_path):
+    monkeypatch.delenv(STORE_ENV, raising=False)
+    assert store_from_env() is None
+    monkeypatch.setenv(STORE_ENV, str(tmp_path))
+    assert store_from_env().root == str(tmp_path)
+
+
+def test_load_many_reports_progress_while_parsing(uploads, monkeypatch):
+    events = []
+
+    class Backend(parallel.SerialBackend):
+        def map(self, function, *iterables):
+            events.append("map")
+            for result in super().map(function, *iterables):
+                events.append("parsed")
+                yield result
+
+    def report(fraction, message=None):
+        # Sheets parsed in this process report their own progress
+        if not (message or "").startswith("Parsing the"):
+            events.append(fraction)
+
+    monkeypatch.setattr(loader, "report_progress", report)
+    WorkbookCache().load_many(uploads, Backend())
+
+    assert events == [0.0, "map", "parsed", 0.5, "parsed", 1.0]
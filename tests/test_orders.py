@@ -0,0 +1,152 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from coffeepoint import incremental, orders as orders_module
+from coffeepoint.incremental import OrderAggregates, append_orders
+from coffeepoint.loader import Workbook
+from coffeepoint.orders import OrderFilter, OrderIndex, filtered_aggregates, order_index
+from coffeepoint.products import ProductIndex
+from coffeepoint.store import SidecarStore
+
+from .helpers import assert_aggregates_equal
+
+
+@pytest.fixture
+def batch(generator):
+    from coffeepoint.schema import enforce
+
+    new = generator.orders(3_000, first_id=100_000, rng=np.random.default_rng(11))
+    # Some new customers, and dates inside and after the history
+    customers = new["Customer_ID"]
+    new["Customer_ID"] = np.where(new.index % 5 == 0, customers + 10_000, customers)
+    new["Order_Date"] = new["Order_Date"] + pd.Timedelta(days=200)
+    return enforce("Orders", new)
+
+
+@pytest.fixture(autouse=True)
+def fresh_registries():
+    incremental.forget()
+    orders_module._latest.discard()
+    orders_module._indexes.discard()
+    orders_module._views.discard()
+
+
+def select(orders, inventory, filters):
+    # The filtered orders, selected row by row with pandas
+    keep = pd.Series(True, index=orders.index)
+    if filters.start is not None:
+        keep &= orders["Order_Date"] >= pd.Timestamp(filters.start)
+    if filters.end is not None:
+        keep &= orders["Order_Date"] < pd.Timestamp(filters.end) + pd.Timedelta(days=1)
+    if filters.categories is not None:
+        products = inventory.loc[inventory["Category"].isin(filters.categories), "Product_ID"]
+        keep &= orders["Product_ID"].astype("int64").isin(products.astype("int64"))
+    if filters.customers is not None:
+        keep &= orders["Customer_ID"].astype(str).isin([str(c) for c in filters.customers])
+    return orders[keep]
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        OrderFilter(start="2023-03-01", end="2023-06-30"),
+        OrderFilter(categories=("Coffee",)),
+        OrderFilter(customers=("1", "2", "3", "42")),
+        OrderFilter(start="2023-02-01", end="2023-12-31", categories=("Tea", "Cakes")),
+    ],
+)
+def test_filtered_aggregates_match_pandas(workbook, filters):
+    orders, inventory = workbook["Orders"], workbook["Inventory"]
+    index = OrderIndex.from_orders(orders)
+    actual = index.aggregates(filters, ProductIndex(inventory))
+    expected = OrderAggregates.from_orders(select(orders, inventory, filters))
+    assert_aggregates_equal(actual, expected, units=False)
+
+
+def test_extend_matches_full_sort(orders, batch):
+    extended = OrderIndex.from_orders(orders).extend(batch, "batch")
+    combined = pd.concat([orders, batch], ignore_index=True)
+    rebuilt = OrderIndex.from_orders(combined)
+    assert extended.batches == {"batch"}
+    assert np.all(np.diff(extended.dates.view(np.int64)) >= 0)
+    filters = OrderFilter(start="2023-05-01")
+    assert_aggregates_equal(
+        extended.aggregates(filters), rebuilt.aggregates(filters), units=False
+    )
+
+
+def test_appended_batch_extends_the_stored_index(workbook, batch, tmp_path, monkeypatch):
+    dataset = SidecarStore(str(tmp_path)).write(Workbook("stored", workbook))
+    order_index(dataset)
+    saved = os.path.join(dataset.path, "order_index", "orders.arrow")
+    assert os.path.exists(saved)
+
+    assert append_orders(dataset, batch)
+    # The history is not read or sorted again
+    monkeypatch.setattr(
+        orders_module, "_sorted_index", lambda dataset: pytest.fail("full rebuild")
+    )
+    filters = OrderFilter(categories=("Coffee",))
+    actual = filtered_aggregates(dataset, filters)
+    combined = pd.concat([workbook["Orders"], batch], ignore_index=True)
+    expected = OrderAggregates.from_orders(select(combined, workbook["Inventory"], filters))
+    assert_aggregates_equal(actual, expected, units=False)
+
+    # The extended index was saved with its batch
+    orders_module._latest.discard()
+    orders_module._indexes.discard()
+    assert len(OrderIndex.load(os.path.join(dataset.path, "order_index"))) == len(combined)
+    assert len(order_index(dataset)) == len(combined)
+
+
+def test_forgotten_batches_leave_the_index(workbook, batch):
+    dataset = Workbook("memory", workbook)
+    append_orders(dataset, batch)
+    assert len(order_index(dataset)) == len(workbook["Orders"]) + len(batch)
+    incremental.forget(dataset.fingerprint)
+    assert len(order_index(dataset)) == len(workbook["Orders"])
+
+
+def test_unfiltered_views_do_not_build_the_index(workbook, monkeypatch):
+    dataset = Workbook("memory", workbook)
+    monkeypatch.setattr(orders_module, "_build_index", lambda dataset: pytest.fail("indexed"))
+
+    aggregates = filtered_aggregates(dataset, OrderFilter())
+    assert aggregates is incremental.dataset_aggregates(dataset)
+    assert aggregates.first_date == workbook["Orders"]["Order_Date"].min()
+    assert aggregates.last_date == workbook["Orders"]["Order_Date"].max()
+    assert OrderAggregates().first_date is None
+
+
+def test_a_failed_save_keeps_the_previous_index(workbook, batch, tmp_path, monkeypatch):
+    path = str(tmp_path / "order_index")
+    index = OrderIndex.from_orders(workbook["Orders"])
+    index.save(path)
+    extended = index.extend(batch, "batch")
+
+    # The save stops after the code tables, before the sorted arrays
+    write = orders_module.feather.write_feather
+
+    def fail_on_orders(frame, target, **kwargs):
+        if target.endswith("orders.arrow"):
+            raise OSError("disk full")
+        write(frame, target, **kwargs)
+
+    monkeypatch.setattr(orders_module.feather, "write_feather", fail_on_orders)
+    with pytest.raises(OSError):
+        extended.save(path)
+    monkeypatch.undo()
+
+    loaded = OrderIndex.load(path)
+    assert len(loaded) == len(index) and loaded.batches == frozenset()
+    pd.testing.assert_index_equal(loaded.customer_ids, index.customer_ids)
+
+    extended.save(path)
+    loaded = OrderIndex.load(path)
+    assert len(loaded) == len(extended) and loaded.batches == {"batch"}
+    pd.testing.assert_index_equal(loaded.customer_ids, extended.customer_ids)
+    # No scratch directory is left behind
+    assert os.listdir(tmp_path) == ["order_index"]
@@ -0,0 +1,95 @@
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from coffeepoint.incremental import OrderAggregates
+from coffeepoint.loader import Workbook
+from coffeepoint.parallel import ProcessPoolBackend, SerialBackend
+from coffeepoint.sketches import CustomerSketches, HeavyHitters
+from coffeepoint.store import SidecarStore
+
+from .helpers import assert_aggregates_equal, assert_summaries_equal
+
+
+@pytest.fixture(scope="module")
+def pool():
+    backend = ProcessPoolBackend(workers=2, min_rows=0)
+    yield backend
+    backend.close()
+
+
+@pytest.fixture
+def stored(workbook, tmp_path):
+    return SidecarStore(str(tmp_path)).write(Workbook("synthetic", workbook))
+
+
+def test_pool_matches_serial_in_memory(pool, orders):
+    assert_aggregates_equal(pool.aggregate(orders), SerialBackend().aggregate(orders))
+
+
+def test_pool_matches_serial_over_chunks(pool, orders):
+    chunks = [orders.iloc[start:start + 2_500] for start in range(0, len(orders), 2_500)]
+    assert_aggregates_equal(
+        pool.aggregate_chunks(iter(chunks)), SerialBackend().aggregate_chunks(iter(chunks))
+    )
+
+
+def test_pool_matches_serial_over_stored_rows(pool, stored):
+    expected = SerialBackend().aggregate_dataset(stored, chunk_rows=3_000)
+    assert_aggregates_equal(pool.aggregate_dataset(stored, chunk_rows=3_000), expected)
+    assert_aggregates_equal(expected, OrderAggregates.from_orders(stored.read("Orders")))
+
+
+def test_stored_row_ranges(stored):
+    chunks = list(stored.iter_chunks("Orders", ["Order_ID"], 700, start=1_000, stop=3_000))
+    assert [len(chunk) for chunk in chunks] == [700, 700, 600]
+    assert chunks[0]["Order_ID"].iloc[0] == stored.read("Orders")["Order_ID"].iloc[1_000]
+
+
+@pytest.mark.parametrize("in_memory", [True, False])
+def test_small_datasets_do_not_start_the_pool(workbook, stored, in_memory):
+    backend = ProcessPoolBackend(workers=2)
+    dataset = Workbook("synthetic", workbook) if in_memory else stored
+    try:
+        actual = backend.aggregate_dataset(dataset, chunk_rows=3_000)
+        assert backend._pool is None
+    finally:
+        backend.close()
+    assert_aggregates_equal(actual, SerialBackend().aggregate_dataset(dataset))
+
+
+def test_chunks_reach_the_workers_through_shared_memory(pool, orders, monkeypatch):
+    submitted = []
+    executor = pool._executor()
+
+    def submit(function, *args):
+        submitted.append(args)
+        return executor.submit(function, *args)
+
+    monkeypatch.setattr(pool, "_executor", lambda: SimpleNamespace(submit=submit))
+    chunks = [orders.iloc[start:start + 5_000] for start in range(0, len(orders), 5_000)]
+    actual = pool.aggregate_chunks(iter(chunks))
+
+    assert len(submitted) == len(chunks)
+    assert not any(isinstance(arg, pd.DataFrame) for args in submitted for arg in args)
+    assert_aggregates_equal(actual, OrderAggregates.from_orders(orders))
+
+
+def test_workers_build_the_summaries(pool, orders, stored, monkeypatch):
+    chunks = [orders.iloc[start:start + 5_000] for start in range(0, len(orders), 5_000)]
+    results = [
+        pool.aggregate(orders),
+        pool.aggregate_chunks(iter(chunks)),
+        pool.aggregate_dataset(stored, chunk_rows=3_000),
+    ]
+    expected = OrderAggregates.from_orders(orders)
+
+    # The summaries come from the workers and the merges, not from the exact tables
+    def rebuilt(*args, **kwargs):
+        raise AssertionError("summarized the exact tables")
+
+    monkeypatch.setattr(CustomerSketches, "from_customers", rebuilt)
+    monkeypatch.setattr(HeavyHitters, "from_weights", rebuilt)
+    for actual in results:
+        assert_summaries_equal(actual, expected)
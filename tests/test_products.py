@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+from coffeepoint.incremental import OrderAggregates
+from coffeepoint.products import ProductIndex
+
+
+def baseline_abc(orders, inventory):
+    # The ABC analysis of the original app
+    orders = orders.merge(inventory, on="Product_ID")
+    orders["Sales_Amount"] = orders["Quantity"] * orders["Price"]
+    product_sales = (
+        orders.groupby("Product_Name")["Sales_Amount"].sum().sort_values(ascending=False)
+    )
+    percentage = (product_sales / product_sales.sum()).cumsum()
+    category = pd.cut(percentage, bins=[0, 0.7, 0.9, 1], labels=["A", "B", "C"])
+    return pd.DataFrame(
+        {
+            "Product": product_sales.index,
+            "Sales": product_sales.values,
+            "Percentage": percentage.values,
+            "Category": category,
+        }
+    )
+
+
+def plain_sheets(workbook):
+    orders = workbook["Orders"].drop(columns="Sales_Amount")
+    orders = orders.astype({"Customer_ID": "int64", "Product_ID": "int64"})
+    inventory = workbook["Inventory"].astype({"Product_Name": str, "Category": str})
+    return orders, inventory
+
+
+def test_abc_matches_baseline(workbook):
+    orders, inventory = plain_sheets(workbook)
+    # Products that were never ordered are left out, as the baseline's join drops them
+    unsold = inventory["Product_ID"].isin([1, 2])
+    orders = orders[~orders["Product_ID"].isin([1, 2])]
+    expected = baseline_abc(orders, inventory)
+    actual = OrderAggregates.from_orders(orders).abc(ProductIndex(inventory))
+    assert len(actual) == len(inventory) - unsold.sum()
+    pd.testing.assert_frame_equal(
+        actual.reset_index(drop=True).astype({"Product": str, "Category": str}),
+        expected.reset_index(drop=True).astype({"Product": str, "Category": str}),
+        check_exact=False,
+    )
+
+
+def test_sales_by_name_joins_like_an_inner_merge():
+    inventory = pd.DataFrame(
+        {
+            "Product_ID": [1, 2, 3],
+            "Product_Name": ["Latte", "Mocha", "Scone"],
+            "Category": ["Coffee", "Coffee", "Cakes"],
+            "Stock": [5, 6, 7],
+        }
+    )
+    sales = pd.Series([10.0, 4.0, 0.0], index=[1, 9, 3])
+    named = ProductIndex(inventory).sales_by_name(sales)
+    # Unknown product 9 and never ordered Mocha are dropped; Scone sold for 0
+    assert named.to_dict() == {"Latte": 10.0, "Scone": 0.0}
+
+
+def test_category_stock(workbook):
+    inventory = workbook["Inventory"]
+    expected = inventory.groupby("Category", observed=True)["Stock"].sum()
+    actual = ProductIndex(inventory).category_stock()
+    assert actual.to_dict() == expected.to_dict()
+    assert actual.dtype == np.int64
@@ -0,0 +1,73 @@
+import pandas as pd
+import pytest
+
+from coffeepoint.incremental import OrderAggregates
+from coffeepoint.products import ProductIndex
+from coffeepoint.profiles import get_profile
+
+from .test_products import baseline_abc, plain_sheets
+from .test_rfm import baseline_rfm, check_against_baseline
+
+# What the original app.py ("vips") and app-2.py ("champions") showed
+ORIGINAL = {
+    "vips": {
+        "top_segment": "VIPs",
+        "heading": "VIP",
+        "description": (
+            "These are most valuable customers who purchase frequently, recently, "
+            "and spend the most."
+        ),
+        "growth_advice": "Explore opportunities to increase sales.",
+    },
+    "champions": {
+        "top_segment": "Champions",
+        "heading": "Champions",
+        "description": (
+            "These are your most valuable customers who purchase frequently, recently, "
+            "and spend the most."
+        ),
+        "growth_advice": (
+            "Explore opportunities to increase sales (e.g., bundling or promotions)."
+        ),
+    },
+}
+
+
+@pytest.mark.parametrize("name", sorted(ORIGINAL))
+def test_profiles_reproduce_the_original_segments(name, orders):
+    profile, original = get_profile(name), ORIGINAL[name]
+    orders = orders.drop(columns="Sales_Amount").astype({"Customer_ID": "int64"})
+    # The original scripts differ only in the label of the top segment
+    expected = baseline_rfm(orders)
+    expected["Segment"] = expected["Segment"].replace({"VIPs": original["top_segment"]})
+
+    actual = OrderAggregates.from_orders(orders).rfm(
+        profile.quantiles, profile.rules(), profile.default_segment()
+    )
+    check_against_baseline(actual, expected)
+    assert original["top_segment"] in set(actual["Segment"].astype(str))
+
+
+@pytest.mark.parametrize("name", sorted(ORIGINAL))
+def test_profiles_reproduce_the_original_abc(name, workbook):
+    profile = get_profile(name)
+    orders, inventory = plain_sheets(workbook)
+    expected = baseline_abc(orders, inventory)
+
+    actual = OrderAggregates.from_orders(orders).abc(
+        ProductIndex(inventory), profile.abc_thresholds
+    )
+    pd.testing.assert_frame_equal(
+        actual.reset_index(drop=True).astype({"Product": str, "Category": str}),
+        expected.reset_index(drop=True).astype({"Product": str, "Category": str}),
+        check_exact=False,
+    )
+
+
+@pytest.mark.parametrize("name", sorted(ORIGINAL))
+def test_profiles_keep_the_original_wording(name):
+    profile, original = get_profile(name), ORIGINAL[name]
+    assert profile.label("VIPs") == original["top_segment"]
+    assert profile.top_segment_heading == original["heading"]
+    assert profile.top_segment_description == original["description"]
+    assert profile.growth_advice == original["growth_advice"]
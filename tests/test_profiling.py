@@ -0,0 +1,120 @@
+import json
+import logging
+import sys
+import urllib.error
+import urllib.request
+
+import pytest
+
+from coffeepoint import profiling
+from coffeepoint.profiling import Profiler, current_rss, serve_metrics
+
+
+def test_stages_record_time_rows_and_memory():
+    profiler = Profiler()
+    with profiler.stage("load") as handle:
+        handle.rows = 42
+
+    (record,) = profiler.records("load")
+    assert record.stage == "load" and record.rows == 42
+    assert record.seconds >= 0 and isinstance(record.rss_delta_bytes, int)
+    assert profiler.records("other") == []
+
+
+def test_errors_are_recorded_and_raised():
+    profiler = Profiler()
+    with pytest.raises(KeyError):
+        with profiler.stage("lookup"):
+            raise KeyError("missing")
+    assert len(profiler.records("lookup")) == 1
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = Profiler(enabled=False)
+    with profiler.stage("load") as handle:
+        handle.rows = 1
+    assert profiler.records() == []
+
+
+def test_windows_bound_the_samples_and_summary_percentiles():
+    profiler = Profiler(window=10)
+    for seconds in range(20):
+        profiler.record(profiling.StageRecord("parse", 0.0, float(seconds), seconds, 0))
+
+    assert [record.seconds for record in profiler.records("parse")] == list(range(10, 20))
+    (entry,) = profiler.summary()
+    assert entry["count"] == 10 and entry["last_rows"] == 19
+    assert entry["p50_seconds"] == pytest.approx(14.5)
+    assert entry["p95_seconds"] == pytest.approx(18.55)
+    assert entry["total_seconds"] == pytest.approx(145.0)
+
+    text = profiler.metrics_text()
+    assert 'coffeepoint_stage_seconds{stage="parse",quantile="0.5"} 14.5' in text
+    assert 'coffeepoint_stage_seconds_count{stage="parse"} 10' in text
+    profiler.clear()
+    assert profiler.summary() == []
+
+
+def test_profiled_records_each_call(monkeypatch):
+    monkeypatch.setattr(profiling, "profiler", Profiler())
+
+    @profiling.profiled("double", rows=len)
+    def double(values):
+        return values * 2
+
+    assert double([1, 2]) == [1, 2, 1, 2]
+    assert [record.rows for record in profiling.profiler.records("double")] == [4]
+
+
+def test_records_are_logged_as_json(caplog):
+    profiler = Profiler()
+    with caplog.at_level(logging.INFO, logger="coffeepoint.profiling"):
+        with profiler.stage("load"):
+            pass
+    assert json.loads(caplog.records[-1].getMessage())["stage"] == "load"
+
+
+def test_rss_falls_back_to_the_peak_without_proc(monkeypatch):
+    assert current_rss() > 0
+
+    def no_proc(path, *args, **kwargs):
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(profiling, "open", no_proc, raising=False)
+    assert current_rss() > 0
+    # Neither /proc nor the Unix-only resource module (e.g. on Windows)
+    monkeypatch.setitem(sys.modules, "resource", None)
+    assert current_rss() == 0
+
+
+def test_metrics_endpoint_is_local_by_default(monkeypatch):
+    monkeypatch.setattr(profiling, "profiler", Profiler())
+    profiling.profiler.record(profiling.StageRecord("parse", 0.0, 0.5, 1, 0))
+    server = serve_metrics(0)
+    try:
+        host, port = server.server_address[:2]
+        assert host == "127.0.0.1"
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=5) as response:
+            assert 'stage="parse"' in response.read().decode()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"http://{host}:{port}/other", timeout=5)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_configure_from_env_binds_the_configured_host(monkeypatch, tmp_path):
+    served = []
+    monkeypatch.setattr(profiling, "_configured", False)
+    monkeypatch.setattr(profiling, "serve_metrics", lambda *args: served.append(args))
+    monkeypatch.setenv("COFFEEPOINT_METRICS_PORT", "9123")
+    monkeypatch.delenv("COFFEEPOINT_PROFILE_LOG", raising=False)
+    monkeypatch.delenv("COFFEEPOINT_METRICS_HOST", raising=False)
+    profiling.configure_from_env()
+    profiling.configure_from_env()
+    assert served == [(9123, "127.0.0.1")]
+
+    monkeypatch.setattr(profiling, "_configured", False)
+    monkeypatch.setenv("COFFEEPOINT_METRICS_HOST", "0.0.0.0")
+    profiling.configure_from_env()
+    assert served[-1] == (9123, "0.0.0.0")
@@ -0,0 +1,77 @@
+import threading
+import time
+
+from coffeepoint.registry import Registry
+
+
+def test_builds_each_key_once():
+    registry = Registry()
+    calls = []
+
+    def build():
+        calls.append(1)
+        time.sleep(0.05)
+        return "value"
+
+    threads = [
+        threading.Thread(target=registry.get_or_create, args=("key", build)) for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert registry.get_or_create("key", lambda: "other") == "value"
+
+
+def test_lookups_do_not_wait_for_other_builds():
+    registry = Registry()
+    registry.get_or_create("cached", lambda: "small")
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "large"
+
+    builder = threading.Thread(target=registry.get_or_create, args=("slow", slow))
+    builder.start()
+    started.wait(5)
+    began = time.perf_counter()
+    assert registry.get_or_create("cached", lambda: "rebuilt") == "small"
+    assert time.perf_counter() - began < 0.5
+    release.set()
+    builder.join()
+    assert registry.get_or_create("slow", lambda: "rebuilt") == "large"
+
+
+def test_failed_build_is_retried():
+    registry = Registry()
+
+    def fail():
+        raise RuntimeError("boom")
+
+    try:
+        registry.get_or_create("key", fail)
+    except RuntimeError:
+        pass
+    assert registry.get_or_create("key", lambda: "value") == "value"
+
+
+def test_discard_during_build_drops_the_result():
+    registry = Registry()
+
+    def build():
+        registry.discard("key")
+        return "stale"
+
+    assert registry.get_or_create("key", build) == "stale"
+    assert registry.get_or_create("key", lambda: "fresh") == "fresh"
+
+
+def test_evicts_least_recently_used():
+    registry = Registry(size=2)
+    for key in "abc":
+        registry.get_or_create(key, lambda key=key: key.upper())
+    assert registry.get_or_create("a", lambda: "new") == "new"
+    assert registry.get_or_create("c", lambda: "new") == "C"
@@ -0,0 +1,118 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from coffeepoint import incremental
+from coffeepoint.incremental import append_orders
+from coffeepoint.loader import Workbook, frame_nbytes
+from coffeepoint.results import ResultCache, abc_result
+
+
+@pytest.fixture(autouse=True)
+def fresh_registries():
+    incremental.forget()
+
+
+def frame(value, rows=100):
+    return pd.DataFrame({"Value": [float(value)] * rows})
+
+
+def test_memory_tier_evicts_the_least_recently_used():
+    cache = ResultCache(max_bytes=2 * frame_nbytes(frame(0)))
+    for key in "abc":
+        cache.get_or_compute((key,), lambda key=key: frame(ord(key)))
+        if key == "b":
+            cache.get_or_compute(("a",), pytest.fail)
+
+    assert len(cache) == 2
+    assert cache.nbytes <= cache.max_bytes
+    # "b" was used least recently, then "a"
+    computed = []
+    cache.get_or_compute(("b",), lambda: computed.append("b") or frame(1))
+    cache.get_or_compute(("c",), pytest.fail)
+    assert computed == ["b"]
+
+
+def test_a_result_larger_than_the_budget_is_still_kept():
+    cache = ResultCache(max_bytes=1)
+    cache.get_or_compute(("a",), lambda: frame(1))
+    cache.get_or_compute(("b",), lambda: frame(2))
+    assert len(cache) == 1
+    cache.get_or_compute(("b",), pytest.fail)
+
+
+def test_concurrent_callers_share_one_computation():
+    cache = ResultCache()
+    calls, results = [], []
+    start = threading.Barrier(5)
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return frame(1)
+
+    def ask():
+        start.wait()
+        results.append(cache.get_or_compute(("slow",), compute))
+
+    threads = [threading.Thread(target=ask) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(results) == 5 and all(result is results[0] for result in results)
+    assert cache.misses == 1
+
+
+def test_errors_reach_every_caller_and_are_not_cached():
+    cache = ResultCache()
+    with pytest.raises(ZeroDivisionError):
+        cache.get_or_compute(("a",), lambda: 1 / 0)
+    assert cache.get_or_compute(("a",), lambda: frame(1)).equals(frame(1))
+
+
+def test_appended_orders_invalidate_results(workbook):
+    orders = workbook["Orders"].sort_values("Order_Date", kind="stable")
+    history, batch = orders.iloc[: len(orders) // 2], orders.iloc[len(orders) // 2 :]
+    dataset = Workbook("history", dict(workbook, Orders=history.reset_index(drop=True)))
+    cache = ResultCache()
+
+    before = abc_result(dataset, cache=cache)
+    assert abc_result(dataset, cache=cache) is before
+    assert append_orders(dataset, batch)
+    after = abc_result(dataset, cache=cache)
+
+    assert after is not before and cache.misses == 2
+    assert after["Sales"].sum() == pytest.approx(orders["Sales_Amount"].sum())
+
+    cache.invalidate(dataset.fingerprint)
+    assert len(cache) == 0
+
+
+def test_disk_tier_round_trip(tmp_path):
+    cache = ResultCache(root=str(tmp_path))
+    result = pd.DataFrame({"Product": ["a", "b"], "Sales": [1.5, 2.5]})
+    cache.get_or_compute(("dataset", "abc"), lambda: result)
+    assert len(list(tmp_path.glob("dataset-*.arrow"))) == 1
+
+    # Another process reads the stored result instead of computing it
+    restarted = ResultCache(root=str(tmp_path))
+    stored = restarted.get_or_compute(("dataset", "abc"), pytest.fail)
+    pd.testing.assert_frame_equal(stored, result)
+    assert (restarted.hits, restarted.misses) == (1, 0)
+
+    restarted.invalidate("dataset")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_results_arrow_cannot_store_stay_in_memory(tmp_path):
+    cache = ResultCache(root=str(tmp_path))
+    mixed = pd.DataFrame({"Value": [1, "a", 2.5]}, dtype=object)
+
+    assert cache.get_or_compute(("dataset", "mixed"), lambda: mixed) is mixed
+    assert list(tmp_path.iterdir()) == []
+    assert cache.get_or_compute(("dataset", "mixed"), pytest.fail) is mixed
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+from coffeepoint.incremental import OrderAggregates
+from coffeepoint.rfm import quantile_scores, rfm_table, rule_scores, segment_table
+
+
+def classify_customer_segment(frm_score):
+    # The segment rules of the original app
+    recency, frequency, monetary = (int(digit) for digit in frm_score)
+    if recency == 4 and frequency >= 3 and monetary >= 3:
+        return "VIPs"
+    elif recency >= 3 and frequency >= 3:
+        return "Loyal Customers"
+    elif recency >= 3 and frequency >= 2:
+        return "Potential Loyalists"
+    elif recency == 2 and frequency >= 2:
+        return "Need Attention"
+    elif recency == 1 and frequency >= 2:
+        return "At Risk"
+    else:
+        return "Lost Customers"
+
+
+def baseline_rfm(orders):
+    # The FRM analysis of the original app
+    orders = orders.assign(Sales_Amount=orders["Quantity"] * orders["Price"])
+    frm_data = orders.groupby("Customer_ID").agg(
+        {
+            "Order_Date": lambda x: (orders["Order_Date"].max() - x.max()).days,
+            "Order_ID": "count",
+            "Sales_Amount": "sum",
+        }
+    )
+    frm_data.columns = ["Recency", "Frequency", "Monetary"]
+    frm_data["Recency_Score"] = pd.qcut(frm_data["Recency"], q=4, labels=[4, 3, 2, 1])
+    frm_data["Frequency_Score"] = pd.qcut(frm_data["Frequency"], q=4, labels=[1, 2, 3, 4])
+    frm_data["Monetary_Score"] = pd.qcut(frm_data["Monetary"], q=4, labels=[1, 2, 3, 4])
+    frm_data["FRM_Score"] = (
+        frm_data["Recency_Score"].astype(str)
+        + frm_data["Frequency_Score"].astype(str)
+        + frm_data["Monetary_Score"].astype(str)
+    )
+    frm_data["Segment"] = frm_data["FRM_Score"].apply(classify_customer_segment)
+    return frm_data
+
+
+def check_against_baseline(actual, expected):
+    actual = actual.sort_index()
+    assert list(actual.index) == list(expected.index)
+    for column in ("Recency", "Frequency", "Recency_Score", "Frequency_Score", "Monetary_Score"):
+        np.testing.assert_array_equal(
+            actual[column].to_numpy(np.int64), expected[column].to_numpy(np.int64)
+        )
+    np.testing.assert_allclose(actual["Monetary"], expected["Monetary"])
+    np.testing.assert_array_equal(
+        actual["FRM_Score"].astype(str), expected["FRM_Score"].to_numpy()
+    )
+    np.testing.assert_array_equal(actual["Segment"].astype(str), expected["Segment"].to_numpy())
+
+
+def test_rfm_matches_baseline(orders):
+    orders = orders.drop(columns="Sales_Amount").astype({"Customer_ID": "int64"})
+    expected = baseline_rfm(orders)
+    # The baseline's qcut raises on repeated bin edges, so no tie fallback is involved
+    assert expected["Segment"].nunique() > 3
+    check_against_baseline(rfm_table(orders), expected)
+    check_against_baseline(OrderAggregates.from_orders(orders).rfm(), expected)
+
+
+def test_quartile_rules_scale_to_other_quantile_counts(orders):
+    assert list(rule_scores(4)) == [1, 2, 3, 4]
+    assert list(rule_scores(5)) == [1, 2, 2, 3, 4]
+    assert list(rule_scores(2)) == [1, 3]
+
+    table = rfm_table(orders, quantiles=5)
+    assert table["Recency_Score"].max() == 5 and table["Monetary_Score"].max() == 5
+    # Each customer gets the segment of their scores mapped onto quartiles
+    mapped = [
+        "".join(str(rule_scores(5)[score - 1]) for score in scores)
+        for scores in table[["Recency_Score", "Frequency_Score", "Monetary_Score"]].to_numpy()
+    ]
+    expected = [classify_customer_segment(score) for score in mapped]
+    np.testing.assert_array_equal(table["Segment"].astype(str), expected)
+    assert table["Segment"].nunique() > 3
+    assert segment_table(4).shape == (4, 4, 4) and segment_table(9).shape == (9, 9, 9)
+
+
+def test_tied_values_get_equal_scores():
+    values = pd.Series([1, 1, 1, 1, 1, 1, 2, 3])
+    scores = quantile_scores(values)
+    assert len(set(scores[:6])) == 1
+    assert list(scores) == sorted(scores)
+    assert scores.min() >= 1 and scores.max() <= 4
+
+
+def test_tie_scores_do_not_depend_on_customer_order():
+    orders = pd.DataFrame(
+        {
+            "Order_ID": [1, 2, 3, 4],
+            "Order_Date": pd.to_datetime(["2024-01-01", "2024-01-01", "2024-02-01", "2024-02-01"]),
+            "Customer_ID": [1, 2, 3, 3],
+            "Quantity": [1, 1, 2, 2],
+            "Price": [5.0, 5.0, 5.0, 5.0],
+        }
+    )
+    table = rfm_table(orders)
+    single = table.loc[[1, 2]]
+    assert single["Frequency_Score"].nunique() == 1
+    assert single["Segment"].nunique() == 1
+    # Renumbering the customers does not change anyone's scores
+    swapped = orders["Customer_ID"].map({1: 2, 2: 1, 3: 3})
+    renumbered = rfm_table(orders.assign(Customer_ID=swapped))
+    columns = ["Recency_Score", "Frequency_Score", "Monetary_Score"]
+    np.testing.assert_array_equal(
+        renumbered.loc[[2, 1, 3], columns].to_numpy(), table.loc[[1, 2, 3], columns].to_numpy()
+    )
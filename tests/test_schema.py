@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from coffeepoint.incremental import OrderAggregates
+from coffeepoint.products import ProductIndex
+from coffeepoint.schema import SCHEMA, enforce, normalize_columns
+
+
+def raw_orders(rows=4, **columns):
+    frame = pd.DataFrame(
+        {
+            "Order_ID": np.arange(1, rows + 1),
+            "Order_Date": pd.date_range("2024-01-01", periods=rows).astype(str),
+            "Customer_ID": np.arange(rows) % 3 + 1,
+            "Product_ID": np.arange(rows) % 2 + 1,
+            "Quantity": np.ones(rows, dtype=np.int64),
+            "Price": np.full(rows, 2.5),
+        }
+    )
+    return frame.assign(**columns)
+
+
+def test_header_variants_are_renamed():
+    frame = pd.DataFrame(columns=["OrderID", "Date", "customer id", "Product_ID", "QUANTITY"])
+    renamed = normalize_columns("Orders", frame)
+    assert list(renamed.columns) == [
+        "Order_ID", "Order_Date", "Customer_ID", "Product_ID", "Quantity"
+    ]
+    assert normalize_columns("Orders", renamed) is renamed
+
+
+def test_canonical_columns_win_over_variants():
+    frame = pd.DataFrame(columns=["Order_Date", "Date", "Notes"])
+    assert list(normalize_columns("Orders", frame).columns) == ["Order_Date", "Date", "Notes"]
+
+
+def test_enforce_types_and_keeps_extra_columns():
+    frame = enforce("Orders", raw_orders(Notes=["a", "b", "c", "d"]))
+
+    assert frame["Order_Date"].dtype == "datetime64[ns]"
+    for column in ("Customer_ID", "Product_ID"):
+        assert isinstance(frame[column].dtype, pd.CategoricalDtype)
+    assert frame["Quantity"].dtype == np.int8 and frame["Order_ID"].dtype == np.int8
+    assert frame["Price"].dtype == np.float64
+    np.testing.assert_array_equal(frame["Sales_Amount"], [2.5] * 4)
+    assert list(frame["Notes"]) == ["a", "b", "c", "d"]
+
+
+def test_missing_columns_are_named():
+    with pytest.raises(ValueError, match="'Orders' is missing columns: Quantity, Price"):
+        enforce("Orders", raw_orders().drop(columns=["Quantity", "Price"]))
+    with pytest.raises(ValueError, match="Stock"):
+        enforce("Inventory", pd.DataFrame(columns=list(SCHEMA["Inventory"])[:3]))
+
+
+@pytest.mark.parametrize(
+    "largest, dtype", [(127, np.int8), (128, np.int16), (40_000, np.int32), (2**40, np.int64)]
+)
+def test_integers_are_downcast_to_the_smallest_type_holding_them(largest, dtype):
+    frame = enforce("Orders", raw_orders(Quantity=[1, 2, 3, largest]))
+    assert frame["Quantity"].dtype == dtype
+    assert frame["Quantity"].iloc[-1] == largest
+    assert frame["Sales_Amount"].iloc[-1] == largest * 2.5
+
+
+def test_sums_over_downcast_columns_do_not_overflow():
+    # 1000 orders of 100 units each: the total is far beyond int8
+    orders = enforce("Orders", raw_orders(1_000, Quantity=100))
+    assert orders["Quantity"].dtype == np.int8
+    units = OrderAggregates.from_orders(orders).product_units
+    assert units.sum() == 100_000 and units.dtype == np.int64
+
+    inventory = enforce(
+        "Inventory",
+        pd.DataFrame(
+            {
+                "Product_ID": [1, 2, 3],
+                "Product_Name": ["a", "b", "c"],
+                "Category": ["Coffee"] * 3,
+                "Stock": [100, 100, 100],
+            }
+        ),
+    )
+    assert inventory["Stock"].dtype == np.int8
+    assert ProductIndex(inventory).stock.sum() == 300
@@ -0,0 +1,176 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from coffeepoint import sketches as sketches_module
+from coffeepoint.incremental import OrderAggregates
+from coffeepoint.products import ProductIndex
+from coffeepoint.rfm import score_metrics
+from coffeepoint.sketches import (
+    CustomerSketches,
+    HeavyHitters,
+    QuantileSketch,
+    approximate_rfm,
+    rfm_sketches,
+    sales_hitters,
+)
+
+from .helpers import assert_summaries_equal
+
+ACCURACY = 0.01
+
+
+@pytest.fixture(scope="module")
+def values():
+    # Skewed values with zeros and negatives (e.g. refunds)
+    rng = np.random.default_rng(3)
+    values = rng.lognormal(3, 2, 50_000)
+    values[:500] = 0.0
+    values[500:1_500] *= -1
+    return rng.permutation(values)
+
+
+@pytest.fixture(scope="module")
+def metrics(orders):
+    return OrderAggregates.from_orders(orders).customer_metrics()
+
+
+def exact_at_ranks(values, q):
+    # The exact values at the ranks ``QuantileSketch.quantile`` estimates
+    ordered = np.sort(values)
+    return ordered[np.floor(np.asarray(q) * (len(values) - 1)).astype(np.int64)]
+
+
+def test_quantiles_within_relative_accuracy(values):
+    q = np.linspace(0, 1, 101)
+    sketch = QuantileSketch.from_values(values, ACCURACY)
+    exact = exact_at_ranks(values, q)
+    assert np.all(np.abs(sketch.quantile(q) - exact) <= ACCURACY * np.abs(exact) + 1e-12)
+    # A few hundred buckets, whatever the number of values
+    assert len(sketch) < 2_000
+
+
+def test_merged_sketches_keep_the_bounds(values):
+    q = np.linspace(0, 1, 101)
+    parts = [QuantileSketch.from_values(part, ACCURACY) for part in np.array_split(values, 7)]
+    merged = parts[0]
+    for part in parts[1:]:
+        merged = merged.merge(part)
+    assert merged.count == len(values)
+    np.testing.assert_array_equal(
+        merged.quantile(q), QuantileSketch.from_values(values, ACCURACY).quantile(q)
+    )
+    with pytest.raises(ValueError):
+        merged.merge(QuantileSketch(0.05))
+
+
+def test_heavy_hitters_bound_every_product(orders):
+    sales = OrderAggregates.from_orders(orders).product_sales
+    # A capacity below the number of products, over several slices
+    hitters = sales_hitters(sales, capacity=10, slice_rows=7)
+    listed = hitters.top()
+
+    assert hitters.total == pytest.approx(sales.sum())
+    assert hitters.error <= hitters.total / 11
+    assert np.all(listed <= sales[listed.index] + 1e-9)
+    assert np.all(sales[listed.index] <= listed + hitters.error + 1e-9)
+    # Every product selling more than the error bound is listed
+    assert set(sales.index[sales > hitters.error]) <= set(listed.index)
+
+
+def test_heavy_hitters_are_exact_within_capacity(orders):
+    sales = OrderAggregates.from_orders(orders).product_sales
+    hitters = HeavyHitters.from_weights(sales.index, sales.to_numpy(), capacity=len(sales))
+    assert hitters.error == 0
+    pd.testing.assert_series_equal(
+        hitters.top().sort_index(), sales.sort_index(), check_names=False, check_index_type=False
+    )
+
+
+def test_approximate_scores_differ_only_near_a_boundary(metrics):
+    expected = score_metrics(metrics)
+    actual = approximate_rfm(metrics, relative_accuracy=ACCURACY, slice_rows=50)
+
+    # Monetary is continuous: a customer can only change score between the
+    # sketched boundary and the exact qcut edge
+    monetary = metrics["Monetary"].to_numpy()
+    sketched = rfm_sketches(metrics, ACCURACY)["Monetary"].quantile([0.25, 0.5, 0.75])
+    edges = np.quantile(monetary, [0.25, 0.5, 0.75])
+    moved = actual["Monetary_Score"].to_numpy() != expected["Monetary_Score"].to_numpy()
+    near = np.zeros(len(monetary), dtype=bool)
+    for boundary, edge in zip(sketched, edges):
+        low, high = min(boundary, edge), max(boundary, edge)
+        near |= (monetary >= low * (1 - 1e-12)) & (monetary <= high * (1 + 1e-12))
+    assert not np.any(moved & ~near)
+    assert (actual["Segment"] == expected["Segment"]).mean() > 0.9
+
+
+def test_removed_values_leave_the_sketch_of_the_rest(values):
+    sketch = QuantileSketch.from_values(values, ACCURACY).remove(values[:20_000])
+    expected = QuantileSketch.from_values(values[20_000:], ACCURACY)
+    assert sketch.count == expected.count and sketch.zeros == expected.zeros
+    q = np.linspace(0, 1, 101)
+    np.testing.assert_array_equal(sketch.quantile(q), expected.quantile(q))
+
+
+def test_recency_boundaries_are_exact(metrics, orders):
+    customers = OrderAggregates.from_orders(orders).customers
+    boundaries = CustomerSketches.from_customers(customers).boundaries(4)
+    recency = np.sort(metrics["Recency"].to_numpy())
+    ranks = np.floor(np.array([0.25, 0.5, 0.75]) * (len(recency) - 1)).astype(np.int64)
+    np.testing.assert_array_equal(boundaries["Recency"], recency[ranks])
+
+
+def chunks_of(orders, rows=1_500):
+    return [orders.iloc[start:start + rows] for start in range(0, len(orders), rows)]
+
+
+def test_summaries_are_kept_while_ingesting(orders, monkeypatch, tmp_path):
+    # Customers span many chunks, so their partial metrics are replaced as chunks merge
+    aggregates = OrderAggregates.from_chunks(chunks_of(orders))
+    history = OrderAggregates.from_orders(orders.iloc[:12_000])
+    history.update(orders.iloc[12_000:])
+    history.save(str(tmp_path))
+    expected = OrderAggregates.from_orders(orders)
+
+    def rebuilt(*args, **kwargs):
+        raise AssertionError("summarized the exact tables")
+
+    monkeypatch.setattr(CustomerSketches, "from_customers", rebuilt)
+    monkeypatch.setattr(HeavyHitters, "from_weights", rebuilt)
+    monkeypatch.setattr(sketches_module, "rfm_sketches", rebuilt)
+    for ingested in (aggregates, history, OrderAggregates.load(str(tmp_path))):
+        assert_summaries_equal(ingested, expected)
+        pd.testing.assert_frame_equal(ingested.approximate_rfm(), expected.approximate_rfm())
+        pd.testing.assert_frame_equal(ingested.approximate_abc(), expected.approximate_abc())
+
+
+def test_approximate_rfm_follows_the_exact_scores(orders):
+    aggregates = OrderAggregates.from_orders(orders)
+    exact, approximate = aggregates.rfm(), aggregates.approximate_rfm()
+    np.testing.assert_array_equal(approximate["Recency_Score"], exact["Recency_Score"])
+    assert (approximate["Segment"] == exact["Segment"]).mean() > 0.9
+
+
+def test_hitters_are_named_through_the_inventory(orders, workbook):
+    inventory = workbook["Inventory"]
+    # Two products sharing a name, and one product unknown to the inventory
+    inventory = inventory.assign(Product_Name=inventory["Product_Name"].astype(str))
+    inventory.loc[1, "Product_Name"] = inventory.loc[0, "Product_Name"]
+    inventory = inventory.drop(index=2)
+    products = ProductIndex(inventory)
+    aggregates = OrderAggregates.from_orders(orders)
+
+    hitters = aggregates.product_hitters(products)
+    expected = products.sales_by_name(aggregates.product_sales)
+    pd.testing.assert_series_equal(
+        hitters.top().sort_index(),
+        expected.sort_index(),
+        check_names=False,
+        check_index_type=False,
+    )
+    # The total still counts the unknown product; the error bound covers shared names
+    assert hitters.total == pytest.approx(aggregates.product_sales.sum())
+    small = aggregates.product_hitters(products, capacity=5)
+    assert small.error == pytest.approx(2 * aggregates.hitters(5).error)
+    assert len(small) <= 5
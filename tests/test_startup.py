@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+from coffeepoint import startup
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(autouse=True)
+def in_repository(monkeypatch):
+    # The probes import the package from the working directory, as the app does
+    monkeypatch.chdir(ROOT)
+
+
+@pytest.mark.parametrize("app", ["app.py", "app-2.py"])
+def test_apps_import_only_the_startup_modules(app):
+    # Timings vary from machine to machine; the modules imported do not
+    report = startup.check(app, budget=float("inf"), repeat=1)
+
+    assert report["deferred_loaded"] == []
+    assert set(report["package_modules"]) == {
+        "coffeepoint",
+        "coffeepoint.jobs",
+        "coffeepoint.profiles",
+        "coffeepoint.profiling",
+        "coffeepoint.settings",
+        "coffeepoint.ui",
+        "coffeepoint.widgets",
+    }
+    assert report["problems"] == []
+
+
+def test_deferred_imports_and_slow_starts_are_reported(tmp_path):
+    script = tmp_path / "eager.py"
+    script.write_text("import json\nimport pandas as pd\n\npd.DataFrame()\n")
+
+    report = startup.check(str(script), budget=0.0, repeat=1)
+
+    assert report["imports"] == ["import json", "import pandas as pd"]
+    assert {"pandas", "numpy"} <= set(report["deferred_loaded"])
+    assert report["package_modules"] == []
+    assert report["problems"][0].startswith("startup imports took")
+    assert "startup imports load the deferred module pandas" in report["problems"]
@@ -0,0 +1,101 @@
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+from coffeepoint.loader import Workbook
+from coffeepoint.store import FORMAT_VERSION, SidecarStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SidecarStore(str(tmp_path))
+
+
+def test_round_trip_keeps_rows_and_dtypes(store, workbook):
+    stored = store.write(Workbook("synthetic", workbook))
+    assert store.open("synthetic").path == stored.path
+
+    for sheet, frame in workbook.items():
+        pd.testing.assert_frame_equal(stored.read(sheet), frame)
+        assert stored.rows(sheet) == len(frame)
+    pd.testing.assert_frame_equal(
+        stored.read("Orders", ["Customer_ID", "Quantity"]),
+        workbook["Orders"][["Customer_ID", "Quantity"]],
+    )
+    pd.testing.assert_frame_equal(stored.head("Inventory", 3), workbook["Inventory"].head(3))
+
+
+def test_row_ranges_are_read_in_chunks(store, workbook):
+    stored = store.write(Workbook("synthetic", workbook))
+    chunks = list(stored.iter_chunks("Orders", chunk_rows=3_000, start=1_000, stop=8_000))
+
+    assert [len(chunk) for chunk in chunks] == [3_000, 3_000, 1_000]
+    pd.testing.assert_frame_equal(
+        pd.concat(chunks, ignore_index=True),
+        workbook["Orders"].iloc[1_000:8_000].reset_index(drop=True),
+    )
+
+
+def test_concurrent_writers_store_one_sidecar(store, workbook):
+    results, errors = [], []
+
+    def write():
+        try:
+            results.append(store.write(Workbook("synthetic", workbook)))
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=write) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert {result.path for result in results} == {store.path("synthetic")}
+    # No scratch directory is left behind
+    assert os.listdir(os.path.dirname(store.path("synthetic"))) == ["synthetic"]
+    pd.testing.assert_frame_equal(results[0].read("Orders"), workbook["Orders"])
+
+
+def test_remove(store, workbook):
+    store.write(Workbook("synthetic", workbook))
+    store.remove("synthetic")
+
+    assert store.open("synthetic") is None
+    store.remove("synthetic")
+
+
+def test_stale_versions_are_removed(store, workbook, tmp_path):
+    old = tmp_path / f"v{FORMAT_VERSION - 1}" / "synthetic"
+    old.mkdir(parents=True)
+    (old / "orders.arrow").write_bytes(b"old")
+    (tmp_path / "notes").mkdir()
+
+    store.write(Workbook("synthetic", workbook))
+
+    assert sorted(os.listdir(tmp_path)) == ["notes", f"v{FORMAT_VERSION}"]
+
+
+def test_least_recently_opened_sidecars_are_evicted(tmp_path, generator):
+    small = generator.workbook(500)
+    store = SidecarStore(str(tmp_path), max_bytes=10**9)
+    for number, key in enumerate("abc"):
+        store.write(Workbook(key, small))
+        os.utime(store.path(key), (number, number))
+    store.open("a")
+
+    # Room for two sidecars: "b" was opened least recently
+    size = sum(
+        os.path.getsize(os.path.join(store.path("a"), name))
+        for name in os.listdir(store.path("a"))
+    )
+    store.max_bytes = 2 * size + size // 2
+    assert store.prune() == ["b"]
+
+    # The sidecar just written is kept even when the store is over budget
+    store.max_bytes = 0
+    store.write(Workbook("d", small))
+    assert [key for key in "abcd" if store.open(key) is not None] == ["d"]
@@ -0,0 +1,27 @@
+from coffeepoint import incremental
+from coffeepoint.incremental import OrderAggregates
+from coffeepoint.streaming import aggregate_orders_file
+
+from .helpers import assert_aggregates_equal
+
+
+def test_chunked_aggregates_match_one_pass(orders, monkeypatch):
+    # A small batch size exercises the intermediate merges
+    monkeypatch.setattr(incremental, "MERGE_BATCH", 2)
+    chunks = [orders.iloc[start:start + 1_500] for start in range(0, len(orders), 1_500)]
+    assert_aggregates_equal(
+        OrderAggregates.from_chunks(chunks), OrderAggregates.from_orders(orders)
+    )
+
+
+def test_order_file_matches_in_memory(orders, tmp_path):
+    path = tmp_path / "orders.csv"
+    orders.drop(columns="Sales_Amount").to_csv(path, index=False)
+    streamed = aggregate_orders_file(path, chunk_rows=3_000)
+    assert_aggregates_equal(streamed, OrderAggregates.from_orders(orders))
+
+
+def test_empty_chunks():
+    aggregates = OrderAggregates.from_chunks([])
+    assert aggregates.rows == 0
+    assert aggregates.abc().empty
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from coffeepoint.schema import SCHEMA, enforce
+from coffeepoint.synthetic import Generator, scaled, write_orders_arrow
+
+
+def test_the_same_seed_generates_the_same_frames():
+    first, second = Generator(seed=11), Generator(seed=11)
+    for sheet, frame in first.workbook(5_000).items():
+        pd.testing.assert_frame_equal(second.workbook(5_000)[sheet], frame)
+    for chunk, again in zip(first.iter_orders(5_000, 1_500), second.iter_orders(5_000, 1_500)):
+        pd.testing.assert_frame_equal(chunk, again)
+
+    other = Generator(seed=12).orders(5_000)
+    assert not first.orders(5_000)[["Customer_ID", "Quantity"]].equals(
+        other[["Customer_ID", "Quantity"]]
+    )
+
+
+def test_generated_sheets_follow_the_schema(workbook):
+    for sheet, frame in workbook.items():
+        for column, dtype in SCHEMA[sheet].items():
+            assert column in frame.columns
+            if dtype == "category":
+                assert isinstance(frame[column].dtype, pd.CategoricalDtype)
+            else:
+                assert frame[column].dtype.kind == np.dtype(dtype).kind
+        # Already enforced: enforcing again changes nothing
+        pd.testing.assert_frame_equal(enforce(sheet, frame), frame)
+
+
+def test_chunks_are_numbered_and_typed():
+    chunks = list(Generator(seed=3).iter_orders(5_000, chunk_rows=2_000))
+
+    assert [len(chunk) for chunk in chunks] == [2_000, 2_000, 1_000]
+    orders = pd.concat(chunks, ignore_index=True)
+    np.testing.assert_array_equal(orders["Order_ID"], np.arange(1, 5_001))
+    assert "Sales_Amount" in orders.columns
+
+
+def test_orders_stay_within_the_generated_ranges(generator, orders):
+    assert orders["Order_Date"].min() >= generator.start
+    assert orders["Order_Date"].max() < generator.start + pd.Timedelta(days=generator.days)
+    assert set(orders["Customer_ID"].astype(int)) <= set(range(1, generator.customers + 1))
+    assert orders["Quantity"].min() >= 1
+    # Pareto popularity: the top fifth of the products sells most
+    sales = orders.groupby("Product_ID", observed=True)["Sales_Amount"].sum()
+    top = sales.nlargest(generator.products // 5).sum()
+    assert top > 0.5 * sales.sum()
+
+
+def test_customers_sheet_matches_the_orders(workbook, orders):
+    customers = workbook["Customers"].set_index("Customer_ID")
+    spend = orders.groupby("Customer_ID", observed=True)["Sales_Amount"].sum()
+    np.testing.assert_allclose(customers.loc[spend.index.astype(int), "Total_Spent"], spend)
+
+
+def test_arrow_file_holds_the_raw_chunks(tmp_path):
+    generator = scaled(3_000, seed=5)
+    path = tmp_path / "orders.arrow"
+    write_orders_arrow(generator, path, 3_000, chunk_rows=1_000)
+
+    table = pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+    expected = pd.concat(generator.iter_orders(3_000, 1_000, typed=False), ignore_index=True)
+    pd.testing.assert_frame_equal(table.to_pandas(), expected)
@@ -0,0 +1,72 @@
+import pandas as pd
+import pytest
+
+from coffeepoint import tables
+from coffeepoint.tables import PagedTable, page_count, paged_table
+
+
+@pytest.fixture
+def table():
+    return PagedTable(
+        pd.DataFrame(
+            {
+                "Product": [f"P{number:03d}" for number in range(120)],
+                "Category": ["A", "B", "C"] * 40,
+                "Sales": [float(number % 7) for number in range(120)],
+            }
+        )
+    )
+
+
+def test_pages_cover_every_row_once(table):
+    assert page_count(len(table), 50) == 3
+    pages = [table.page(number, 50)[0] for number in range(3)]
+
+    assert [len(page) for page in pages] == [50, 50, 20]
+    assert list(pd.concat(pages)["Product"]) == list(table.frame["Product"])
+    assert table.page(0, 50)[1] == 120
+
+
+def test_page_numbers_past_the_ends_are_clamped(table):
+    last, rows = table.page(9, 50)
+    assert rows == 120 and list(last["Product"]) == list(table.frame["Product"][100:])
+    first, _ = table.page(-1, 50)
+    assert list(first["Product"]) == list(table.frame["Product"][:50])
+    empty, rows = table.page(3, 50, filter_column="Product", filter_text="none")
+    assert rows == 0 and empty.empty
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_sorting_is_stable_both_ways(table, descending):
+    page, _ = table.page(0, 120, sort="Sales", descending=descending)
+    expected = table.frame.sort_values("Sales", ascending=not descending, kind="stable")
+
+    assert list(page["Product"]) == list(expected["Product"])
+
+
+def test_sort_orders_and_filters_are_cached(table):
+    order = table.sort_order("Sales")
+    assert table.sort_order("Sales") is order
+    assert table.sort_order("Sales", descending=True) is not order
+
+    rows = table.rows(sort="Sales", filter_column="Category", filter_text="b")
+    assert len(rows) == 40
+    assert (table.frame["Category"].iloc[rows] == "B").all()
+    assert list(table.frame["Sales"].iloc[rows]) == sorted(table.frame["Sales"].iloc[rows])
+
+
+def test_new_versions_get_new_tables(monkeypatch):
+    monkeypatch.setattr(tables, "_tables", tables.Registry(size=4))
+    builds = []
+
+    def build(sales):
+        builds.append(sales)
+        return pd.DataFrame({"Sales": sales})
+
+    first = paged_table(("dataset", "abc", "v1"), lambda: build([3.0, 1.0, 2.0]))
+    assert paged_table(("dataset", "abc", "v1"), lambda: build([0.0])) is first
+    first.sort_order("Sales")
+
+    second = paged_table(("dataset", "abc", "v2"), lambda: build([5.0, 4.0]))
+    assert builds == [[3.0, 1.0, 2.0], [5.0, 4.0]]
+    assert list(second.page(0, 10, sort="Sales")[0]["Sales"]) == [4.0, 5.0]